@@ -0,0 +1,46 @@
+"""Composite indexes for the sales access paths
+
+Adds (sale_date, product_id), (customer_id, sale_date) and
+(product_id, sale_date) on sales, and drops the single-column
+customer_id / product_id indexes they make redundant.
+
+Tables are still created by Base.metadata.create_all at startup, so this
+revision only assumes the sales table exists and skips indexes a fresh
+create_all already made. On Postgres the indexes are built CONCURRENTLY
+so the sales table stays writable while they build.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_sales_sale_date_product_id", ["sale_date", "product_id"], {"postgresql_include": ["quantity", "final_amount"]}),
+    ("ix_sales_customer_id_sale_date", ["customer_id", "sale_date"], {}),
+    ("ix_sales_product_id_sale_date", ["product_id", "sale_date"], {})
+)
+
+REPLACED = (
+    ("ix_sales_customer_id", ["customer_id"]),
+    ("ix_sales_product_id", ["product_id"])
+)
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, columns, options in INDEXES:
+            op.create_index(name, "sales", columns, if_not_exists=True, postgresql_concurrently=True, **options)
+        for name, _ in REPLACED:
+            op.drop_index(name, table_name="sales", if_exists=True, postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in REPLACED:
+            op.create_index(name, "sales", columns, if_not_exists=True, postgresql_concurrently=True)
+        for name, _, _ in INDEXES:
+            op.drop_index(name, table_name="sales", if_exists=True, postgresql_concurrently=True)
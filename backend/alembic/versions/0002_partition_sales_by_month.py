@@ -0,0 +1,100 @@
+"""Partition sales by month (PostgreSQL)
+
+Rebuilds `sales` as a declaratively partitioned table, PARTITION BY RANGE
+(sale_date), with one `sales_YYYY_MM` partition per month that has sales,
+the next three months, and a `sales_default` catch-all. Rows are copied
+over in the same transaction. The app's partition manager
+(app/database/partitions.py) creates later months ahead of time.
+
+Unique keys of a partitioned table must include the partition key, so the
+primary key becomes (id, sale_date) and transaction_id is only unique
+together with sale_date; SaleService looks up duplicate transaction ids
+itself.
+
+SQLite has no native partitioning; there the partition manager seals
+closed months into their own tables instead, so this revision does
+nothing.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from datetime import date, datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+# Non-unique indexes of the sales table, recreated on the partitioned parent
+INDEXES = (
+    ("ix_sales_id", ["id"], {}),
+    ("ix_sales_sale_date", ["sale_date"], {}),
+    ("ix_sales_store_location", ["store_location"], {}),
+    ("ix_sales_sales_channel", ["sales_channel"], {}),
+    ("ix_sales_sale_date_product_id", ["sale_date", "product_id"], {"postgresql_include": ["quantity", "final_amount"]}),
+    ("ix_sales_customer_id_sale_date", ["customer_id", "sale_date"], {}),
+    ("ix_sales_product_id_sale_date", ["product_id", "sale_date"], {})
+)
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def _months(first: date, last: date):
+    month = date(first.year, first.month, 1)
+    while month <= last:
+        yield month
+        month = _next_month(month)
+
+def _create_keys(primary_key, transaction_id_columns):
+    # Only once the old table (and its identically named keys) is gone
+    op.execute(f"ALTER TABLE sales ADD PRIMARY KEY ({', '.join(primary_key)})")
+    for name, columns, options in INDEXES:
+        op.create_index(name, "sales", columns, **options)
+    op.create_index("ix_sales_transaction_id", "sales", transaction_id_columns, unique=True)
+    op.create_foreign_key("sales_product_id_fkey", "sales", "products", ["product_id"], ["id"])
+    op.create_foreign_key("sales_customer_id_fkey", "sales", "customers", ["customer_id"], ["id"])
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE sales RENAME TO sales_unpartitioned")
+    op.execute("ALTER SEQUENCE sales_id_seq OWNED BY NONE")
+    op.execute("CREATE TABLE sales (LIKE sales_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (sale_date)")
+
+    today = datetime.now(timezone.utc).date()
+    oldest = bind.execute(sa.text("SELECT min(sale_date) FROM sales_unpartitioned")).scalar()
+    last = date(today.year, today.month, 1)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    for month in _months(oldest.date() if oldest else today, last):
+        op.execute(
+            f"CREATE TABLE sales_{month:%Y_%m} PARTITION OF sales "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{_next_month(month).isoformat()} 00:00:00+00')"
+        )
+    op.execute("CREATE TABLE sales_default PARTITION OF sales DEFAULT")
+
+    op.execute("INSERT INTO sales SELECT * FROM sales_unpartitioned")
+    op.execute("DROP TABLE sales_unpartitioned")
+    op.execute("ALTER SEQUENCE sales_id_seq OWNED BY sales.id")
+    _create_keys(["id", "sale_date"], ["transaction_id", "sale_date"])
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE sales RENAME TO sales_partitioned")
+    op.execute("ALTER SEQUENCE sales_id_seq OWNED BY NONE")
+    op.execute("CREATE TABLE sales (LIKE sales_partitioned INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO sales SELECT * FROM sales_partitioned")
+    # Drops every attached partition with it; archived (detached) months stay
+    op.execute("DROP TABLE sales_partitioned")
+    op.execute("ALTER SEQUENCE sales_id_seq OWNED BY sales.id")
+    _create_keys(["id"], ["transaction_id"])
@@ -0,0 +1,94 @@
+"""customer_stats, backfilled from sales, and sale dates on customer_total_deltas
+
+Creates customer_stats (unless startup's create_all already did) and
+recomputes it from every sale, including SQLite months sealed into their
+own tables. Pending write-behind deltas are folded into the customer
+totals first, as `python manage.py rebuild-customer-stats` does; their
+sales are counted by the backfill. Deltas now also carry the first and
+last sale date they cover.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+import re
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+COLUMNS = ("first_sale_date", "last_sale_date")
+STATS_COLUMNS = "customer_id, total_spent, total_orders, first_purchase_at, last_purchase_at"
+
+def _delta_columns():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("customer_total_deltas"):
+        return None
+    return {column["name"] for column in inspector.get_columns("customer_total_deltas")}
+
+def _sales_union(bind):
+    # SQLite keeps sealed months in sales_YYYY_MM tables; PostgreSQL
+    # partitions are read through the parent
+    tables = ["sales"]
+    if bind.dialect.name == "sqlite":
+        tables += sorted(
+            name for name in sa.inspect(bind).get_table_names() if re.fullmatch(r"sales_\d{4}_\d{2}", name)
+        )
+    return " UNION ALL ".join(
+        f'SELECT id, customer_id, final_amount, sale_date FROM "{table}"' for table in tables
+    )
+
+def _fold_deltas():
+    pending = "FROM customer_total_deltas AS d WHERE d.customer_id = customers.id"
+    op.execute(f"""
+        UPDATE customers SET
+            total_spent = total_spent + (SELECT SUM(d.spent) {pending}),
+            total_orders = total_orders + (SELECT SUM(d.orders) {pending})
+        WHERE id IN (SELECT customer_id FROM customer_total_deltas)
+    """)
+    op.execute("DELETE FROM customer_total_deltas")
+
+def _backfill_stats(bind):
+    op.execute("DELETE FROM customer_stats")
+    op.execute(f"""
+        INSERT INTO customer_stats ({STATS_COLUMNS})
+        SELECT customer_id, SUM(final_amount), COUNT(id), MIN(sale_date), MAX(sale_date)
+        FROM ({_sales_union(bind)}) AS all_sales
+        GROUP BY customer_id
+    """)
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("customer_stats"):
+        op.create_table(
+            "customer_stats",
+            sa.Column("customer_id", sa.Integer(), sa.ForeignKey("customers.id"), primary_key=True),
+            sa.Column("total_spent", sa.Float(), nullable=False),
+            sa.Column("total_orders", sa.Integer(), nullable=False),
+            sa.Column("first_purchase_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("last_purchase_at", sa.DateTime(timezone=True), nullable=True)
+        )
+
+    existing = _delta_columns()
+    if existing is not None:
+        with op.batch_alter_table("customer_total_deltas") as batch:
+            for name in COLUMNS:
+                if name not in existing:
+                    batch.add_column(sa.Column(name, sa.DateTime(timezone=True), nullable=True))
+        _fold_deltas()
+    if inspector.has_table("sales"):
+        _backfill_stats(bind)
+
+def downgrade():
+    existing = _delta_columns()
+    if existing is not None:
+        with op.batch_alter_table("customer_total_deltas") as batch:
+            for name in COLUMNS:
+                if name in existing:
+                    batch.drop_column(name)
+    if sa.inspect(op.get_bind()).has_table("customer_stats"):
+        op.drop_table("customer_stats")
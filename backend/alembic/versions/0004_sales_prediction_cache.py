@@ -0,0 +1,46 @@
+"""Key sales_predictions for the prediction cache
+
+MLService now caches its forecasts in sales_predictions, one row per
+(product_id, prediction_date, model_version), and only serves rows made
+from the current feature-store watermark. Adds that unique key and the
+features_through column. Nothing wrote to the table before, so existing
+rows are dropped rather than deduplicated.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+KEY = ("ux_sales_predictions_key", ["product_id", "prediction_date", "model_version"])
+
+def _columns():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("sales_predictions"):
+        return None
+    return {column["name"] for column in inspector.get_columns("sales_predictions")}
+
+def upgrade():
+    existing = _columns()
+    if existing is None:
+        return
+    op.execute("DELETE FROM sales_predictions")
+    if "features_through" not in existing:
+        with op.batch_alter_table("sales_predictions") as batch:
+            batch.add_column(sa.Column("features_through", sa.Date(), nullable=True))
+    op.create_index(KEY[0], "sales_predictions", KEY[1], unique=True, if_not_exists=True)
+
+def downgrade():
+    existing = _columns()
+    if existing is None:
+        return
+    op.drop_index(KEY[0], table_name="sales_predictions", if_exists=True)
+    if "features_through" in existing:
+        with op.batch_alter_table("sales_predictions") as batch:
+            batch.drop_column("features_through")
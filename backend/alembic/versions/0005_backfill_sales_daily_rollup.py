@@ -0,0 +1,64 @@
+"""sales_daily_rollup, backfilled from sales
+
+Creates sales_daily_rollup (unless startup's create_all already did) and
+recomputes it from every sale, including SQLite months sealed into their
+own tables, as `python manage.py rebuild-rollup` does. Until now only
+sales created through the API were rolled up, so databases loaded any
+other way showed empty whole-day sales overviews.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+import re
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+ROLLUP_COLUMNS = "day, product_id, revenue, quantity, order_count"
+
+def _sales_union(bind):
+    # SQLite keeps sealed months in sales_YYYY_MM tables; PostgreSQL
+    # partitions are read through the parent
+    tables = ["sales"]
+    if bind.dialect.name == "sqlite":
+        tables += sorted(
+            name for name in sa.inspect(bind).get_table_names() if re.fullmatch(r"sales_\d{4}_\d{2}", name)
+        )
+    return " UNION ALL ".join(
+        f'SELECT id, product_id, quantity, final_amount, sale_date FROM "{table}"' for table in tables
+    )
+
+def _backfill_rollup(bind):
+    op.execute("DELETE FROM sales_daily_rollup")
+    op.execute(f"""
+        INSERT INTO sales_daily_rollup ({ROLLUP_COLUMNS})
+        SELECT date(sale_date), product_id, SUM(final_amount), SUM(quantity), COUNT(id)
+        FROM ({_sales_union(bind)}) AS all_sales
+        GROUP BY date(sale_date), product_id
+    """)
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("sales_daily_rollup"):
+        op.create_table(
+            "sales_daily_rollup",
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id"), primary_key=True),
+            sa.Column("revenue", sa.Float(), nullable=False),
+            sa.Column("quantity", sa.Integer(), nullable=False),
+            sa.Column("order_count", sa.Integer(), nullable=False)
+        )
+        op.create_index("ix_sales_daily_rollup_product_id", "sales_daily_rollup", ["product_id"])
+    if inspector.has_table("sales"):
+        _backfill_rollup(bind)
+
+def downgrade():
+    # sales_daily_rollup belongs to the models' schema and its backfilled
+    # rows stay valid, so the table is kept
+    pass
@@ -1,149 +1,50 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, or_
 from typing import Optional
-from datetime import datetime, timedelta
-from app.database.connection import get_db
+from datetime import datetime, time, timedelta
+from app.core.cache import response_cache
+from app.core.responses import FastJSONResponse
+from app.database.connection import get_async_db
 from app.database import models
-from app.schemas.schemas import SalesAnalytics
+from app.database.partitions import sales_partitions
+from app.schemas.schemas import SalesAnalytics, ProductSortKey
+from app.core.pagination import encode_cursor, cursor_position
+from app.services.aggregate_planner import sales_overview_planner
+from app.services.columnar_store import columnar_store, np
 
 router = APIRouter()
 
 @router.get("/sales-overview", response_model=SalesAnalytics)
+@response_cache.cached("analytics/sales-overview")
 async def get_sales_analytics(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get comprehensive sales analytics"""
+    """Get comprehensive sales analytics
+    
+    The default window (the last 30 whole days) is served from the daily
+    rollup; explicit date ranges are answered in one pass over sales.
+    """
     
     # Default to last 30 days if no dates provided
     if not end_date:
-        end_date = datetime.now()
+        end_date = datetime.combine(datetime.now().date(), time.max)
     if not start_date:
-        start_date = end_date - timedelta(days=30)
-    
-    # Base query with date filter
-    base_query = db.query(models.Sale).filter(
-        and_(
-            models.Sale.sale_date >= start_date,
-            models.Sale.sale_date <= end_date
-        )
-    )
-    
-    # Total sales and orders
-    sales_summary = base_query.with_entities(
-        func.sum(models.Sale.final_amount).label('total_sales'),
-        func.count(models.Sale.id).label('total_orders'),
-        func.avg(models.Sale.final_amount).label('average_order_value')
-    ).first()
-    
-    # Top products
-    top_products = db.query(
-        models.Product.name,
-        models.Product.category,
-        func.sum(models.Sale.quantity).label('total_quantity'),
-        func.sum(models.Sale.final_amount).label('total_revenue')
-    ).join(models.Sale).filter(
-        and_(
-            models.Sale.sale_date >= start_date,
-            models.Sale.sale_date <= end_date
-        )
-    ).group_by(
-        models.Product.id, models.Product.name, models.Product.category
-    ).order_by(
-        func.sum(models.Sale.final_amount).desc()
-    ).limit(10).all()
-    
-    # Top customers
-    top_customers = db.query(
-        models.Customer.first_name,
-        models.Customer.last_name,
-        models.Customer.email,
-        func.sum(models.Sale.final_amount).label('total_spent'),
-        func.count(models.Sale.id).label('total_orders')
-    ).join(models.Sale).filter(
-        and_(
-            models.Sale.sale_date >= start_date,
-            models.Sale.sale_date <= end_date
-        )
-    ).group_by(
-        models.Customer.id, models.Customer.first_name, 
-        models.Customer.last_name, models.Customer.email
-    ).order_by(
-        func.sum(models.Sale.final_amount).desc()
-    ).limit(10).all()
-    
-    # Sales by category
-    sales_by_category = db.query(
-        models.Product.category,
-        func.sum(models.Sale.final_amount).label('total_revenue'),
-        func.sum(models.Sale.quantity).label('total_quantity')
-    ).join(models.Sale).filter(
-        and_(
-            models.Sale.sale_date >= start_date,
-            models.Sale.sale_date <= end_date
-        )
-    ).group_by(models.Product.category).all()
-    
-    # Sales trend (daily)
-    sales_trend = db.query(
-        func.date(models.Sale.sale_date).label('date'),
-        func.sum(models.Sale.final_amount).label('revenue'),
-        func.count(models.Sale.id).label('orders')
-    ).filter(
-        and_(
-            models.Sale.sale_date >= start_date,
-            models.Sale.sale_date <= end_date
-        )
-    ).group_by(func.date(models.Sale.sale_date)).order_by(
-        func.date(models.Sale.sale_date)
-    ).all()
+        start_date = datetime.combine(end_date.date() - timedelta(days=30), time.min)
     
-    return SalesAnalytics(
-        total_sales=float(sales_summary.total_sales or 0),
-        total_orders=int(sales_summary.total_orders or 0),
-        average_order_value=float(sales_summary.average_order_value or 0),
-        top_products=[
-            {
-                "name": product.name,
-                "category": product.category,
-                "total_quantity": int(product.total_quantity),
-                "total_revenue": float(product.total_revenue)
-            }
-            for product in top_products
-        ],
-        top_customers=[
-            {
-                "name": f"{customer.first_name} {customer.last_name}",
-                "email": customer.email,
-                "total_spent": float(customer.total_spent),
-                "total_orders": int(customer.total_orders)
-            }
-            for customer in top_customers
-        ],
-        sales_by_category=[
-            {
-                "category": category.category,
-                "total_revenue": float(category.total_revenue),
-                "total_quantity": int(category.total_quantity)
-            }
-            for category in sales_by_category
-        ],
-        sales_trend=[
-            {
-                "date": trend.date.isoformat(),
-                "revenue": float(trend.revenue),
-                "orders": int(trend.orders)
-            }
-            for trend in sales_trend
-        ]
-    )
+    overview = await db.run_sync(sales_overview_planner.run, start_date, end_date)
+    return SalesAnalytics(**overview)
 
 @router.get("/inventory-status")
-async def get_inventory_status(db: Session = Depends(get_db)):
+@response_cache.cached("analytics/inventory-status")
+async def get_inventory_status(db: AsyncSession = Depends(get_async_db)):
     """Get current inventory status"""
-    
+    return await db.run_sync(_inventory_status)
+
+def _inventory_status(db: Session):
     # Total products
     total_products = db.query(models.Product).filter(
         models.Product.is_active == True
@@ -179,9 +80,12 @@ async def get_inventory_status(db: Session = Depends(get_db)):
     }
 
 @router.get("/customer-insights")
-async def get_customer_insights(db: Session = Depends(get_db)):
+@response_cache.cached("analytics/customer-insights")
+async def get_customer_insights(db: AsyncSession = Depends(get_async_db)):
     """Get customer analytics and insights"""
-    
+    return await db.run_sync(_customer_insights)
+
+def _customer_insights(db: Session):
     # Total customers
     total_customers = db.query(models.Customer).filter(
         models.Customer.is_active == True
@@ -229,56 +133,171 @@ async def get_customer_insights(db: Session = Depends(get_db)):
     }
 
 @router.get("/product-performance")
+@response_cache.cached("analytics/product-performance")
 async def get_product_performance(
     category: Optional[str] = Query(None),
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    sort_by: ProductSortKey = Query(ProductSortKey.REVENUE),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get product performance metrics"""
+    """Get product performance metrics, best performers first
+    
+    Pages are keyed on (sort value, product id); pass `next_cursor` back as
+    `cursor` to get the next page. The response is cached already rendered,
+    so cache hits skip serialization too.
+    """
     
     start_date = datetime.now() - timedelta(days=days)
     
-    # Base query
+    after = None
+    if cursor:
+        try:
+            after = cursor_position(cursor, sort_by=str, value=(int, float), id=int)
+            if after.get("sort_by") != sort_by.value:
+                raise ValueError("Cursor does not match sort_by")
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    
+    if columnar_store.loaded:
+        products = await db.run_sync(_product_performance_columnar, category, start_date, sort_by, limit, after)
+    else:
+        products = await db.run_sync(_product_performance_sql, category, start_date, sort_by, limit, after)
+    
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        last = products[-1]
+        next_cursor = encode_cursor({
+            "sort_by": sort_by.value,
+            "value": last[PERFORMANCE_SORT_FIELDS[sort_by]],
+            "id": last["product_id"]
+        })
+    
+    return FastJSONResponse({
+        "analysis_period_days": days,
+        "category_filter": category,
+        "sort_by": sort_by.value,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "products": products
+    })
+
+# Response field each sort key orders by
+PERFORMANCE_SORT_FIELDS = {
+    ProductSortKey.REVENUE: "revenue",
+    ProductSortKey.UNITS: "units_sold",
+    ProductSortKey.TRANSACTIONS: "transaction_count"
+}
+
+def _product_performance_sql(db: Session, category, start_date, sort_by, limit, after):
+    """Aggregate sales per product first, then join the (much smaller) result to products"""
+    Sale = sales_partitions.source(db, start_date)
+    sales_per_product = db.query(
+        Sale.product_id.label('product_id'),
+        func.sum(Sale.quantity).label('units_sold'),
+        func.sum(Sale.final_amount).label('revenue'),
+        func.count(Sale.id).label('transaction_count')
+    ).filter(
+        Sale.sale_date >= start_date
+    ).group_by(Sale.product_id).subquery()
+    
+    units_sold = func.coalesce(sales_per_product.c.units_sold, 0)
+    revenue = func.coalesce(sales_per_product.c.revenue, 0)
+    transaction_count = func.coalesce(sales_per_product.c.transaction_count, 0)
+    sort_column = {
+        ProductSortKey.REVENUE: revenue,
+        ProductSortKey.UNITS: units_sold,
+        ProductSortKey.TRANSACTIONS: transaction_count
+    }[sort_by]
+    
     query = db.query(
+        models.Product.id,
         models.Product.name,
         models.Product.category,
         models.Product.brand,
         models.Product.price,
         models.Product.stock_quantity,
-        func.coalesce(func.sum(models.Sale.quantity), 0).label('units_sold'),
-        func.coalesce(func.sum(models.Sale.final_amount), 0).label('revenue'),
-        func.count(models.Sale.id).label('transaction_count')
+        units_sold.label('units_sold'),
+        revenue.label('revenue'),
+        transaction_count.label('transaction_count')
     ).outerjoin(
-        models.Sale,
-        and_(
-            models.Sale.product_id == models.Product.id,
-            models.Sale.sale_date >= start_date
-        )
+        sales_per_product, sales_per_product.c.product_id == models.Product.id
     ).filter(models.Product.is_active == True)
     
     if category:
         query = query.filter(models.Product.category == category)
+    if after:
+        query = query.filter(
+            or_(
+                sort_column < after["value"],
+                and_(sort_column == after["value"], models.Product.id > after["id"])
+            )
+        )
+    
+    # One extra row tells us whether there is a next page
+    products = query.order_by(sort_column.desc(), models.Product.id).limit(limit + 1).all()
+    return [
+        _performance_item(product, product.units_sold, product.revenue, product.transaction_count)
+        for product in products
+    ]
+
+def _product_performance_columnar(db: Session, category, start_date, sort_by, limit, after):
+    """Product performance from the in-memory columnar store"""
+    columnar_store.catch_up(db)
+    query = db.query(models.Product.id).filter(models.Product.is_active == True)
+    if category:
+        query = query.filter(models.Product.category == category)
+    product_ids = np.array([row.id for row in query.all()], dtype=np.int64)
+    
+    length = int(product_ids.max()) + 1 if product_ids.size else 0
+    totals = columnar_store.totals_by("product_id", start_date, length=length)
+    metric = {
+        ProductSortKey.REVENUE: totals["revenue"],
+        ProductSortKey.UNITS: totals["quantity"],
+        ProductSortKey.TRANSACTIONS: totals["count"]
+    }[sort_by][product_ids]
     
-    products = query.group_by(
-        models.Product.id, models.Product.name, models.Product.category,
-        models.Product.brand, models.Product.price, models.Product.stock_quantity
-    ).order_by(func.sum(models.Sale.final_amount).desc()).all()
+    if after:
+        keep = (metric < after["value"]) | ((metric == after["value"]) & (product_ids > after["id"]))
+        product_ids, metric = product_ids[keep], metric[keep]
     
+    # Highest metric first, ties by id; only the page's products are loaded
+    page_ids = [int(i) for i in product_ids[np.lexsort((product_ids, -metric))][:limit + 1]]
+    details = {
+        product.id: product for product in db.query(
+            models.Product.id,
+            models.Product.name,
+            models.Product.category,
+            models.Product.brand,
+            models.Product.price,
+            models.Product.stock_quantity
+        ).filter(models.Product.id.in_(page_ids)).all()
+    }
+    return [
+        _performance_item(
+            details[product_id],
+            totals["quantity"][product_id],
+            totals["revenue"][product_id],
+            totals["count"][product_id]
+        )
+        for product_id in page_ids if product_id in details
+    ]
+
+def _performance_item(product, units_sold, revenue, transaction_count):
     return {
-        "analysis_period_days": days,
-        "category_filter": category,
-        "products": [
-            {
-                "name": product.name,
-                "category": product.category,
-                "brand": product.brand,
-                "price": float(product.price),
-                "current_stock": int(product.stock_quantity),
-                "units_sold": int(product.units_sold),
-                "revenue": float(product.revenue),
-                "transaction_count": int(product.transaction_count),
-                "revenue_per_unit": float(product.revenue / product.units_sold) if product.units_sold > 0 else 0
-            }
-            for product in products
-        ]
+        "product_id": product.id,
+        "name": product.name,
+        "category": product.category,
+        "brand": product.brand,
+        "price": float(product.price),
+        "current_stock": int(product.stock_quantity),
+        "units_sold": int(units_sold),
+        "revenue": float(revenue),
+        "transaction_count": int(transaction_count),
+        "revenue_per_unit": float(revenue / units_sold) if units_sold > 0 else 0
     }
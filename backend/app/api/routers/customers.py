@@ -1,34 +1,60 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database.connection import get_db
-from app.schemas.schemas import Customer, CustomerCreate, CustomerUpdate
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from app.database.connection import get_async_db
+from app.schemas.schemas import (
+    Customer, CustomerPage, CustomerCreate, CustomerUpdate, CustomerStats, CustomerStatsItem,
+    CustomerStatsBatchRequest
+)
+from app.schemas.encoders import customer_encoder
 from app.services.crud import customer_service
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Customer])
+@router.get("/", response_model=Union[List[Customer], CustomerPage])
 async def get_customers(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     customer_segment: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all customers with optional filtering"""
-    customers = customer_service.get_customers(
+    """Get all customers with optional filtering
+    
+    Pass `cursor` (empty for the first page) to page by keyset instead of
+    offset: the response is then `{"items": [...], "next_cursor": ...}` and
+    `next_cursor` is passed back as `cursor` for the next page.
+    """
+    if cursor is not None:
+        try:
+            items, next_cursor = await customer_service.get_customers_page(
+                db=db,
+                cursor=cursor,
+                limit=limit,
+                customer_segment=customer_segment,
+                is_active=is_active
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        return customer_encoder.page_response(items, next_cursor)
+    
+    customers = await customer_service.get_customers(
         db=db,
         skip=skip,
         limit=limit,
         customer_segment=customer_segment,
         is_active=is_active
     )
-    return customers
+    return customer_encoder.response(customers)
 
 @router.get("/{customer_id}", response_model=Customer)
-async def get_customer(customer_id: int, db: Session = Depends(get_db)):
+async def get_customer(customer_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific customer by ID"""
-    customer = customer_service.get_customer(db=db, customer_id=customer_id)
+    customer = await customer_service.get_customer(db=db, customer_id=customer_id)
     if not customer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -37,73 +63,79 @@ async def get_customer(customer_id: int, db: Session = Depends(get_db)):
     return customer
 
 @router.post("/", response_model=Customer, status_code=status.HTTP_201_CREATED)
-async def create_customer(customer: CustomerCreate, db: Session = Depends(get_db)):
+async def create_customer(customer: CustomerCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new customer"""
     # Check if email already exists
-    existing_customer = customer_service.get_customer_by_email(db=db, email=customer.email)
+    existing_customer = await customer_service.get_customer_by_email(db=db, email=customer.email)
     if existing_customer:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Customer with this email already exists"
         )
     
-    return customer_service.create_customer(db=db, customer=customer)
+    return await customer_service.create_customer(db=db, customer=customer)
 
 @router.put("/{customer_id}", response_model=Customer)
 async def update_customer(
     customer_id: int,
     customer_update: CustomerUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a customer"""
-    customer = customer_service.get_customer(db=db, customer_id=customer_id)
+    customer = await customer_service.get_customer(db=db, customer_id=customer_id)
     if not customer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Customer not found"
         )
     
-    return customer_service.update_customer(
+    return await customer_service.update_customer(
         db=db,
         customer_id=customer_id,
         customer_update=customer_update
     )
 
 @router.delete("/{customer_id}")
-async def delete_customer(customer_id: int, db: Session = Depends(get_db)):
+async def delete_customer(customer_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a customer (soft delete by setting is_active to False)"""
-    customer = customer_service.get_customer(db=db, customer_id=customer_id)
+    customer = await customer_service.get_customer(db=db, customer_id=customer_id)
     if not customer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Customer not found"
         )
     
-    customer_service.delete_customer(db=db, customer_id=customer_id)
+    await customer_service.delete_customer(db=db, customer_id=customer_id)
     return {"message": "Customer deleted successfully"}
 
-@router.get("/{customer_id}/stats")
-async def get_customer_stats(customer_id: int, db: Session = Depends(get_db)):
+@router.get("/{customer_id}/stats", response_model=CustomerStats)
+async def get_customer_stats(customer_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get customer statistics"""
-    customer = customer_service.get_customer(db=db, customer_id=customer_id)
-    if not customer:
+    stats = await customer_service.get_customer_stats(db=db, customer_id=customer_id)
+    if stats is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Customer not found"
         )
-    
-    stats = customer_service.get_customer_stats(db=db, customer_id=customer_id)
     return stats
 
+@router.post("/stats:batch", response_model=List[CustomerStatsItem])
+async def get_customer_stats_batch(request: CustomerStatsBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Statistics of up to 1000 customers in one query
+    
+    Items come in request order; ids of unknown customers are left out.
+    """
+    return await customer_service.get_customer_stats_batch(db=db, customer_ids=request.customer_ids)
+
 @router.get("/segment/{segment}", response_model=List[Customer])
 async def get_customers_by_segment(
     segment: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get customers by segment"""
-    customers = customer_service.get_customers_by_segment(
+    customers = await customer_service.get_customers_by_segment(
         db=db,
         segment=segment,
         skip=skip,
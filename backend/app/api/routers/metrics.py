@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+from app.core.cache import response_cache
+from app.database.connection import engine, async_engine
+from app.database.pool import pool_status
+from app.services.columnar_store import columnar_store
+from app.services.prediction_cache import prediction_cache
+
+router = APIRouter()
+
+@router.get("/cache")
+async def get_cache_metrics():
+    """Get response cache hit/miss counters"""
+    return response_cache.stats()
+
+@router.get("/prediction-cache")
+async def get_prediction_cache_metrics():
+    """Get the in-process prediction cache's hit/miss counters"""
+    return prediction_cache.stats()
+
+@router.get("/columnar")
+async def get_columnar_metrics():
+    """Get the columnar sales store's memory footprint"""
+    return columnar_store.memory_footprint()
+
+@router.get("/db-pool")
+async def get_db_pool_metrics():
+    """Get checked-out connections, overflow and checkout wait time per engine"""
+    return {
+        "async": pool_status(async_engine),
+        "sync": pool_status(engine)
+    }
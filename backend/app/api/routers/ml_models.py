@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, status, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime, timedelta
 from app.database.connection import get_db
-from app.schemas.schemas import PredictionRequest, PredictionResponse
-from app.services.ml_service import MLService
+from app.schemas.schemas import BatchPredictionItem, DemandForecast, PredictionRequest, PredictionResponse
+from app.services.forecast_scheduler import forecast_scheduler
+from app.services.ml_service import ml_service
 
 router = APIRouter()
-ml_service = MLService()
+
+# Endpoints using the sync Session are plain `def` so FastAPI runs them in its
+# threadpool instead of blocking the event loop
 
 @router.post("/predict-sales", response_model=PredictionResponse)
-async def predict_sales(
+def predict_sales(
     request: PredictionRequest,
     db: Session = Depends(get_db)
 ):
@@ -33,30 +36,51 @@ async def predict_sales(
             detail=f"Prediction failed: {str(e)}"
         )
 
-@router.post("/predict-sales/batch", response_model=List[PredictionResponse])
-async def predict_sales_batch(
+@router.post("/predict-sales/batch", response_model=List[BatchPredictionItem])
+def predict_sales_batch(
     requests: List[PredictionRequest],
     db: Session = Depends(get_db)
 ):
-    """Predict sales for multiple products"""
-    predictions = []
-    for request in requests:
-        try:
-            prediction = ml_service.predict_sales(
-                db=db,
-                product_id=request.product_id,
-                days_ahead=request.days_ahead
-            )
-            predictions.append(prediction)
-        except Exception as e:
-            # Log error but continue with other predictions
-            print(f"Failed to predict for product {request.product_id}: {str(e)}")
-            continue
+    """Predict sales for multiple products
     
-    return predictions
+    One item per request, in request order, carrying either the prediction
+    or the reason it failed.
+    """
+    try:
+        return ml_service.predict_sales_batch(db, requests)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Prediction failed: {str(e)}"
+        )
+
+@router.get("/demand-forecast/{product_id}", response_model=DemandForecast)
+def get_demand_forecast(
+    product_id: int,
+    days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_db)
+):
+    """Daily predicted demand for a product over the next `days` days"""
+    try:
+        return ml_service.forecast_demand(db, product_id, days)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Forecast failed: {str(e)}"
+        )
 
 @router.post("/retrain-model")
-async def retrain_model(
+def retrain_model(
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
@@ -67,6 +91,22 @@ async def retrain_model(
         "status": "in_progress"
     }
 
+@router.post("/forecasts/runs", status_code=status.HTTP_202_ACCEPTED)
+def trigger_forecast_run(retrain: bool = Query(True)):
+    """Start a forecast run now: optionally retrain, then precompute forecasts for every active product"""
+    try:
+        return forecast_scheduler.trigger(retrain)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
+@router.get("/forecasts/runs")
+def get_forecast_runs():
+    """Recent forecast runs, newest first, with per-stage durations"""
+    return forecast_scheduler.runs()
+
 @router.get("/model-info")
 async def get_model_info():
     """Get information about the current ML model"""
@@ -74,7 +114,7 @@ async def get_model_info():
     return info
 
 @router.get("/model-performance")
-async def get_model_performance(db: Session = Depends(get_db)):
+def get_model_performance(db: Session = Depends(get_db)):
     """Get model performance metrics"""
     try:
         performance = ml_service.evaluate_model(db)
@@ -98,7 +138,7 @@ async def get_feature_importance():
         )
 
 @router.post("/optimize-inventory/{product_id}")
-async def optimize_inventory(product_id: int, db: Session = Depends(get_db)):
+def optimize_inventory(product_id: int, db: Session = Depends(get_db)):
     """Get inventory optimization recommendations for a product"""
     try:
         recommendations = ml_service.optimize_inventory(db, product_id)
@@ -1,35 +1,58 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database.connection import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from app.database.connection import get_async_db
 from app.database import models
-from app.schemas.schemas import Product, ProductCreate, ProductUpdate
+from app.schemas.schemas import Product, ProductPage, ProductCreate, ProductUpdate
+from app.schemas.encoders import product_encoder
 from app.services.crud import product_service
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Product])
+@router.get("/", response_model=Union[List[Product], ProductPage])
 async def get_products(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     category: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all products with optional filtering"""
-    products = product_service.get_products(
+    """Get all products with optional filtering
+    
+    Pass `cursor` (empty for the first page) to page by keyset instead of
+    offset: the response is then `{"items": [...], "next_cursor": ...}` and
+    `next_cursor` is passed back as `cursor` for the next page.
+    """
+    if cursor is not None:
+        try:
+            items, next_cursor = await product_service.get_products_page(
+                db=db,
+                cursor=cursor,
+                limit=limit,
+                category=category,
+                is_active=is_active
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        return product_encoder.page_response(items, next_cursor)
+    
+    products = await product_service.get_products(
         db=db, 
         skip=skip, 
         limit=limit, 
         category=category, 
         is_active=is_active
     )
-    return products
+    return product_encoder.response(products)
 
 @router.get("/{product_id}", response_model=Product)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific product by ID"""
-    product = product_service.get_product(db=db, product_id=product_id)
+    product = await product_service.get_product(db=db, product_id=product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -38,49 +61,49 @@ async def get_product(product_id: int, db: Session = Depends(get_db)):
     return product
 
 @router.post("/", response_model=Product, status_code=status.HTTP_201_CREATED)
-async def create_product(product: ProductCreate, db: Session = Depends(get_db)):
+async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new product"""
     # Check if SKU already exists
-    existing_product = product_service.get_product_by_sku(db=db, sku=product.sku)
+    existing_product = await product_service.get_product_by_sku(db=db, sku=product.sku)
     if existing_product:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Product with this SKU already exists"
         )
     
-    return product_service.create_product(db=db, product=product)
+    return await product_service.create_product(db=db, product=product)
 
 @router.put("/{product_id}", response_model=Product)
 async def update_product(
     product_id: int, 
     product_update: ProductUpdate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a product"""
-    product = product_service.get_product(db=db, product_id=product_id)
+    product = await product_service.get_product(db=db, product_id=product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
     
-    return product_service.update_product(
+    return await product_service.update_product(
         db=db, 
         product_id=product_id, 
         product_update=product_update
     )
 
 @router.delete("/{product_id}")
-async def delete_product(product_id: int, db: Session = Depends(get_db)):
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a product (soft delete by setting is_active to False)"""
-    product = product_service.get_product(db=db, product_id=product_id)
+    product = await product_service.get_product(db=db, product_id=product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
     
-    product_service.delete_product(db=db, product_id=product_id)
+    await product_service.delete_product(db=db, product_id=product_id)
     return {"message": "Product deleted successfully"}
 
 @router.get("/category/{category}", response_model=List[Product])
@@ -88,10 +111,10 @@ async def get_products_by_category(
     category: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get products by category"""
-    products = product_service.get_products_by_category(
+    products = await product_service.get_products_by_category(
         db=db, 
         category=category, 
         skip=skip, 
@@ -100,9 +123,9 @@ async def get_products_by_category(
     return products
 
 @router.get("/low-stock/alert")
-async def get_low_stock_products(db: Session = Depends(get_db)):
+async def get_low_stock_products(db: AsyncSession = Depends(get_async_db)):
     """Get products with stock below reorder level"""
-    products = product_service.get_low_stock_products(db=db)
+    products = await product_service.get_low_stock_products(db=db)
     return {
         "count": len(products),
         "products": products
@@ -1,8 +1,14 @@
+import asyncio
+import weakref
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Callable, List
 from datetime import datetime
-from app.database.connection import get_db
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.database.connection import get_async_sessionmaker
+from app.database.partitions import sales_partitions
 from app.schemas.schemas import ReportRequest, ReportResponse, ReportType
 from app.services.genai_service import GenAIService
 from app.services.crud import sale_service, product_service, customer_service
@@ -13,12 +19,12 @@ genai_service = GenAIService()
 @router.post("/generate", response_model=ReportResponse)
 async def generate_report(
     request: ReportRequest,
-    db: Session = Depends(get_db)
+    sessions: async_sessionmaker = Depends(get_async_sessionmaker)
 ):
     """Generate an AI-powered natural language report"""
     try:
         # Get data based on report type
-        data = await get_report_data(db, request)
+        data = await get_report_data(sessions, request)
         
         # Generate report using GenAI
         report = await genai_service.generate_report(request.report_type, data)
@@ -66,12 +72,12 @@ async def get_report_types():
 @router.post("/ask")
 async def ask_business_question(
     question: str,
-    db: Session = Depends(get_db)
+    sessions: async_sessionmaker = Depends(get_async_sessionmaker)
 ):
     """Ask a natural language question about the business data"""
     try:
         # Get relevant data context
-        context = await get_business_context(db)
+        context = await get_business_context(sessions)
         
         # Generate answer using GenAI
         answer = await genai_service.answer_question(question, context)
@@ -88,125 +94,171 @@ async def ask_business_question(
             detail=f"Failed to answer question: {str(e)}"
         )
 
-async def get_report_data(db: Session, request: ReportRequest):
+# Caps how many report sub-queries hold a pooled connection at once; one
+# semaphore per event loop, created on first use inside that loop
+_query_slots = weakref.WeakKeyDictionary()
+
+def query_slots() -> asyncio.Semaphore:
+    """The report query semaphore of the running event loop"""
+    loop = asyncio.get_running_loop()
+    slots = _query_slots.get(loop)
+    if slots is None:
+        slots = _query_slots[loop] = asyncio.Semaphore(settings.REPORT_QUERY_CONCURRENCY)
+    return slots
+
+async def run_query(sessions: async_sessionmaker, query: Callable[[Session], Any]):
+    """Run one sync query function on its own session from `sessions`
+    
+    Independent sub-queries passed through asyncio.gather run concurrently,
+    so a report takes about as long as its slowest query.
+    """
+    async with query_slots():
+        async with sessions() as db:
+            return await db.run_sync(query)
+
+async def get_report_data(sessions: async_sessionmaker, request: ReportRequest):
     """Get data based on report type and filters"""
     from datetime import timedelta
     
-    # Default date range if not provided
-    end_date = request.end_date or datetime.now()
+    # Default date range if not provided (rounded up to the minute so it stays cacheable)
+    end_date = request.end_date or datetime.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
     start_date = request.start_date or (end_date - timedelta(days=30))
     
     if request.report_type == ReportType.SALES_SUMMARY:
-        return await get_sales_summary_data(db, start_date, end_date)
+        return await get_sales_summary_data(sessions, start_date, end_date)
     
     elif request.report_type == ReportType.INVENTORY_STATUS:
-        return await get_inventory_data(db)
+        return await get_inventory_data(sessions)
     
     elif request.report_type == ReportType.CUSTOMER_INSIGHTS:
-        return await get_customer_data(db, start_date, end_date)
+        return await get_customer_data(sessions, start_date, end_date)
     
     elif request.report_type == ReportType.PRODUCT_PERFORMANCE:
-        return await get_product_performance_data(db, start_date, end_date)
+        return await get_product_performance_data(sessions, start_date, end_date)
     
     else:
         raise ValueError(f"Unknown report type: {request.report_type}")
 
-async def get_sales_summary_data(db: Session, start_date: datetime, end_date: datetime):
+@response_cache.cached("reports/sales-summary")
+async def get_sales_summary_data(sessions: async_sessionmaker, start_date: datetime, end_date: datetime):
     """Get sales summary data"""
     from sqlalchemy import func, and_
     from app.database import models
     
-    # Total sales metrics
-    sales_metrics = db.query(
-        func.sum(models.Sale.final_amount).label('total_revenue'),
-        func.count(models.Sale.id).label('total_orders'),
-        func.avg(models.Sale.final_amount).label('avg_order_value')
-    ).filter(
-        and_(
-            models.Sale.sale_date >= start_date,
-            models.Sale.sale_date <= end_date
+    # Sales of the period, read from the partitions it overlaps
+    def period_sales(db: Session):
+        Sale = sales_partitions.source(db, start_date, end_date)
+        return Sale, and_(
+            Sale.sale_date >= start_date,
+            Sale.sale_date <= end_date
         )
-    ).first()
+    
+    # Total sales metrics
+    def sales_metrics(db: Session):
+        Sale, period_filter = period_sales(db)
+        return db.query(
+            func.sum(Sale.final_amount).label('total_revenue'),
+            func.count(Sale.id).label('total_orders'),
+            func.avg(Sale.final_amount).label('avg_order_value')
+        ).filter(period_filter).first()
     
     # Top products
-    top_products = db.query(
-        models.Product.name,
-        func.sum(models.Sale.quantity).label('quantity_sold'),
-        func.sum(models.Sale.final_amount).label('revenue')
-    ).join(models.Sale).filter(
-        and_(
-            models.Sale.sale_date >= start_date,
-            models.Sale.sale_date <= end_date
-        )
-    ).group_by(models.Product.id, models.Product.name).order_by(
-        func.sum(models.Sale.final_amount).desc()
-    ).limit(5).all()
+    def top_products(db: Session):
+        Sale, period_filter = period_sales(db)
+        return db.query(
+            models.Product.name,
+            func.sum(Sale.quantity).label('quantity_sold'),
+            func.sum(Sale.final_amount).label('revenue')
+        ).join(Sale, Sale.product_id == models.Product.id).filter(period_filter).group_by(
+            models.Product.id, models.Product.name
+        ).order_by(
+            func.sum(Sale.final_amount).desc()
+        ).limit(5).all()
     
     # Sales by category
-    category_sales = db.query(
-        models.Product.category,
-        func.sum(models.Sale.final_amount).label('revenue')
-    ).join(models.Sale).filter(
-        and_(
-            models.Sale.sale_date >= start_date,
-            models.Sale.sale_date <= end_date
-        )
-    ).group_by(models.Product.category).all()
+    def category_sales(db: Session):
+        Sale, period_filter = period_sales(db)
+        return db.query(
+            models.Product.category,
+            func.sum(Sale.final_amount).label('revenue')
+        ).join(Sale, Sale.product_id == models.Product.id).filter(period_filter).group_by(
+            models.Product.category
+        ).all()
+    
+    metrics, products, categories = await asyncio.gather(
+        run_query(sessions, sales_metrics),
+        run_query(sessions, top_products),
+        run_query(sessions, category_sales)
+    )
     
     return {
         "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
-        "total_revenue": float(sales_metrics.total_revenue or 0),
-        "total_orders": int(sales_metrics.total_orders or 0),
-        "avg_order_value": float(sales_metrics.avg_order_value or 0),
+        "total_revenue": float(metrics.total_revenue or 0),
+        "total_orders": int(metrics.total_orders or 0),
+        "avg_order_value": float(metrics.avg_order_value or 0),
         "top_products": [
             {
                 "name": product.name,
                 "quantity_sold": int(product.quantity_sold),
                 "revenue": float(product.revenue)
             }
-            for product in top_products
+            for product in products
         ],
         "category_sales": [
             {
                 "category": category.category,
                 "revenue": float(category.revenue)
             }
-            for category in category_sales
+            for category in categories
         ]
     }
 
-async def get_inventory_data(db: Session):
+@response_cache.cached("reports/inventory")
+async def get_inventory_data(sessions: async_sessionmaker):
     """Get inventory status data"""
-    from sqlalchemy import func
+    from sqlalchemy import func, and_
     from app.database import models
     
     # Inventory metrics
-    inventory_metrics = db.query(
-        func.count(models.Product.id).label('total_products'),
-        func.sum(models.Product.stock_quantity).label('total_stock'),
-        func.sum(models.Product.stock_quantity * models.Product.cost).label('inventory_value')
-    ).filter(models.Product.is_active == True).first()
+    def inventory_metrics(db: Session):
+        return db.query(
+            func.count(models.Product.id).label('total_products'),
+            func.sum(models.Product.stock_quantity).label('total_stock'),
+            func.sum(models.Product.stock_quantity * models.Product.cost).label('inventory_value')
+        ).filter(models.Product.is_active == True).first()
     
     # Low stock products
-    low_stock = db.query(models.Product).filter(
-        and_(
-            models.Product.stock_quantity <= models.Product.reorder_level,
-            models.Product.is_active == True
-        )
-    ).all()
+    def low_stock_products(db: Session):
+        return db.query(
+            models.Product.name,
+            models.Product.stock_quantity,
+            models.Product.reorder_level
+        ).filter(
+            and_(
+                models.Product.stock_quantity <= models.Product.reorder_level,
+                models.Product.is_active == True
+            )
+        ).all()
     
     # Stock by category
-    category_stock = db.query(
-        models.Product.category,
-        func.sum(models.Product.stock_quantity).label('total_stock')
-    ).filter(models.Product.is_active == True).group_by(
-        models.Product.category
-    ).all()
+    def category_stock(db: Session):
+        return db.query(
+            models.Product.category,
+            func.sum(models.Product.stock_quantity).label('total_stock')
+        ).filter(models.Product.is_active == True).group_by(
+            models.Product.category
+        ).all()
+    
+    metrics, low_stock, categories = await asyncio.gather(
+        run_query(sessions, inventory_metrics),
+        run_query(sessions, low_stock_products),
+        run_query(sessions, category_stock)
+    )
     
     return {
-        "total_products": int(inventory_metrics.total_products or 0),
-        "total_stock_units": int(inventory_metrics.total_stock or 0),
-        "inventory_value": float(inventory_metrics.inventory_value or 0),
+        "total_products": int(metrics.total_products or 0),
+        "total_stock_units": int(metrics.total_stock or 0),
+        "inventory_value": float(metrics.inventory_value or 0),
         "low_stock_products": [
             {
                 "name": product.name,
@@ -220,50 +272,62 @@ async def get_inventory_data(db: Session):
                 "category": category.category,
                 "total_stock": int(category.total_stock)
             }
-            for category in category_stock
+            for category in categories
         ]
     }
 
-async def get_customer_data(db: Session, start_date: datetime, end_date: datetime):
+@response_cache.cached("reports/customers")
+async def get_customer_data(sessions: async_sessionmaker, start_date: datetime, end_date: datetime):
     """Get customer insights data"""
     from sqlalchemy import func, and_
     from app.database import models
     
     # Customer metrics
-    total_customers = db.query(models.Customer).filter(
-        models.Customer.is_active == True
-    ).count()
+    def total_customers(db: Session):
+        return db.query(models.Customer).filter(
+            models.Customer.is_active == True
+        ).count()
     
     # New customers in period
-    new_customers = db.query(models.Customer).filter(
-        and_(
-            models.Customer.created_at >= start_date,
-            models.Customer.created_at <= end_date
-        )
-    ).count()
+    def new_customers(db: Session):
+        return db.query(models.Customer).filter(
+            and_(
+                models.Customer.created_at >= start_date,
+                models.Customer.created_at <= end_date
+            )
+        ).count()
     
     # Customer segments
-    segments = db.query(
-        models.Customer.customer_segment,
-        func.count(models.Customer.id).label('count'),
-        func.avg(models.Customer.total_spent).label('avg_spent')
-    ).filter(models.Customer.is_active == True).group_by(
-        models.Customer.customer_segment
-    ).all()
+    def customer_segments(db: Session):
+        return db.query(
+            models.Customer.customer_segment,
+            func.count(models.Customer.id).label('count'),
+            func.avg(models.Customer.total_spent).label('avg_spent')
+        ).filter(models.Customer.is_active == True).group_by(
+            models.Customer.customer_segment
+        ).all()
     
     # Top customers
-    top_customers = db.query(
-        models.Customer.first_name,
-        models.Customer.last_name,
-        models.Customer.total_spent,
-        models.Customer.total_orders
-    ).filter(models.Customer.is_active == True).order_by(
-        models.Customer.total_spent.desc()
-    ).limit(5).all()
+    def top_customers(db: Session):
+        return db.query(
+            models.Customer.first_name,
+            models.Customer.last_name,
+            models.Customer.total_spent,
+            models.Customer.total_orders
+        ).filter(models.Customer.is_active == True).order_by(
+            models.Customer.total_spent.desc()
+        ).limit(5).all()
+    
+    total, new, segments, customers = await asyncio.gather(
+        run_query(sessions, total_customers),
+        run_query(sessions, new_customers),
+        run_query(sessions, customer_segments),
+        run_query(sessions, top_customers)
+    )
     
     return {
-        "total_customers": total_customers,
-        "new_customers": new_customers,
+        "total_customers": total,
+        "new_customers": new,
         "customer_segments": [
             {
                 "segment": segment.customer_segment or "Unassigned",
@@ -278,27 +342,33 @@ async def get_customer_data(db: Session, start_date: datetime, end_date: datetim
                 "total_spent": float(customer.total_spent),
                 "total_orders": int(customer.total_orders)
             }
-            for customer in top_customers
+            for customer in customers
         ]
     }
 
-async def get_product_performance_data(db: Session, start_date: datetime, end_date: datetime):
+@response_cache.cached("reports/product-performance")
+async def get_product_performance_data(sessions: async_sessionmaker, start_date: datetime, end_date: datetime):
     """Get product performance data"""
     from sqlalchemy import func, and_
     from app.database import models
     
-    # Product performance
-    product_performance = db.query(
-        models.Product.name,
-        models.Product.category,
-        models.Product.price,
-        func.coalesce(func.sum(models.Sale.quantity), 0).label('units_sold'),
-        func.coalesce(func.sum(models.Sale.final_amount), 0).label('revenue')
-    ).outerjoin(
-        models.Sale,
-    ).filter(models.Product.is_active == True).group_by(
-        models.Product.id, models.Product.name, models.Product.category, models.Product.price
-    ).order_by(func.sum(models.Sale.final_amount).desc()).limit(10).all()
+    # Product performance (all-time sales, from every partition)
+    def product_performance(db: Session):
+        Sale = sales_partitions.source(db)
+        return db.query(
+            models.Product.name,
+            models.Product.category,
+            models.Product.price,
+            func.coalesce(func.sum(Sale.quantity), 0).label('units_sold'),
+            func.coalesce(func.sum(Sale.final_amount), 0).label('revenue')
+        ).outerjoin(
+            Sale,
+            Sale.product_id == models.Product.id
+        ).filter(models.Product.is_active == True).group_by(
+            models.Product.id, models.Product.name, models.Product.category, models.Product.price
+        ).order_by(func.sum(Sale.final_amount).desc()).limit(10).all()
+    
+    products = await run_query(sessions, product_performance)
     
     return {
         "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
@@ -310,21 +380,24 @@ async def get_product_performance_data(db: Session, start_date: datetime, end_da
                 "units_sold": int(product.units_sold),
                 "revenue": float(product.revenue)
             }
-            for product in product_performance
+            for product in products
         ]
     }
 
-async def get_business_context(db: Session):
+async def get_business_context(sessions: async_sessionmaker):
     """Get general business context for answering questions"""
     from datetime import timedelta
     
-    # Recent sales summary
-    end_date = datetime.now()
+    # Recent sales summary (rounded up to the minute so it stays cacheable)
+    end_date = datetime.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
     start_date = end_date - timedelta(days=7)
     
-    sales_data = await get_sales_summary_data(db, start_date, end_date)
-    inventory_data = await get_inventory_data(db)
-    customer_data = await get_customer_data(db, start_date, end_date)
+    # The three summaries are independent; their sub-queries all fan out together
+    sales_data, inventory_data, customer_data = await asyncio.gather(
+        get_sales_summary_data(sessions, start_date, end_date),
+        get_inventory_data(sessions),
+        get_customer_data(sessions, start_date, end_date)
+    )
     
     return {
         "recent_sales": sales_data,
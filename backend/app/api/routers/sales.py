@@ -1,14 +1,39 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime, timedelta
-from app.database.connection import get_db
-from app.schemas.schemas import Sale, SaleCreate
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import List, Optional, Tuple, Union
+from datetime import date, datetime, timedelta
+from app.core.config import settings
+from app.database.connection import get_async_db, get_async_sessionmaker
+from app.schemas.schemas import (
+    Sale, SalePage, SaleCreate, SaleBulkResult, ExportFormat, SalesSummary, SummaryGranularity
+)
+from app.schemas.encoders import sale_encoder
 from app.services.crud import sale_service
+from app.services.export_service import sales_exporter
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Sale])
+def sale_expand(
+    expand: Optional[str] = Query(
+        None,
+        description="Comma-separated relations to embed (product, customer); "
+                    "empty for ids only. Defaults to all."
+    )
+) -> Tuple[str, ...]:
+    """Parse the `expand` parameter shared by the sale endpoints"""
+    if expand is None:
+        return sale_service.RELATIONS
+    names = tuple(name.strip() for name in expand.split(",") if name.strip())
+    unknown = set(names) - set(sale_service.RELATIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot expand: {', '.join(sorted(unknown))}"
+        )
+    return names
+
+@router.get("/", response_model=Union[List[Sale], SalePage])
 async def get_sales(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
@@ -16,111 +41,209 @@ async def get_sales(
     end_date: Optional[datetime] = Query(None),
     customer_id: Optional[int] = Query(None),
     product_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    expand: Tuple[str, ...] = Depends(sale_expand),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all sales with optional filtering"""
-    sales = sale_service.get_sales(
+    """Get all sales with optional filtering
+    
+    Pass `cursor` (empty for the first page) to page by keyset instead of
+    offset: the response is then `{"items": [...], "next_cursor": ...}` and
+    `next_cursor` is passed back as `cursor` for the next page.
+    """
+    if cursor is not None:
+        try:
+            items, next_cursor = await sale_service.get_sales_page(
+                db=db,
+                cursor=cursor,
+                limit=limit,
+                start_date=start_date,
+                end_date=end_date,
+                customer_id=customer_id,
+                product_id=product_id,
+                expand=expand
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        return sale_encoder.page_response(items, next_cursor)
+    
+    sales = await sale_service.get_sales(
         db=db,
         skip=skip,
         limit=limit,
         start_date=start_date,
         end_date=end_date,
         customer_id=customer_id,
-        product_id=product_id
+        product_id=product_id,
+        expand=expand
+    )
+    return sale_encoder.response(sales)
+
+@router.get("/export")
+async def export_sales(
+    format: ExportFormat = Query(ExportFormat.CSV),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    sessions: async_sessionmaker = Depends(get_async_sessionmaker)
+):
+    """Stream all sales in a date range as CSV or NDJSON"""
+    return StreamingResponse(
+        sales_exporter.stream(sessions, format, start_date, end_date),
+        media_type=sales_exporter.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="sales.{format.value}"'}
     )
-    return sales
+
+@router.get("/summary", response_model=SalesSummary)
+async def get_sales_summary(
+    granularity: SummaryGranularity = Query(SummaryGranularity.DAY),
+    start: Optional[date] = Query(None, description="First day covered (default: 29 days before end)"),
+    end: Optional[date] = Query(None, description="Last day covered, inclusive (default: today)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Revenue, orders and average order value per day, week or month
+    
+    Every bucket from start to end is returned, zero-filled, from one
+    query; weeks are 7-day windows counted from `start`.
+    """
+    end = end or datetime.now().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end"
+        )
+    try:
+        buckets = sale_service.summary_bucket_count(granularity, start, end)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if buckets > settings.SALES_SUMMARY_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{buckets} buckets requested; at most {settings.SALES_SUMMARY_MAX_BUCKETS} per request"
+        )
+    return await sale_service.get_sales_summary(db=db, granularity=granularity, start=start, end=end)
 
 @router.get("/{sale_id}", response_model=Sale)
-async def get_sale(sale_id: int, db: Session = Depends(get_db)):
+async def get_sale(
+    sale_id: int,
+    expand: Tuple[str, ...] = Depends(sale_expand),
+    db: AsyncSession = Depends(get_async_db)
+):
     """Get a specific sale by ID"""
-    sale = sale_service.get_sale(db=db, sale_id=sale_id)
+    sale = await sale_service.get_sale(db=db, sale_id=sale_id, expand=expand)
     if not sale:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sale not found"
         )
-    return sale
+    # Unexpanded relations are unloaded; the encoder renders them as None
+    return sale_encoder.encode(sale)
 
 @router.post("/", response_model=Sale, status_code=status.HTTP_201_CREATED)
-async def create_sale(sale: SaleCreate, db: Session = Depends(get_db)):
+async def create_sale(sale: SaleCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new sale"""
     try:
-        return sale_service.create_sale(db=db, sale=sale)
+        return await sale_service.create_sale(db=db, sale=sale)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
 
+@router.post("/bulk", response_model=SaleBulkResult)
+async def create_sales_bulk(sales: List[SaleCreate], db: AsyncSession = Depends(get_async_db)):
+    """Create many sales in one transaction
+    
+    Rows that fail validation (unknown product or customer, insufficient
+    stock, duplicate transaction id) are listed in `errors` by index; all
+    other rows are created.
+    """
+    if len(sales) > settings.SALES_BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.SALES_BULK_MAX_ROWS} sales per request"
+        )
+    return await sale_service.create_sales_bulk(db=db, sales=sales)
+
 @router.get("/customer/{customer_id}", response_model=List[Sale])
 async def get_customer_sales(
     customer_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    expand: Tuple[str, ...] = Depends(sale_expand),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all sales for a specific customer"""
-    sales = sale_service.get_sales_by_customer(
+    sales = await sale_service.get_sales_by_customer(
         db=db,
         customer_id=customer_id,
         skip=skip,
-        limit=limit
+        limit=limit,
+        expand=expand
     )
-    return sales
+    return sale_encoder.response(sales)
 
 @router.get("/product/{product_id}", response_model=List[Sale])
 async def get_product_sales(
     product_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    expand: Tuple[str, ...] = Depends(sale_expand),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all sales for a specific product"""
-    sales = sale_service.get_sales_by_product(
+    sales = await sale_service.get_sales_by_product(
         db=db,
         product_id=product_id,
         skip=skip,
-        limit=limit
+        limit=limit,
+        expand=expand
     )
-    return sales
+    return sale_encoder.response(sales)
 
 @router.get("/daily/summary")
 async def get_daily_sales_summary(
     date: Optional[datetime] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get daily sales summary"""
+    """Get daily sales summary (one bucket of /summary)"""
     if not date:
         date = datetime.now().date()
     
-    summary = sale_service.get_daily_sales_summary(db=db, date=date)
+    summary = await sale_service.get_daily_sales_summary(db=db, date=date)
     return summary
 
 @router.get("/weekly/summary")
 async def get_weekly_sales_summary(
     week_start: Optional[datetime] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get weekly sales summary"""
+    """Get weekly sales summary (one bucket of /summary)"""
     if not week_start:
         # Start of current week (Monday)
         today = datetime.now().date()
         week_start = today - timedelta(days=today.weekday())
     
-    summary = sale_service.get_weekly_sales_summary(db=db, week_start=week_start)
+    summary = await sale_service.get_weekly_sales_summary(db=db, week_start=week_start)
     return summary
 
 @router.get("/monthly/summary")
 async def get_monthly_sales_summary(
     year: Optional[int] = Query(None),
     month: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get monthly sales summary"""
+    """Get monthly sales summary (one bucket of /summary)"""
     if not year or not month:
         now = datetime.now()
         year = year or now.year
         month = month or now.month
     
-    summary = sale_service.get_monthly_sales_summary(db=db, year=year, month=month)
+    summary = await sale_service.get_monthly_sales_summary(db=db, year=year, month=month)
     return summary
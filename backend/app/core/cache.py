@@ -0,0 +1,157 @@
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+from pydantic import BaseModel
+from starlette.responses import Response
+from app.core.config import settings
+
+_MISSING = object()
+
+class LRUCache:
+    """Thread-safe LRU cache with a per-entry TTL and hit/miss counters"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None, is_valid: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Get a live entry; expired entries and ones rejected by `is_valid` are misses"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if (
+                entry is not _MISSING
+                and entry[0] > time.monotonic()
+                and (is_valid is None or is_valid(entry[1]))
+            ):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+def _normalize(value: Any) -> Hashable:
+    """Turn endpoint parameters into a stable, hashable cache-key component"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return _normalize(value.model_dump())
+    if isinstance(value, dict):
+        return tuple(sorted((key, _normalize(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_normalize(item) for item in value)
+    return value
+
+class RenderedResponse(NamedTuple):
+    """What ResponseCache keeps of a Response: its bytes, status and headers"""
+    body: bytes
+    status_code: int
+    raw_headers: Tuple[Tuple[bytes, bytes], ...]
+
+    def response(self) -> Response:
+        response = Response(content=self.body, status_code=self.status_code)
+        response.raw_headers = list(self.raw_headers)
+        return response
+
+class ResponseCache(LRUCache):
+    """Response cache invalidated by a data-version counter
+
+    Write paths in app.services.crud call bump_data_version() after every
+    committed product, customer or sale change, and so does a customer
+    totals flush that applied deltas; entries computed under an
+    older version are treated as misses. The counter is per process, so
+    with several workers the TTL bounds how stale another worker can be.
+    Response objects are mutable (middleware adds headers and cookies), so
+    for those only the rendered bytes are kept and every hit gets a new
+    Response.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 300, enabled: bool = True):
+        super().__init__(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.enabled = enabled
+        self.data_version = 0
+        self._version_lock = threading.Lock()
+
+    def bump_data_version(self):
+        with self._version_lock:
+            self.data_version += 1
+
+    def cached(self, endpoint: str, ignore: Tuple[str, ...] = ("db", "sessions")) -> Callable:
+        """Cache an async function by endpoint name plus its normalized arguments"""
+        def decorator(fn):
+            signature = inspect.signature(fn)
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return await fn(*args, **kwargs)
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                params = tuple(sorted(
+                    (name, _normalize(value))
+                    for name, value in bound.arguments.items()
+                    if name not in ignore
+                ))
+                key = (endpoint, params)
+                version = self.data_version
+                entry = self.get(key, _MISSING, is_valid=lambda value: value[0] == version)
+                if entry is not _MISSING:
+                    value = entry[1]
+                    return value.response() if isinstance(value, RenderedResponse) else value
+                result = await fn(*args, **kwargs)
+                if isinstance(result, Response):
+                    self.set(key, (version, RenderedResponse(result.body, result.status_code, tuple(result.raw_headers))))
+                else:
+                    self.set(key, (version, result))
+                return result
+
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "enabled": self.enabled, "data_version": self.data_version}
+
+# Shared response cache for analytics and report data
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+    enabled=settings.RESPONSE_CACHE_ENABLED
+)
@@ -39,9 +39,72 @@ class Settings(BaseSettings):
             "https://retail-analytics-frontend.onrender.com"
         ]
     
+    # Database connection pool (ignored for in-memory SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    
+    # SQLite performance profile, applied to every new connection
+    SQLITE_PRAGMAS_ENABLED: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MB
+    SQLITE_CACHE_SIZE: int = -65536  # negative means KiB, so 64 MB
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    
+    # Analytics
+    # auto: the columnar store when loaded, else whole-day windows read the daily
+    # rollup and other windows do a fused scan of sales
+    SALES_OVERVIEW_STRATEGY: str = "auto"  # auto, columnar, rollup, fused
+    
+    # In-memory columnar copy of sales (requires NumPy)
+    COLUMNAR_STORE_ENABLED: bool = False
+    COLUMNAR_STORE_SYNC_SECONDS: int = 5
+    
+    # Response cache for analytics and report data
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RESPONSE_CACHE_MAX_ENTRIES: int = 512
+    
+    # Sales predictions cached in sales_predictions, with an in-process LRU in front
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_TTL_SECONDS: int = 3600
+    PREDICTION_CACHE_MAX_ENTRIES: int = 50000
+    
+    # Largest batch POST /sales/bulk accepts
+    SALES_BULK_MAX_ROWS: int = 5000
+    
+    # Most buckets GET /sales/summary returns (e.g. ~3 years of days)
+    SALES_SUMMARY_MAX_BUCKETS: int = 1100
+    
+    # Rows fetched per server-side cursor round trip by GET /sales/export
+    SALES_EXPORT_CHUNK_SIZE: int = 5000
+    
+    # Write-behind customer totals: sales append deltas, flushed in batched UPDATEs
+    CUSTOMER_TOTALS_WRITE_BEHIND: bool = False
+    CUSTOMER_TOTALS_FLUSH_INTERVAL_MS: int = 500
+    CUSTOMER_TOTALS_FLUSH_SALES: int = 1000  # Flush early after this many buffered sales
+    
+    # Monthly sales partitions (app/database/partitions.py), maintained at startup
+    # and then every SALES_PARTITION_MAINTENANCE_HOURS
+    SALES_PARTITION_MONTHS_AHEAD: int = 3  # PostgreSQL partitions created ahead of time
+    SALES_PARTITION_HOT_MONTHS: int = 2  # SQLite: months kept in `sales` before sealing
+    SALES_PARTITION_MAINTENANCE_HOURS: float = 6
+    SQLITE_SALES_PARTITIONING: bool = False  # SQLite: seal closed months too
+    
+    # Reports: independent sub-queries run concurrently, each on its own pooled session
+    REPORT_QUERY_CONCURRENCY: int = 4
+    
     # ML Models
     MODEL_PATH: str = "./models/"
     RETRAIN_INTERVAL_HOURS: int = 24
+    # In-process forecast scheduler (enable in one worker only): retrains every
+    # RETRAIN_INTERVAL_HOURS and precomputes forecasts for the active catalog.
+    # Also mounts the /ml routes.
+    FORECAST_SCHEDULER_ENABLED: bool = False
+    FORECAST_HORIZON_DAYS: int = 30
+    FORECAST_CHUNK_PRODUCTS: int = 500  # Products scored per model.predict call
 
 # Create settings instance
 settings = Settings()
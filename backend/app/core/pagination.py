@@ -0,0 +1,40 @@
+import base64
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor token"""
+    raw = json.dumps(position, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """Decode a cursor token produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        position = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict):
+        raise ValueError("Invalid cursor")
+    return position
+
+def cursor_position(token: str, **fields: Union[Type, Tuple[Type, ...]]) -> Dict[str, Any]:
+    """Decode a cursor token and check it carries the given fields with values of the given types
+
+    Anything else raises ValueError, so a tampered cursor is a 400 rather
+    than a KeyError or TypeError further down.
+    """
+    position = decode_cursor(token)
+    for key, types in fields.items():
+        value = position.get(key)
+        # JSON true/false decode to bool, which passes as an int
+        if not isinstance(value, types) or isinstance(value, bool):
+            raise ValueError("Invalid cursor")
+    return position
+
+def keyset_page(rows: List[Any], limit: int, position: Callable[[Any], Dict[str, Any]]) -> Tuple[List[Any], Optional[str]]:
+    """Split `limit + 1` fetched rows into a page and the cursor for the next one"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(position(rows[-1]))
@@ -0,0 +1,15 @@
+import orjson
+from fastapi.responses import ORJSONResponse
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson-rendered JSON; the app's default response class
+
+    UTC datetimes are written with a "Z" suffix, as Pydantic writes them, so
+    a payload looks the same whether it went through a response model or
+    through the row encoders in app.schemas.encoders.
+    """
+
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=self.OPTIONS)
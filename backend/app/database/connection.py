@@ -1,27 +1,73 @@
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, event, MetaData
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.core.config import settings
+from app.database.pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool
 import os
 
 # Configure engine based on database URL
 database_url = settings.DATABASE_URL
 
-# For SQLite, configure appropriate settings
-if database_url.startswith("sqlite"):
-    engine = create_engine(
-        database_url,
-        echo=settings.DEBUG,
-        connect_args={"check_same_thread": False}  # Needed for SQLite
-    )
-else:
-    # For PostgreSQL or other databases
-    engine = create_engine(
-        database_url,
-        echo=settings.DEBUG,
-        pool_pre_ping=True,
-        pool_recycle=300
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)"""
+    scheme, _, rest = url.partition("://")
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    if scheme in ("postgres", "postgresql") or scheme.startswith("postgresql+"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+def is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (url.partition("://")[2] in ("", "/") or ":memory:" in url)
+
+def engine_options(url: str, poolclass) -> dict:
+    """Engine keyword arguments for the configured pool profile"""
+    options = {"echo": settings.DEBUG}
+    if url.startswith("sqlite"):
+        if "aiosqlite" not in url:
+            options["connect_args"] = {"check_same_thread": False}  # Needed for SQLite
+        if is_memory_sqlite(url):
+            # Every pooled connection would open its own empty in-memory database
+            return options
+    else:
+        # For PostgreSQL or other databases
+        options.update(pool_pre_ping=True, pool_recycle=300)
+    options.update(
+        poolclass=poolclass,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS
     )
+    return options
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """Per-connection SQLite tuning: WAL lets readers run alongside the writer,
+    and synchronous=NORMAL only fsyncs the WAL at checkpoints"""
+    cursor = dbapi_connection.cursor()
+    for pragma in (
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE}"
+    ):
+        cursor.execute(pragma)
+    cursor.close()
+
+engine = create_engine(database_url, **engine_options(database_url, InstrumentedQueuePool))
+
+# Async engine used by the request handlers, so queries don't block the event loop
+async_database_url = get_async_database_url(database_url)
+async_engine = create_async_engine(
+    async_database_url,
+    **engine_options(async_database_url, InstrumentedAsyncQueuePool)
+)
+
+if database_url.startswith("sqlite") and settings.SQLITE_PRAGMAS_ENABLED:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(
@@ -30,6 +76,14 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Async sessions can't lazy-load or refresh implicitly, so loaded attributes
+# are kept after commit for serializing responses
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    expire_on_commit=False,
+    autoflush=False
+)
+
 # Create Base class for models
 Base = declarative_base()
 
@@ -40,3 +94,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency to get the async session factory, for endpoints that run
+# several queries concurrently, each on its own session
+def get_async_sessionmaker() -> async_sessionmaker:
+    return AsyncSessionLocal
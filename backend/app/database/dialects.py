@@ -0,0 +1,17 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_name(db) -> str:
+    """Get the dialect name ("sqlite", "postgresql", ...) a session or connection is bound to"""
+    return db.get_bind().dialect.name if hasattr(db, "get_bind") else db.dialect.name
+
+
+def is_postgres(db) -> bool:
+    return dialect_name(db) == "postgresql"
+
+
+def dialect_insert(db):
+    """Get the dialect-specific insert() that supports ON CONFLICT upserts"""
+    if is_postgres(db):
+        return postgresql.insert
+    return sqlite.insert
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.connection import Base
@@ -50,10 +50,25 @@ class Customer(Base):
 
 class Sale(Base):
     __tablename__ = "sales"
+    __table_args__ = (
+        # Date-range scans grouped by product; on Postgres the index also
+        # covers the summed columns, so revenue/units need no heap access
+        Index(
+            "ix_sales_sale_date_product_id", "sale_date", "product_id",
+            postgresql_include=["quantity", "final_amount"]
+        ),
+        # Per-customer and per-product history, newest first; these also
+        # serve plain customer_id / product_id lookups
+        Index("ix_sales_customer_id_sale_date", "customer_id", "sale_date"),
+        Index("ix_sales_product_id_sale_date", "product_id", "sale_date"),
+        # Sealing a month into its own table (app/database/partitions.py) may
+        # empty this one; AUTOINCREMENT keeps SQLite from reusing those ids
+        {"sqlite_autoincrement": True}
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
-    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Float, nullable=False)
     total_amount = Column(Float, nullable=False)
@@ -88,6 +103,11 @@ class Inventory(Base):
 
 class SalesPrediction(Base):
     __tablename__ = "sales_predictions"
+    # Prediction cache (app/services/prediction_cache.py): one row per
+    # product, predicted day (midnight) and model version
+    __table_args__ = (
+        Index("ux_sales_predictions_key", "product_id", "prediction_date", "model_version", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
@@ -95,7 +115,76 @@ class SalesPrediction(Base):
     predicted_quantity = Column(Float, nullable=False)
     confidence_score = Column(Float, nullable=True)
     model_version = Column(String(50), nullable=True)
+    # Feature store watermark the prediction was made from; rows from an
+    # older one are stale
+    features_through = Column(Date, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     product = relationship("Product")
+
+class SalesDailyRollup(Base):
+    __tablename__ = "sales_daily_rollup"
+    
+    # One row per (day, product); maintained by SaleService.create_sale and
+    # backfilled with `python manage.py rebuild-rollup`
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True, index=True)
+    revenue = Column(Float, nullable=False, default=0.0)
+    quantity = Column(Integer, nullable=False, default=0)
+    order_count = Column(Integer, nullable=False, default=0)
+    
+    # Relationships
+    product = relationship("Product")
+
+class CustomerStats(Base):
+    __tablename__ = "customer_stats"
+    
+    # One row per customer with sales; maintained by the sale write path
+    # (CustomerTotalsBuffer), backfilled by migration 0003 and recomputed
+    # with `python manage.py rebuild-customer-stats`
+    customer_id = Column(Integer, ForeignKey("customers.id"), primary_key=True)
+    total_spent = Column(Float, nullable=False, default=0.0)
+    total_orders = Column(Integer, nullable=False, default=0)
+    first_purchase_at = Column(DateTime(timezone=True), nullable=True)
+    last_purchase_at = Column(DateTime(timezone=True), nullable=True)
+
+class CustomerTotalDelta(Base):
+    __tablename__ = "customer_total_deltas"
+    
+    # Pending increments of customers.total_spent / total_orders and
+    # customer_stats in write-behind mode; appended by sales and folded in
+    # by CustomerTotalsBuffer.flush
+    id = Column(Integer, primary_key=True)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False, index=True)
+    spent = Column(Float, nullable=False)
+    orders = Column(Integer, nullable=False)
+    first_sale_date = Column(DateTime(timezone=True), nullable=True)
+    last_sale_date = Column(DateTime(timezone=True), nullable=True)
+
+class ProductDailyFeature(Base):
+    __tablename__ = "product_daily_features"
+    
+    # One row per (product, complete day with sales): the ML feature store,
+    # extended day by day by ProductFeatureStore.update and rebuilt with
+    # `python manage.py rebuild-features`
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    quantity = Column(Integer, nullable=False)
+    revenue = Column(Float, nullable=False)
+    unit_price = Column(Float, nullable=False)  # Mean over the day's sales
+    # Means over the product's last 7 / 30 days with sales
+    quantity_7d_avg = Column(Float, nullable=False)
+    quantity_30d_avg = Column(Float, nullable=False)
+    day_of_week = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    quarter = Column(Integer, nullable=False)
+    is_weekend = Column(Integer, nullable=False)
+
+class FeatureWatermark(Base):
+    __tablename__ = "feature_watermarks"
+    
+    # Last day a derived table has processed, by table name
+    name = Column(String(100), primary_key=True)
+    last_day = Column(Date, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
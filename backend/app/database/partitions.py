@@ -0,0 +1,352 @@
+import asyncio
+import re
+import threading
+from datetime import date, datetime, time, timezone
+from typing import Dict, List, Optional, Union
+from sqlalchemy import Index, MetaData, Table, and_, delete, func, insert, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from app.core.config import settings
+from app.database import models
+from app.database.dialects import dialect_name
+
+_MONTH_TABLE = re.compile(r"^sales_(\d{4})_(\d{2})$")
+
+def month_start(value: Union[date, datetime]) -> date:
+    return date(value.year, value.month, 1)
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def _day(value: Union[date, datetime]) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+def _midnight(month: date) -> datetime:
+    return datetime.combine(month, time.min)
+
+class SalesPartitionManager:
+    """Monthly partitions of the sales table
+
+    PostgreSQL: after migration 0002, `sales` is declaratively partitioned
+    by RANGE (sale_date) into `sales_YYYY_MM` tables plus `sales_default`.
+    The planner prunes partitions on sale_date, and ensure() creates
+    partitions ahead of time; start() runs it every `interval_hours`. Rows
+    of a month that had no partition yet are moved out of `sales_default`
+    when its partition is created.
+
+    SQLite has no native partitioning and can't route inserts through a
+    view, so `sales` stays the table new sales go to, and closed months are
+    sealed into `sales_YYYY_MM` tables (a one-time move per month). The
+    `sales_all` view unions everything for ad-hoc SQL; app queries use
+    source(), which unions `sales` with only the month tables the requested
+    range overlaps.
+
+    In both cases archive() detaches a month (DETACH PARTITION / view
+    rebuild) and renames it `sales_archive_YYYY_MM`, without deleting rows.
+    Month boundaries are UTC.
+    """
+
+    VIEW = "sales_all"
+
+    def __init__(self, months_ahead: int = 3, hot_months: int = 2, interval_hours: float = 6):
+        self.months_ahead = months_ahead
+        self.hot_months = hot_months
+        self.interval_hours = interval_hours
+        self._sessionmaker = None
+        self._task: Optional[asyncio.Task] = None
+        self._metadata = MetaData()
+        self._lock = threading.Lock()
+        # Sealed SQLite months, keyed by the schema version they were read at
+        self._schema_version: Optional[int] = None
+        self._sealed: List[date] = []
+
+    def partition_name(self, month: date) -> str:
+        return f"sales_{month:%Y_%m}"
+
+    def archive_name(self, month: date) -> str:
+        return f"sales_archive_{month:%Y_%m}"
+
+    # Reads
+
+    def source(self, db: Session, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None):
+        """The Sale entity to query for a sale_date range (None = unbounded)
+
+        Plain models.Sale unless SQLite month tables overlap the range; then
+        an alias of `sales` UNION ALL those tables, which maps to Sale
+        objects and columns the same way.
+        """
+        if dialect_name(db) != "sqlite":
+            return models.Sale
+        months = self._overlapping_months(db, start_date, end_date)
+        if not months:
+            return models.Sale
+        tables = [models.Sale.__table__] + [self._month_table(month) for month in months]
+        return aliased(models.Sale, union_all(*(select(*table.c) for table in tables)).subquery())
+
+    def tables(
+        self,
+        db: Session,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[Table]:
+        """The tables holding sales of a sale_date range, to read one by one
+
+        Sealed SQLite months overlapping the range, oldest first, then
+        `sales`; elsewhere just `sales`.
+        """
+        if dialect_name(db) != "sqlite":
+            return [models.Sale.__table__]
+        months = self._overlapping_months(db, start_date, end_date)
+        return [self._month_table(month) for month in months] + [models.Sale.__table__]
+
+    async def async_source(
+        self,
+        db: AsyncSession,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ):
+        """source() for an AsyncSession"""
+        if dialect_name(db) != "sqlite":
+            return models.Sale
+        return await db.run_sync(self.source, start_date, end_date)
+
+    def _overlapping_months(
+        self,
+        db: Session,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime]
+    ) -> List[date]:
+        return [
+            month for month in self._sealed_months(db)
+            if (start_date is None or next_month(month) > _day(start_date))
+            and (end_date is None or month <= _day(end_date))
+        ]
+
+    def _sealed_months(self, db: Session) -> List[date]:
+        # Sealing in another process changes the schema version, so a stale
+        # list is never used. The lock isn't held across the catalog query:
+        # under AsyncSession.run_sync that query yields to the event loop,
+        # where a concurrent caller would then block the loop on the lock.
+        connection = db.connection() if isinstance(db, Session) else db
+        version = connection.exec_driver_sql("PRAGMA schema_version").scalar()
+        with self._lock:
+            if version == self._schema_version:
+                return self._sealed
+        sealed = self._sqlite_months(connection)
+        with self._lock:
+            self._sealed, self._schema_version = sealed, version
+        return sealed
+
+    # Maintenance
+
+    def partitions(self, db: Session) -> Dict[str, List[str]]:
+        """Attached and archived month tables"""
+        connection = db.connection()
+        if dialect_name(db) == "postgresql":
+            attached = connection.exec_driver_sql(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'sales'::regclass ORDER BY c.relname"
+            ).scalars().all()
+            archived = connection.execute(text(
+                "SELECT relname FROM pg_class WHERE relkind = 'r' AND relname LIKE 'sales\\_archive\\_%' "
+                "ORDER BY relname"
+            )).scalars().all()
+        else:
+            attached = [self.partition_name(month) for month in self._sqlite_months(connection)]
+            archived = connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'sales\\_archive\\_%' ESCAPE '\\' "
+                "ORDER BY name"
+            ).scalars().all()
+        return {"attached": list(attached), "archived": list(archived)}
+
+    def ensure(self, db: Session, today: Optional[date] = None) -> List[str]:
+        """Create upcoming partitions (PostgreSQL) or seal closed months (SQLite)
+
+        Returns the partitions created or sealed. On PostgreSQL this is a
+        no-op until migration 0002 has partitioned the table.
+        """
+        current = month_start(today or datetime.now(timezone.utc))
+        if dialect_name(db) == "postgresql":
+            if not self._is_partitioned(db):
+                return []
+            created = []
+            existing = set(self.partitions(db)["attached"])
+            for offset in range(self.months_ahead + 1):
+                month = add_months(current, offset)
+                name = self.partition_name(month)
+                if name not in existing:
+                    self._create_partition(db, month, has_default="sales_default" in existing)
+                    created.append(name)
+            db.commit()
+            return created
+
+        # SQLite: everything older than the hot months leaves the write table
+        cutoff = add_months(current, 1 - self.hot_months)
+        oldest = db.execute(
+            select(func.min(models.Sale.sale_date)).where(models.Sale.sale_date < _midnight(cutoff))
+        ).scalar()
+        sealed = []
+        if oldest is not None:
+            month = month_start(oldest if isinstance(oldest, datetime) else datetime.fromisoformat(str(oldest)))
+            while month < cutoff:
+                if self.seal(db, month):
+                    sealed.append(self.partition_name(month))
+                month = next_month(month)
+        return sealed
+
+    async def start(self, sessionmaker):
+        """Run ensure() now and then every `interval_hours`; `sessionmaker` makes sync sessions"""
+        self._sessionmaker = sessionmaker
+        await asyncio.to_thread(self._maintain)
+        if not self._task:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop the maintenance loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval_hours * 3600)
+            await asyncio.to_thread(self._maintain)
+
+    def _maintain(self):
+        db = self._sessionmaker()
+        try:
+            changed = self.ensure(db)
+            if changed:
+                print(f"Sales partitions created or sealed: {', '.join(changed)}")
+        except Exception as e:
+            db.rollback()
+            print(f"Sales partition maintenance failed: {type(e).__name__}: {e}")
+        finally:
+            db.close()
+
+    def seal(self, db: Session, month: date) -> int:
+        """Move one month of sales from `sales` into its own table (SQLite); returns rows moved"""
+        if dialect_name(db) != "sqlite":
+            raise ValueError("Sealing applies to SQLite; PostgreSQL routes rows to partitions itself")
+        head = models.Sale.__table__
+        in_month = and_(head.c.sale_date >= _midnight(month), head.c.sale_date < _midnight(next_month(month)))
+        moving = db.execute(select(func.count(), func.max(head.c.id)).where(in_month)).one()
+        if not moving[0]:
+            return 0
+        if moving[1] == db.execute(select(func.max(head.c.id))).scalar() and not self._has_autoincrement(db):
+            # Without AUTOINCREMENT SQLite would hand that id out again
+            raise ValueError(
+                f"{self.partition_name(month)} holds the newest sale id and `sales` was created "
+                "without AUTOINCREMENT; record a newer sale first"
+            )
+        table = self._month_table(month)
+        table.create(db.connection(), checkfirst=True)
+        db.execute(insert(table).from_select(list(head.c.keys()), select(*head.c).where(in_month)))
+        db.execute(delete(head).where(in_month))
+        self._create_view(db)
+        db.commit()
+        return moving[0]
+
+    def archive(self, db: Session, month: date) -> str:
+        """Take a month out of `sales` as a metadata operation; returns the archive table"""
+        name, archive = self.partition_name(month), self.archive_name(month)
+        if dialect_name(db) == "postgresql":
+            if not self._is_partitioned(db):
+                raise ValueError("sales is not partitioned; run `alembic upgrade head` first")
+            if name not in self.partitions(db)["attached"]:
+                raise ValueError(f"No partition {name}")
+            db.execute(text(f'ALTER TABLE sales DETACH PARTITION "{name}"'))
+            db.execute(text(f'ALTER TABLE "{name}" RENAME TO "{archive}"'))
+            db.commit()
+            return archive
+
+        # Rows still in the write table are sealed first (the only data move)
+        self.seal(db, month)
+        if month not in self._sqlite_months(db.connection()):
+            raise ValueError(f"No sales in {month:%Y-%m}")
+        db.execute(text(f'ALTER TABLE "{name}" RENAME TO "{archive}"'))
+        self._create_view(db)
+        db.commit()
+        return archive
+
+    # Helpers
+
+    def _month_table(self, month: date) -> Table:
+        """A copy of the sales table definition named for one month"""
+        name = self.partition_name(month)
+        if name in self._metadata.tables:
+            return self._metadata.tables[name]
+        head = models.Sale.__table__
+        table = Table(name, self._metadata, *(column._copy() for column in head.columns))
+        # Single-column indexes come along with the columns; composite ones are copied
+        copied = {tuple(column.name for column in index.columns) for index in table.indexes}
+        for index in head.indexes:
+            columns = tuple(column.name for column in index.columns)
+            if columns not in copied:
+                Index(index.name.replace("ix_sales_", f"ix_{name}_", 1), *(table.c[c] for c in columns), unique=index.unique)
+        return table
+
+    def _sqlite_months(self, connection) -> List[date]:
+        names = connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'sales\\_%' ESCAPE '\\'"
+        ).scalars()
+        return sorted(
+            date(int(match.group(1)), int(match.group(2)), 1)
+            for match in map(_MONTH_TABLE.match, names) if match
+        )
+
+    def _create_view(self, db: Session):
+        tables = ["sales"] + [self.partition_name(month) for month in self._sqlite_months(db.connection())]
+        db.execute(text(f"DROP VIEW IF EXISTS {self.VIEW}"))
+        db.execute(text(
+            f"CREATE VIEW {self.VIEW} AS " + " UNION ALL ".join(f'SELECT * FROM "{table}"' for table in tables)
+        ))
+
+    def _has_autoincrement(self, db: Session) -> bool:
+        ddl = db.connection().exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'sales'").scalar()
+        return "AUTOINCREMENT" in (ddl or "").upper()
+
+    def _is_partitioned(self, db: Session) -> bool:
+        return db.connection().exec_driver_sql(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'sales'::regclass)"
+        ).scalar()
+
+    def _create_partition(self, db: Session, month: date, has_default: bool = True):
+        # Sales of a month without a partition land in sales_default, and
+        # PostgreSQL won't add a partition whose range the default partition
+        # holds rows of. Such rows are moved into a plain table that is then
+        # attached; the lock keeps new ones from arriving in between.
+        name = self.partition_name(month)
+        lower, upper = f"'{month.isoformat()} 00:00:00+00'", f"'{next_month(month).isoformat()} 00:00:00+00'"
+        bounds = f"FOR VALUES FROM ({lower}) TO ({upper})"
+        in_month = f"sale_date >= {lower} AND sale_date < {upper}"
+        if has_default:
+            db.execute(text("LOCK TABLE sales_default IN EXCLUSIVE MODE"))
+            stranded = db.execute(text(f"SELECT EXISTS (SELECT 1 FROM sales_default WHERE {in_month})")).scalar()
+        else:
+            stranded = False
+        if not stranded:
+            db.execute(text(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF sales {bounds}'))
+            return
+        columns = ", ".join(models.Sale.__table__.c.keys())
+        db.execute(text(f'CREATE TABLE "{name}" (LIKE sales INCLUDING DEFAULTS)'))
+        db.execute(text(
+            f"WITH moved AS (DELETE FROM sales_default WHERE {in_month} RETURNING {columns}) "
+            f'INSERT INTO "{name}" ({columns}) SELECT {columns} FROM moved'
+        ))
+        db.execute(text(f'ALTER TABLE sales ATTACH PARTITION "{name}" {bounds}'))
+
+# Create manager instance
+sales_partitions = SalesPartitionManager(
+    months_ahead=settings.SALES_PARTITION_MONTHS_AHEAD,
+    hot_months=settings.SALES_PARTITION_HOT_MONTHS,
+    interval_hours=settings.SALES_PARTITION_MAINTENANCE_HOURS
+)
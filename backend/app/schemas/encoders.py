@@ -0,0 +1,41 @@
+from typing import Any, Dict, Iterable, List, Optional, Type
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from app.core.responses import FastJSONResponse
+from app.schemas import schemas
+
+class RowEncoder:
+    """Encodes ORM rows as plain dicts shaped like a response schema
+
+    Rows read straight from the database already satisfy the schema, so hot
+    list endpoints use this instead of validating every row into a Pydantic
+    model; orjson then serializes the dicts directly.
+    """
+
+    def __init__(self, schema: Type[BaseModel], nested: Optional[Dict[str, "RowEncoder"]] = None):
+        self.nested = nested or {}
+        self.fields = tuple(name for name in schema.model_fields if name not in self.nested)
+
+    def encode(self, row) -> Dict[str, Any]:
+        item = {name: getattr(row, name) for name in self.fields}
+        # Relations that were not expanded are left unloaded and encode as None
+        unloaded = inspect(row).unloaded if self.nested else ()
+        for name, encoder in self.nested.items():
+            value = None if name in unloaded else getattr(row, name)
+            item[name] = None if value is None else encoder.encode(value)
+        return item
+
+    def encode_many(self, rows: Iterable) -> List[Dict[str, Any]]:
+        return [self.encode(row) for row in rows]
+
+    def response(self, rows: Iterable) -> FastJSONResponse:
+        """A JSON list response, bypassing response-model validation"""
+        return FastJSONResponse(self.encode_many(rows))
+
+    def page_response(self, rows: Iterable, next_cursor: Optional[str]) -> FastJSONResponse:
+        """A keyset page response ({"items", "next_cursor"})"""
+        return FastJSONResponse({"items": self.encode_many(rows), "next_cursor": next_cursor})
+
+product_encoder = RowEncoder(schemas.Product)
+customer_encoder = RowEncoder(schemas.Customer)
+sale_encoder = RowEncoder(schemas.Sale, nested={"product": product_encoder, "customer": customer_encoder})
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
 from enum import Enum
 
@@ -40,6 +40,10 @@ class Product(ProductBase):
     class Config:
         from_attributes = True
 
+class ProductPage(BaseModel):
+    items: List[Product]
+    next_cursor: Optional[str] = None
+
 # Customer Schemas
 class CustomerBase(BaseModel):
     first_name: str = Field(..., min_length=1, max_length=50)
@@ -82,6 +86,23 @@ class Customer(CustomerBase):
     class Config:
         from_attributes = True
 
+class CustomerPage(BaseModel):
+    items: List[Customer]
+    next_cursor: Optional[str] = None
+
+class CustomerStats(BaseModel):
+    total_spent: float
+    total_orders: int
+    avg_order_value: float
+    first_purchase_date: Optional[datetime] = None
+    last_purchase_date: Optional[datetime] = None
+
+class CustomerStatsItem(CustomerStats):
+    customer_id: int
+
+class CustomerStatsBatchRequest(BaseModel):
+    customer_ids: List[int] = Field(..., min_length=1, max_length=1000)
+
 # Sale Schemas
 class SaleBase(BaseModel):
     product_id: int
@@ -104,12 +125,50 @@ class Sale(SaleBase):
     sale_date: datetime
     transaction_id: str
     created_at: datetime
-    product: Product
-    customer: Customer
+    # None unless expanded (see the `expand` query parameter)
+    product: Optional[Product] = None
+    customer: Optional[Customer] = None
     
     class Config:
         from_attributes = True
 
+class SalePage(BaseModel):
+    items: List[Sale]
+    next_cursor: Optional[str] = None
+
+class SaleBulkError(BaseModel):
+    index: int
+    transaction_id: str
+    error: str
+
+class SaleBulkResult(BaseModel):
+    received: int
+    created: int
+    sale_ids: List[int]
+    errors: List[SaleBulkError]
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+class SummaryGranularity(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+class SalesSummaryBucket(BaseModel):
+    period_start: date
+    period_end: date  # Exclusive
+    total_revenue: float
+    total_orders: int
+    avg_order_value: float
+
+class SalesSummary(BaseModel):
+    granularity: SummaryGranularity
+    start: date
+    end: date
+    buckets: List[SalesSummaryBucket]
+
 # Analytics Schemas
 class SalesAnalytics(BaseModel):
     total_sales: float
@@ -120,6 +179,11 @@ class SalesAnalytics(BaseModel):
     sales_by_category: List[dict]
     sales_trend: List[dict]
 
+class ProductSortKey(str, Enum):
+    REVENUE = "revenue"
+    UNITS = "units"
+    TRANSACTIONS = "transactions"
+
 class PredictionRequest(BaseModel):
     product_id: int
     days_ahead: int = Field(default=7, ge=1, le=365)
@@ -132,6 +196,26 @@ class PredictionResponse(BaseModel):
     prediction_date: datetime
     model_version: str
 
+class BatchPredictionItem(BaseModel):
+    product_id: int
+    days_ahead: int
+    # Exactly one of these is set
+    prediction: Optional[PredictionResponse] = None
+    error: Optional[str] = None
+
+class DemandForecastPoint(BaseModel):
+    days_ahead: int
+    prediction_date: datetime
+    predicted_quantity: float
+    confidence_score: float
+
+class DemandForecast(BaseModel):
+    product_id: int
+    product_name: str
+    model_version: str
+    total_predicted_quantity: float
+    points: List[DemandForecastPoint]
+
 # Report Schemas
 class ReportType(str, Enum):
     SALES_SUMMARY = "sales_summary"
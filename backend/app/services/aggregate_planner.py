@@ -0,0 +1,382 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, and_, text, Date
+from typing import Dict, Any, Optional
+from datetime import datetime, time
+from collections import defaultdict
+from app.database import models
+from app.database.dialects import is_postgres
+from app.database.partitions import sales_partitions
+from app.core.config import settings
+from app.services.columnar_store import columnar_store, np
+
+# All five sales-overview sections from one pass over the filtered sales.
+# GROUPING() tells the sets apart; ROW_NUMBER() trims products and customers
+# to the top N before the dimension joins.
+FUSED_OVERVIEW_SQL = text("""
+WITH filtered AS (
+    SELECT s.id, s.product_id, s.customer_id, s.quantity, s.final_amount,
+           date(s.sale_date) AS day, p.category
+    FROM sales s
+    JOIN products p ON p.id = s.product_id
+    WHERE s.sale_date >= :start_date AND s.sale_date <= :end_date
+),
+grouped AS (
+    SELECT GROUPING(product_id) AS g_product,
+           GROUPING(customer_id) AS g_customer,
+           GROUPING(category) AS g_category,
+           GROUPING(day) AS g_day,
+           product_id, customer_id, category, day,
+           SUM(final_amount) AS revenue,
+           SUM(quantity) AS quantity,
+           COUNT(id) AS orders
+    FROM filtered
+    GROUP BY GROUPING SETS ((), (product_id), (customer_id), (category), (day))
+),
+ranked AS (
+    SELECT grouped.*,
+           ROW_NUMBER() OVER (
+               PARTITION BY g_product, g_customer, g_category, g_day
+               ORDER BY revenue DESC
+           ) AS rank
+    FROM grouped
+)
+SELECT r.g_product, r.g_customer, r.g_category, r.g_day,
+       r.category, r.day, r.revenue, r.quantity, r.orders, r.rank,
+       p.name AS product_name, p.category AS product_category,
+       c.first_name, c.last_name, c.email
+FROM ranked r
+LEFT JOIN products p ON r.g_product = 0 AND p.id = r.product_id
+LEFT JOIN customers c ON r.g_customer = 0 AND c.id = r.customer_id
+WHERE (r.g_product = 1 AND r.g_customer = 1) OR r.rank <= :top_n
+""")
+
+class SalesOverviewPlanner:
+    """Chooses how to compute the sales-overview aggregates for a window
+
+    - columnar: when the in-memory columnar store is loaded, every window is
+      answered from it with vectorized group-bys
+    - rollup: whole-day windows are served from sales_daily_rollup, unless
+      it has no rows for the window (e.g. it was never backfilled)
+    - fused: any other window is answered in a single pass over sales, with
+      GROUPING SETS on PostgreSQL and a streamed scan aggregated in Python
+      elsewhere
+    """
+
+    def __init__(self, top_n: int = 10, chunk_size: int = 10000):
+        self.top_n = top_n
+        self.chunk_size = chunk_size
+
+    def choose_strategy(self, start_date: datetime, end_date: datetime) -> str:
+        strategy = settings.SALES_OVERVIEW_STRATEGY
+        if strategy != "auto":
+            return strategy
+        if columnar_store.loaded:
+            return "columnar"
+        whole_days = start_date.time() == time.min and end_date.time() == time.max
+        return "rollup" if whole_days else "fused"
+
+    def run(
+        self,
+        db: Session,
+        start_date: datetime,
+        end_date: datetime,
+        strategy: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Compute the sales-overview sections for [start_date, end_date]"""
+        strategy = strategy or self.choose_strategy(start_date, end_date)
+        if strategy == "columnar":
+            return self.from_columnar(db, start_date, end_date)
+        if strategy == "rollup":
+            return self.from_rollup(db, start_date, end_date)
+        return self.fused(db, start_date, end_date)
+
+    def fused(self, db: Session, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Single pass over sales, in the form the dialect supports"""
+        if is_postgres(db):
+            return self.fused_grouping_sets(db, start_date, end_date)
+        return self.fused_stream(db, start_date, end_date)
+
+    def from_rollup(self, db: Session, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Read product, category and trend aggregates from the daily rollup"""
+        rollup = models.SalesDailyRollup
+        rollup_filter = and_(
+            rollup.day >= start_date.date(),
+            rollup.day <= end_date.date()
+        )
+
+        # Total sales and orders
+        sales_summary = db.query(
+            func.sum(rollup.revenue).label('total_sales'),
+            func.sum(rollup.order_count).label('total_orders')
+        ).filter(rollup_filter).first()
+
+        # No rollup rows: either no sales, or sales the rollup never saw
+        if sales_summary.total_orders is None:
+            return self.fused(db, start_date, end_date)
+
+        # Top products
+        top_products = db.query(
+            models.Product.name,
+            models.Product.category,
+            func.sum(rollup.quantity).label('total_quantity'),
+            func.sum(rollup.revenue).label('total_revenue')
+        ).join(rollup, rollup.product_id == models.Product.id).filter(
+            rollup_filter
+        ).group_by(
+            models.Product.id, models.Product.name, models.Product.category
+        ).order_by(
+            func.sum(rollup.revenue).desc()
+        ).limit(self.top_n).all()
+
+        # Top customers (not covered by the product-keyed rollup)
+        Sale = sales_partitions.source(db, start_date, end_date)
+        top_customers = db.query(
+            models.Customer.first_name,
+            models.Customer.last_name,
+            models.Customer.email,
+            func.sum(Sale.final_amount).label('total_spent'),
+            func.count(Sale.id).label('total_orders')
+        ).join(Sale, Sale.customer_id == models.Customer.id).filter(
+            and_(
+                Sale.sale_date >= start_date,
+                Sale.sale_date <= end_date
+            )
+        ).group_by(
+            models.Customer.id, models.Customer.first_name,
+            models.Customer.last_name, models.Customer.email
+        ).order_by(
+            func.sum(Sale.final_amount).desc()
+        ).limit(self.top_n).all()
+
+        # Sales by category
+        sales_by_category = db.query(
+            models.Product.category,
+            func.sum(rollup.revenue).label('total_revenue'),
+            func.sum(rollup.quantity).label('total_quantity')
+        ).join(rollup, rollup.product_id == models.Product.id).filter(
+            rollup_filter
+        ).group_by(models.Product.category).all()
+
+        # Sales trend (daily)
+        sales_trend = db.query(
+            rollup.day.label('date'),
+            func.sum(rollup.revenue).label('revenue'),
+            func.sum(rollup.order_count).label('orders')
+        ).filter(rollup_filter).group_by(rollup.day).order_by(rollup.day).all()
+
+        return self._overview(
+            total_sales=float(sales_summary.total_sales or 0),
+            total_orders=int(sales_summary.total_orders or 0),
+            top_products=[
+                (p.name, p.category, p.total_quantity, p.total_revenue) for p in top_products
+            ],
+            top_customers=[
+                (c.first_name, c.last_name, c.email, c.total_spent, c.total_orders) for c in top_customers
+            ],
+            sales_by_category=[
+                (c.category, c.total_revenue, c.total_quantity) for c in sales_by_category
+            ],
+            sales_trend=[(t.date, t.revenue, t.orders) for t in sales_trend]
+        )
+
+    def fused_grouping_sets(self, db: Session, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Single-statement plan for PostgreSQL"""
+        rows = db.execute(FUSED_OVERVIEW_SQL, {
+            "start_date": start_date,
+            "end_date": end_date,
+            "top_n": self.top_n
+        }).all()
+
+        total_sales, total_orders = 0.0, 0
+        top_products, top_customers, sales_by_category, sales_trend = [], [], [], []
+        for row in sorted(rows, key=lambda r: r.rank):
+            if row.g_product == 0:
+                top_products.append((row.product_name, row.product_category, row.quantity, row.revenue))
+            elif row.g_customer == 0:
+                top_customers.append((row.first_name, row.last_name, row.email, row.revenue, row.orders))
+            elif row.g_category == 0:
+                sales_by_category.append((row.category, row.revenue, row.quantity))
+            elif row.g_day == 0:
+                sales_trend.append((row.day, row.revenue, row.orders))
+            else:
+                total_sales, total_orders = float(row.revenue or 0), int(row.orders or 0)
+
+        sales_trend.sort(key=lambda t: t[0])
+        return self._overview(
+            total_sales, total_orders, top_products, top_customers, sales_by_category, sales_trend
+        )
+
+    def fused_stream(self, db: Session, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Single streamed scan aggregated in Python (SQLite and other dialects)"""
+        Sale = sales_partitions.source(db, start_date, end_date)
+        stmt = select(
+            Sale.product_id,
+            Sale.customer_id,
+            Sale.quantity,
+            Sale.final_amount,
+            func.date(Sale.sale_date, type_=Date).label('day')
+        ).where(
+            and_(
+                Sale.sale_date >= start_date,
+                Sale.sale_date <= end_date
+            )
+        ).execution_options(yield_per=self.chunk_size)
+
+        total_sales, total_orders = 0.0, 0
+        by_product = defaultdict(lambda: [0, 0.0])
+        by_customer = defaultdict(lambda: [0.0, 0])
+        by_day = defaultdict(lambda: [0.0, 0])
+        for partition in db.execute(stmt).partitions():
+            for product_id, customer_id, quantity, amount, day in partition:
+                total_sales += amount
+                total_orders += 1
+                product = by_product[product_id]
+                product[0] += quantity
+                product[1] += amount
+                customer = by_customer[customer_id]
+                customer[0] += amount
+                customer[1] += 1
+                trend = by_day[day]
+                trend[0] += amount
+                trend[1] += 1
+
+        # Dimension lookups: the catalog for categories, customers only for the top N
+        catalog = {
+            row.id: row for row in db.query(
+                models.Product.id, models.Product.name, models.Product.category
+            ).all()
+        }
+        by_category = defaultdict(lambda: [0.0, 0])
+        for product_id, (quantity, revenue) in by_product.items():
+            if product_id in catalog:
+                category = by_category[catalog[product_id].category]
+                category[0] += revenue
+                category[1] += quantity
+
+        ranked_products = sorted(
+            (item for item in by_product.items() if item[0] in catalog),
+            key=lambda item: item[1][1], reverse=True
+        )[:self.top_n]
+        ranked_customers = sorted(by_customer.items(), key=lambda item: item[1][0], reverse=True)[:self.top_n]
+        customers = {
+            row.id: row for row in db.query(
+                models.Customer.id, models.Customer.first_name,
+                models.Customer.last_name, models.Customer.email
+            ).filter(models.Customer.id.in_([customer_id for customer_id, _ in ranked_customers])).all()
+        }
+
+        return self._overview(
+            total_sales=total_sales,
+            total_orders=total_orders,
+            top_products=[
+                (catalog[product_id].name, catalog[product_id].category, quantity, revenue)
+                for product_id, (quantity, revenue) in ranked_products
+            ],
+            top_customers=[
+                (customers[customer_id].first_name, customers[customer_id].last_name,
+                 customers[customer_id].email, spent, orders)
+                for customer_id, (spent, orders) in ranked_customers
+                if customer_id in customers
+            ],
+            sales_by_category=[
+                (category, revenue, quantity) for category, (revenue, quantity) in by_category.items()
+            ],
+            sales_trend=[(day, revenue, orders) for day, (revenue, orders) in sorted(by_day.items())]
+        )
+
+    def from_columnar(self, db: Session, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Vectorized group-bys over the in-memory columnar store"""
+        columnar_store.catch_up(db)
+        total_sales, total_orders = columnar_store.totals(start_date, end_date)
+
+        # Products: per-id sums via bincount, categories folded through an id -> code map
+        catalog = db.query(models.Product.id, models.Product.name, models.Product.category).all()
+        length = max((row.id for row in catalog), default=0) + 1
+        by_product = columnar_store.totals_by("product_id", start_date, end_date, length=length)
+        categories = sorted({row.category for row in catalog})
+        category_codes = np.full(len(by_product["revenue"]), -1, dtype=np.int32)
+        names = {}
+        for row in catalog:
+            category_codes[row.id] = categories.index(row.category)
+            names[row.id] = row
+        known = (category_codes >= 0) & (by_product["count"] > 0)
+        category_revenue = np.bincount(category_codes[known], weights=by_product["revenue"][known], minlength=len(categories))
+        category_quantity = np.bincount(category_codes[known], weights=by_product["quantity"][known], minlength=len(categories))
+        product_order = np.argsort(-np.where(known, by_product["revenue"], -np.inf), kind="stable")[:self.top_n]
+
+        by_customer = columnar_store.totals_by("customer_id", start_date, end_date)
+        customer_order = [
+            int(i) for i in np.argsort(-by_customer["revenue"], kind="stable")[:self.top_n]
+            if by_customer["count"][i] > 0
+        ]
+        customers = {
+            row.id: row for row in db.query(
+                models.Customer.id, models.Customer.first_name,
+                models.Customer.last_name, models.Customer.email
+            ).filter(models.Customer.id.in_(customer_order)).all()
+        }
+
+        days, day_revenue, day_orders = columnar_store.daily_trend(start_date, end_date)
+        return self._overview(
+            total_sales=total_sales,
+            total_orders=total_orders,
+            top_products=[
+                (names[i].name, names[i].category, by_product["quantity"][i], by_product["revenue"][i])
+                for i in map(int, product_order) if known[i]
+            ],
+            top_customers=[
+                (customers[i].first_name, customers[i].last_name, customers[i].email,
+                 by_customer["revenue"][i], by_customer["count"][i])
+                for i in customer_order if i in customers
+            ],
+            sales_by_category=[
+                (category, category_revenue[code], category_quantity[code])
+                for code, category in enumerate(categories) if category_quantity[code] or category_revenue[code]
+            ],
+            sales_trend=list(zip(days.astype(object), day_revenue, day_orders))
+        )
+
+    def _overview(self, total_sales, total_orders, top_products, top_customers, sales_by_category, sales_trend):
+        """Shape aggregate tuples into the SalesAnalytics payload"""
+        return {
+            "total_sales": total_sales,
+            "total_orders": total_orders,
+            "average_order_value": total_sales / total_orders if total_orders else 0.0,
+            "top_products": [
+                {
+                    "name": name,
+                    "category": category,
+                    "total_quantity": int(quantity),
+                    "total_revenue": float(revenue)
+                }
+                for name, category, quantity, revenue in top_products
+            ],
+            "top_customers": [
+                {
+                    "name": f"{first_name} {last_name}",
+                    "email": email,
+                    "total_spent": float(spent),
+                    "total_orders": int(orders)
+                }
+                for first_name, last_name, email, spent, orders in top_customers
+            ],
+            "sales_by_category": [
+                {
+                    "category": category,
+                    "total_revenue": float(revenue),
+                    "total_quantity": int(quantity)
+                }
+                for category, revenue, quantity in sales_by_category
+            ],
+            "sales_trend": [
+                {
+                    "date": day.isoformat(),
+                    "revenue": float(revenue),
+                    "orders": int(orders)
+                }
+                for day, revenue, orders in sales_trend
+            ]
+        }
+
+# Create planner instance
+sales_overview_planner = SalesOverviewPlanner()
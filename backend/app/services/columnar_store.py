@@ -0,0 +1,255 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from app.database import models
+from app.database.partitions import sales_partitions
+from app.core.config import settings
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional for the API (see requirements.txt)
+    np = None
+
+def _naive(value: datetime) -> datetime:
+    """Drop tzinfo so SQLite and PostgreSQL timestamps land in one datetime64 column"""
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+class _DictionaryColumn:
+    """Dictionary-encoded string column: int16 codes plus the distinct values"""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = []
+        self._codes_by_value: Dict[Optional[str], int] = {}
+
+    def encode(self, values: Sequence[Optional[str]]):
+        codes = np.empty(len(values), dtype=np.int16)
+        for i, value in enumerate(values):
+            code = self._codes_by_value.get(value)
+            if code is None:
+                code = self._codes_by_value[value] = len(self.values)
+                self.values.append(value)
+            codes[i] = code
+        return codes
+
+class ColumnarSalesStore:
+    """In-memory, column-oriented copy of the sales table for dashboard group-bys
+
+    Rows are kept ordered by sale_date so a date window is a contiguous slice
+    found with np.searchsorted. Group-bys are np.bincount over the id columns
+    and np.add.reduceat over day boundaries.
+
+    The store is loaded once at startup (COLUMNAR_STORE_ENABLED) and appended
+    to by SaleService.create_sale. Sales written by other workers are picked
+    up by catch_up(), at most every COLUMNAR_STORE_SYNC_SECONDS; catch-up
+    follows the sale id, so a sale committed after a higher id was already
+    seen is only picked up by the next load().
+    """
+
+    COLUMNS = ("product_id", "customer_id", "quantity", "sale_date", "final_amount", "channel", "store")
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.size = 0
+        self.max_sale_id = 0
+        self.last_sync = 0.0
+        self._needs_sort = False
+        self._capacity = initial_capacity
+        self.channels = _DictionaryColumn()
+        self.stores = _DictionaryColumn()
+        if np is not None:
+            self._allocate(initial_capacity)
+
+    @property
+    def available(self) -> bool:
+        return np is not None
+
+    def _allocate(self, capacity: int):
+        self.product_id = np.zeros(capacity, dtype=np.int32)
+        self.customer_id = np.zeros(capacity, dtype=np.int32)
+        self.quantity = np.zeros(capacity, dtype=np.int32)
+        self.sale_date = np.zeros(capacity, dtype="datetime64[us]")
+        self.final_amount = np.zeros(capacity, dtype=np.float32)
+        self.channel = np.zeros(capacity, dtype=np.int16)
+        self.store = np.zeros(capacity, dtype=np.int16)
+        self._capacity = capacity
+
+    def _grow(self, needed: int):
+        """Amortized doubling so appends stay O(1)"""
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, self._capacity * 2)
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+        self._capacity = capacity
+
+    def _rows_select(self, Sale):
+        return select(
+            Sale.id,
+            Sale.product_id,
+            Sale.customer_id,
+            Sale.quantity,
+            Sale.sale_date,
+            Sale.final_amount,
+            Sale.sales_channel,
+            Sale.store_location
+        )
+
+    def load(self, db: Session, chunk_size: int = 100000):
+        """(Re)load the whole sales table, streamed in chunks"""
+        if not self.available:
+            raise RuntimeError("NumPy is required for the columnar store")
+        with self._lock:
+            self.size = 0
+            self.max_sale_id = 0
+            self.channels = _DictionaryColumn()
+            self.stores = _DictionaryColumn()
+            self._allocate(self._capacity)
+            Sale = sales_partitions.source(db)
+            stmt = self._rows_select(Sale).order_by(Sale.sale_date).execution_options(yield_per=chunk_size)
+            for partition in db.execute(stmt).partitions():
+                self.append_rows(partition, skip_seen=False)
+            self.loaded = True
+            self.last_sync = time.monotonic()
+
+    def catch_up(self, db: Session, force: bool = False):
+        """Append sales committed elsewhere (e.g. by another worker) since the last sync"""
+        if not self.loaded:
+            return
+        if not force and time.monotonic() - self.last_sync < settings.COLUMNAR_STORE_SYNC_SECONDS:
+            return
+        with self._lock:
+            Sale = sales_partitions.source(db)
+            rows = db.execute(
+                self._rows_select(Sale).where(Sale.id > self.max_sale_id).order_by(Sale.id)
+            ).all()
+            self.append_rows(rows)
+            self.last_sync = time.monotonic()
+
+    def append_sale(self, sale: models.Sale):
+        """Append one freshly committed sale"""
+        if self.loaded:
+            self.append_rows([(
+                sale.id, sale.product_id, sale.customer_id, sale.quantity,
+                sale.sale_date, sale.final_amount, sale.sales_channel, sale.store_location
+            )])
+
+    def append_rows(self, rows: Sequence[Tuple], skip_seen: bool = True):
+        """Append (id, product_id, customer_id, quantity, sale_date, final_amount, channel, store) rows"""
+        if not rows:
+            return
+        with self._lock:
+            sale_ids, product_ids, customer_ids, quantities, dates, amounts, channels, stores = zip(*rows)
+            if skip_seen and min(sale_ids) <= self.max_sale_id:
+                # Already seen (e.g. a catch-up racing an append)
+                fresh = [row for row in rows if row[0] > self.max_sale_id]
+                if not fresh:
+                    return
+                sale_ids, product_ids, customer_ids, quantities, dates, amounts, channels, stores = zip(*fresh)
+            start, count = self.size, len(sale_ids)
+            self._grow(start + count)
+            end = start + count
+            self.product_id[start:end] = product_ids
+            self.customer_id[start:end] = customer_ids
+            self.quantity[start:end] = quantities
+            self.sale_date[start:end] = np.array([_naive(d) for d in dates], dtype="datetime64[us]")
+            self.final_amount[start:end] = amounts
+            self.channel[start:end] = self.channels.encode(channels)
+            self.store[start:end] = self.stores.encode(stores)
+            if start and self.sale_date[start] < self.sale_date[start - 1]:
+                self._needs_sort = True
+            elif count > 1 and np.any(np.diff(self.sale_date[start:end]) < np.timedelta64(0, "us")):
+                self._needs_sort = True
+            self.size = end
+            self.max_sale_id = max(self.max_sale_id, max(sale_ids))
+
+    def _ensure_sorted(self):
+        if self._needs_sort:
+            order = np.argsort(self.sale_date[:self.size], kind="stable")
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                column[:self.size] = column[:self.size][order]
+            self._needs_sort = False
+
+    def _window(self, start_date: Optional[datetime], end_date: Optional[datetime]) -> slice:
+        """Row slice for sale_date in [start_date, end_date]"""
+        self._ensure_sorted()
+        dates = self.sale_date[:self.size]
+        lo = 0 if start_date is None else int(np.searchsorted(dates, np.datetime64(_naive(start_date), "us"), side="left"))
+        hi = self.size if end_date is None else int(np.searchsorted(dates, np.datetime64(_naive(end_date), "us"), side="right"))
+        return slice(lo, max(lo, hi))
+
+    def totals(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Tuple[float, int]:
+        """Revenue and order count for the window"""
+        with self._lock:
+            window = self._window(start_date, end_date)
+            return float(self.final_amount[window].sum(dtype=np.float64)), window.stop - window.start
+
+    def totals_by(
+        self,
+        key: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        length: int = 0
+    ) -> Dict[str, Any]:
+        """Quantity, revenue and count per value of an integer column (product_id,
+        customer_id, channel or store), as arrays indexed by that value"""
+        with self._lock:
+            window = self._window(start_date, end_date)
+            keys = getattr(self, key)[window]
+            size = max(length, int(keys.max()) + 1 if keys.size else 0)
+            return {
+                "quantity": np.bincount(keys, weights=self.quantity[window], minlength=size),
+                "revenue": np.bincount(keys, weights=self.final_amount[window], minlength=size),
+                "count": np.bincount(keys, minlength=size)
+            }
+
+    def daily_trend(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None):
+        """(days, revenue, orders) for each day with sales in the window"""
+        with self._lock:
+            window = self._window(start_date, end_date)
+            days = self.sale_date[window].astype("datetime64[D]")
+            if not days.size:
+                return days, np.zeros(0), np.zeros(0, dtype=np.int64)
+            # Rows are date-ordered, so each day is one contiguous run
+            starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+            revenue = np.add.reduceat(self.final_amount[window].astype(np.float64), starts)
+            orders = np.diff(np.r_[starts, days.size])
+            return days[starts], revenue, orders
+
+    def memory_footprint(self) -> Dict[str, Any]:
+        """Bytes used per column, for the used rows and the allocated capacity"""
+        if not self.available:
+            return {"available": False, "loaded": False}
+        with self._lock:
+            columns = {}
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                columns[name] = {
+                    "dtype": str(column.dtype),
+                    "used_bytes": int(column.itemsize * self.size),
+                    "allocated_bytes": int(column.nbytes)
+                }
+            dictionaries = {
+                "channel": len(self.channels.values),
+                "store": len(self.stores.values)
+            }
+            return {
+                "available": True,
+                "loaded": self.loaded,
+                "rows": self.size,
+                "capacity": self._capacity,
+                "columns": columns,
+                "dictionary_sizes": dictionaries,
+                "used_bytes": sum(c["used_bytes"] for c in columns.values()),
+                "allocated_bytes": sum(c["allocated_bytes"] for c in columns.values())
+            }
+
+# Shared columnar store, loaded at startup when COLUMNAR_STORE_ENABLED is set
+columnar_store = ColumnarSalesStore()
@@ -1,310 +1,632 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-from typing import List, Optional
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, raiseload
+from sqlalchemy import select, insert, bindparam, type_coerce, String, Date, and_, or_, func
+from typing import List, Optional, Sequence
+from datetime import date, datetime, time, timedelta
+from bisect import bisect_right
+from collections import defaultdict
 from app.database import models
 from app.schemas import schemas
+from app.core.cache import response_cache
+from app.core.pagination import cursor_position, keyset_page
+from app.database.dialects import dialect_name
+from app.database.partitions import sales_partitions, add_months, month_start, next_month
+from app.services.rollup_service import rollup_service
+from app.services.columnar_store import columnar_store
+from app.services.customer_totals import customer_totals
 
 class ProductService:
-    def get_product(self, db: Session, product_id: int):
-        return db.query(models.Product).filter(models.Product.id == product_id).first()
+    async def get_product(self, db: AsyncSession, product_id: int):
+        result = await db.execute(select(models.Product).where(models.Product.id == product_id))
+        return result.scalars().first()
     
-    def get_product_by_sku(self, db: Session, sku: str):
-        return db.query(models.Product).filter(models.Product.sku == sku).first()
+    async def get_product_by_sku(self, db: AsyncSession, sku: str):
+        result = await db.execute(select(models.Product).where(models.Product.sku == sku))
+        return result.scalars().first()
     
-    def get_products(
-        self, 
-        db: Session, 
-        skip: int = 0, 
+    async def get_products(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        category: Optional[str] = None,
+        is_active: Optional[bool] = None
+    ):
+        query = self._filter_products(select(models.Product), category, is_active)
+        result = await db.execute(query.order_by(models.Product.id).offset(skip).limit(limit))
+        return result.scalars().all()
+    
+    async def get_products_page(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
         limit: int = 100,
         category: Optional[str] = None,
         is_active: Optional[bool] = None
     ):
-        query = db.query(models.Product)
+        """Keyset page of products ordered by id, plus the cursor for the next page"""
+        query = self._filter_products(select(models.Product), category, is_active)
+        if cursor:
+            query = query.where(models.Product.id > cursor_position(cursor, id=int)["id"])
         
+        result = await db.execute(query.order_by(models.Product.id).limit(limit + 1))
+        return keyset_page(result.scalars().all(), limit, lambda product: {"id": product.id})
+    
+    def _filter_products(self, query, category: Optional[str], is_active: Optional[bool]):
         if category:
-            query = query.filter(models.Product.category == category)
+            query = query.where(models.Product.category == category)
         if is_active is not None:
-            query = query.filter(models.Product.is_active == is_active)
-            
-        return query.offset(skip).limit(limit).all()
+            query = query.where(models.Product.is_active == is_active)
+        return query
     
-    def get_products_by_category(
-        self, 
-        db: Session, 
-        category: str, 
-        skip: int = 0, 
+    async def get_products_by_category(
+        self,
+        db: AsyncSession,
+        category: str,
+        skip: int = 0,
         limit: int = 100
     ):
-        return db.query(models.Product).filter(
-            models.Product.category == category,
-            models.Product.is_active == True
-        ).offset(skip).limit(limit).all()
-    
-    def get_low_stock_products(self, db: Session):
-        return db.query(models.Product).filter(
-            models.Product.stock_quantity <= models.Product.reorder_level,
-            models.Product.is_active == True
-        ).all()
-    
-    def create_product(self, db: Session, product: schemas.ProductCreate):
+        result = await db.execute(
+            select(models.Product).where(
+                models.Product.category == category,
+                models.Product.is_active == True
+            ).offset(skip).limit(limit)
+        )
+        return result.scalars().all()
+    
+    async def get_low_stock_products(self, db: AsyncSession):
+        result = await db.execute(
+            select(models.Product).where(
+                models.Product.stock_quantity <= models.Product.reorder_level,
+                models.Product.is_active == True
+            )
+        )
+        return result.scalars().all()
+    
+    async def create_product(self, db: AsyncSession, product: schemas.ProductCreate):
         db_product = models.Product(**product.dict())
         db.add(db_product)
-        db.commit()
-        db.refresh(db_product)
+        await db.commit()
+        response_cache.bump_data_version()
+        await db.refresh(db_product)
         return db_product
     
-    def update_product(
-        self, 
-        db: Session, 
-        product_id: int, 
+    async def update_product(
+        self,
+        db: AsyncSession,
+        product_id: int,
         product_update: schemas.ProductUpdate
     ):
-        db_product = self.get_product(db, product_id)
+        db_product = await self.get_product(db, product_id)
         if db_product:
             update_data = product_update.dict(exclude_unset=True)
             for field, value in update_data.items():
                 setattr(db_product, field, value)
-            db.commit()
-            db.refresh(db_product)
+            await db.commit()
+            await db.refresh(db_product)
+            response_cache.bump_data_version()
         return db_product
     
-    def delete_product(self, db: Session, product_id: int):
-        db_product = self.get_product(db, product_id)
+    async def delete_product(self, db: AsyncSession, product_id: int):
+        db_product = await self.get_product(db, product_id)
         if db_product:
             db_product.is_active = False
-            db.commit()
+            await db.commit()
+            response_cache.bump_data_version()
         return db_product
 
 class CustomerService:
-    def get_customer(self, db: Session, customer_id: int):
-        return db.query(models.Customer).filter(models.Customer.id == customer_id).first()
+    async def get_customer(self, db: AsyncSession, customer_id: int):
+        # Includes customer totals still buffered in write-behind mode
+        customers = await customer_totals.get_customers(db, [customer_id])
+        return customers[0] if customers else None
     
-    def get_customer_by_email(self, db: Session, email: str):
-        return db.query(models.Customer).filter(models.Customer.email == email).first()
+    async def get_customer_by_email(self, db: AsyncSession, email: str):
+        result = await db.execute(select(models.Customer).where(models.Customer.email == email))
+        return result.scalars().first()
     
-    def get_customers(
-        self, 
-        db: Session, 
-        skip: int = 0, 
+    async def get_customers(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
         limit: int = 100,
         customer_segment: Optional[str] = None,
         is_active: Optional[bool] = None
     ):
-        query = db.query(models.Customer)
+        query = self._filter_customers(select(models.Customer), customer_segment, is_active)
+        result = await db.execute(query.order_by(models.Customer.id).offset(skip).limit(limit))
+        return result.scalars().all()
+    
+    async def get_customers_page(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        customer_segment: Optional[str] = None,
+        is_active: Optional[bool] = None
+    ):
+        """Keyset page of customers ordered by id, plus the cursor for the next page"""
+        query = self._filter_customers(select(models.Customer), customer_segment, is_active)
+        if cursor:
+            query = query.where(models.Customer.id > cursor_position(cursor, id=int)["id"])
         
+        result = await db.execute(query.order_by(models.Customer.id).limit(limit + 1))
+        return keyset_page(result.scalars().all(), limit, lambda customer: {"id": customer.id})
+    
+    def _filter_customers(self, query, customer_segment: Optional[str], is_active: Optional[bool]):
         if customer_segment:
-            query = query.filter(models.Customer.customer_segment == customer_segment)
+            query = query.where(models.Customer.customer_segment == customer_segment)
         if is_active is not None:
-            query = query.filter(models.Customer.is_active == is_active)
-            
-        return query.offset(skip).limit(limit).all()
+            query = query.where(models.Customer.is_active == is_active)
+        return query
     
-    def get_customers_by_segment(
-        self, 
-        db: Session, 
-        segment: str, 
-        skip: int = 0, 
+    async def get_customers_by_segment(
+        self,
+        db: AsyncSession,
+        segment: str,
+        skip: int = 0,
         limit: int = 100
     ):
-        return db.query(models.Customer).filter(
-            models.Customer.customer_segment == segment,
-            models.Customer.is_active == True
-        ).offset(skip).limit(limit).all()
+        result = await db.execute(
+            select(models.Customer).where(
+                models.Customer.customer_segment == segment,
+                models.Customer.is_active == True
+            ).offset(skip).limit(limit)
+        )
+        return result.scalars().all()
     
-    def create_customer(self, db: Session, customer: schemas.CustomerCreate):
+    async def create_customer(self, db: AsyncSession, customer: schemas.CustomerCreate):
         db_customer = models.Customer(**customer.dict())
         db.add(db_customer)
-        db.commit()
-        db.refresh(db_customer)
+        await db.commit()
+        response_cache.bump_data_version()
+        await db.refresh(db_customer)
         return db_customer
     
-    def update_customer(
-        self, 
-        db: Session, 
-        customer_id: int, 
+    async def update_customer(
+        self,
+        db: AsyncSession,
+        customer_id: int,
         customer_update: schemas.CustomerUpdate
     ):
-        db_customer = self.get_customer(db, customer_id)
+        db_customer = await self.get_customer(db, customer_id)
         if db_customer:
             update_data = customer_update.dict(exclude_unset=True)
             for field, value in update_data.items():
                 setattr(db_customer, field, value)
-            db.commit()
-            db.refresh(db_customer)
+            await db.commit()
+            db_customer = await self.get_customer(db, customer_id)
+            response_cache.bump_data_version()
         return db_customer
     
-    def delete_customer(self, db: Session, customer_id: int):
-        db_customer = self.get_customer(db, customer_id)
+    async def delete_customer(self, db: AsyncSession, customer_id: int):
+        db_customer = await self.get_customer(db, customer_id)
         if db_customer:
             db_customer.is_active = False
-            db.commit()
+            await db.commit()
+            response_cache.bump_data_version()
         return db_customer
     
-    def get_customer_stats(self, db: Session, customer_id: int):
-        # Get customer sales statistics
-        sales_stats = db.query(
-            func.sum(models.Sale.final_amount).label('total_spent'),
-            func.count(models.Sale.id).label('total_orders'),
-            func.avg(models.Sale.final_amount).label('avg_order_value')
-        ).filter(models.Sale.customer_id == customer_id).first()
-        
-        return {
-            "total_spent": float(sales_stats.total_spent or 0),
-            "total_orders": int(sales_stats.total_orders or 0),
-            "avg_order_value": float(sales_stats.avg_order_value or 0)
-        }
+    async def get_customer_stats(self, db: AsyncSession, customer_id: int):
+        """Sales stats of one customer; None if there is no such customer"""
+        return (await customer_totals.get_stats(db, [customer_id])).get(customer_id)
+    
+    async def get_customer_stats_batch(self, db: AsyncSession, customer_ids: List[int]):
+        """get_customer_stats for many customers at once, in request order; unknown ids are left out"""
+        found = await customer_totals.get_stats(db, customer_ids)
+        return [
+            {"customer_id": customer_id, **found[customer_id]}
+            for customer_id in dict.fromkeys(customer_ids) if customer_id in found
+        ]
 
 class SaleService:
-    def get_sale(self, db: Session, sale_id: int):
-        return db.query(models.Sale).filter(models.Sale.id == sale_id).first()
+    # Relations a sale response can embed (the `expand` parameter)
+    RELATIONS = ("product", "customer")
+    
+    def _select_sales(self, Sale, expand: Sequence[str] = RELATIONS):
+        # Expanded relations are batch-loaded with one SELECT ... IN per relation
+        # (async sessions can't lazy-load them during serialization, and per-row
+        # loads would be N+1 queries); the others are left unloaded and raise
+        # rather than load if touched, so encoders render them as None.
+        # `Sale` is models.Sale or the partition-aware alias from sales_partitions.
+        return select(Sale).options(*(
+            selectinload(getattr(Sale, name)) if name in expand else raiseload(getattr(Sale, name))
+            for name in self.RELATIONS
+        ))
     
-    def get_sales(
+    async def get_sale(self, db: AsyncSession, sale_id: int, expand: Sequence[str] = RELATIONS):
+        Sale = await sales_partitions.async_source(db)
+        result = await db.execute(
+            self._select_sales(Sale, expand).where(Sale.id == sale_id).execution_options(populate_existing=True)
+        )
+        return result.scalars().first()
+    
+    async def get_sales(
         self,
-        db: Session,
+        db: AsyncSession,
         skip: int = 0,
         limit: int = 100,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         customer_id: Optional[int] = None,
-        product_id: Optional[int] = None
+        product_id: Optional[int] = None,
+        expand: Sequence[str] = RELATIONS
+    ):
+        Sale = await sales_partitions.async_source(db, start_date, end_date)
+        query = self._filter_sales(Sale, self._select_sales(Sale, expand), start_date, end_date, customer_id, product_id)
+        # Same order as get_sales_page, so clients can switch paging modes
+        sale_date, _ = self._sale_date_key(db, Sale)
+        result = await db.execute(
+            query.order_by(sale_date.desc(), Sale.id.desc()).offset(skip).limit(limit)
+        )
+        return result.scalars().all()
+    
+    async def get_sales_page(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        customer_id: Optional[int] = None,
+        product_id: Optional[int] = None,
+        expand: Sequence[str] = RELATIONS
     ):
-        query = db.query(models.Sale)
+        """Keyset page of sales, newest first by (sale_date, id), plus the cursor for the next page"""
+        Sale = await sales_partitions.async_source(db, start_date, end_date)
+        sale_date, stored_as_text = self._sale_date_key(db, Sale)
+        query = self._filter_sales(
+            Sale,
+            self._select_sales(Sale, expand).add_columns(sale_date.label("cursor_date")),
+            start_date, end_date, customer_id, product_id
+        )
+        if cursor:
+            position = cursor_position(cursor, sale_date=str, id=int)
+            # Parsed either way, so a malformed date is rejected
+            after_date = datetime.fromisoformat(position["sale_date"])
+            if stored_as_text:
+                after_date = position["sale_date"]
+            # The leading `<=` lets the planner seek the sale_date index
+            query = query.where(
+                sale_date <= after_date,
+                or_(sale_date < after_date, Sale.id < position["id"])
+            )
+        
+        result = await db.execute(query.order_by(sale_date.desc(), Sale.id.desc()).limit(limit + 1))
+        rows, next_cursor = keyset_page(result.all(), limit, lambda row: {
+            "sale_date": row.cursor_date if stored_as_text else row.cursor_date.isoformat(),
+            "id": row[0].id
+        })
+        return [row[0] for row in rows], next_cursor
+    
+    def _sale_date_key(self, db: AsyncSession, Sale):
+        """sale_date as keyset pagination compares it, and whether that is raw text
         
+        SQLite stores datetimes as text, and server-default timestamps lack the
+        microseconds a bound datetime carries, so rows sharing a second would
+        compare unequal to their own cursor; there the stored text is compared.
+        """
+        if dialect_name(db) == "sqlite":
+            return type_coerce(Sale.sale_date, String), True
+        return Sale.sale_date, False
+    
+    def _filter_sales(
+        self,
+        Sale,
+        query,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        customer_id: Optional[int],
+        product_id: Optional[int]
+    ):
         if start_date:
-            query = query.filter(models.Sale.sale_date >= start_date)
+            query = query.where(Sale.sale_date >= start_date)
         if end_date:
-            query = query.filter(models.Sale.sale_date <= end_date)
+            query = query.where(Sale.sale_date <= end_date)
         if customer_id:
-            query = query.filter(models.Sale.customer_id == customer_id)
+            query = query.where(Sale.customer_id == customer_id)
         if product_id:
-            query = query.filter(models.Sale.product_id == product_id)
-            
-        return query.offset(skip).limit(limit).all()
+            query = query.where(Sale.product_id == product_id)
+        return query
     
-    def get_sales_by_customer(
-        self, 
-        db: Session, 
-        customer_id: int, 
-        skip: int = 0, 
-        limit: int = 100
+    async def get_sales_by_customer(
+        self,
+        db: AsyncSession,
+        customer_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        expand: Sequence[str] = RELATIONS
     ):
-        return db.query(models.Sale).filter(
-            models.Sale.customer_id == customer_id
-        ).offset(skip).limit(limit).all()
-    
-    def get_sales_by_product(
-        self, 
-        db: Session, 
-        product_id: int, 
-        skip: int = 0, 
-        limit: int = 100
+        Sale = await sales_partitions.async_source(db)
+        result = await db.execute(
+            self._select_sales(Sale, expand).where(
+                Sale.customer_id == customer_id
+            ).offset(skip).limit(limit)
+        )
+        return result.scalars().all()
+    
+    async def get_sales_by_product(
+        self,
+        db: AsyncSession,
+        product_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        expand: Sequence[str] = RELATIONS
     ):
-        return db.query(models.Sale).filter(
-            models.Sale.product_id == product_id
-        ).offset(skip).limit(limit).all()
+        Sale = await sales_partitions.async_source(db)
+        result = await db.execute(
+            self._select_sales(Sale, expand).where(
+                Sale.product_id == product_id
+            ).offset(skip).limit(limit)
+        )
+        return result.scalars().all()
     
-    def create_sale(self, db: Session, sale: schemas.SaleCreate):
+    async def create_sale(self, db: AsyncSession, sale: schemas.SaleCreate):
+        """Record a sale, taking its quantity out of stock
+        
+        Stock is taken with a single conditional UPDATE rather than read,
+        compared and written back, so concurrent checkouts of the same
+        product can't oversell it or lose updates; whether the stock was
+        there is read from the affected row count. Customer totals are
+        incremented in SQL too, or buffered by customer_totals.
+        """
         # Calculate totals
         total_amount = sale.quantity * sale.unit_price
         final_amount = total_amount - sale.discount_amount + sale.tax_amount
         
-        # Validate product and customer exist
-        product = db.query(models.Product).filter(models.Product.id == sale.product_id).first()
-        if not product:
-            raise ValueError("Product not found")
-            
-        customer = db.query(models.Customer).filter(models.Customer.id == sale.customer_id).first()
-        if not customer:
+        if await self._used_transaction_ids(db, [sale.transaction_id]):
+            raise ValueError("Duplicate transaction_id")
+        
+        # Update customer totals (or buffer them, in write-behind mode)
+        if not await customer_totals.add(db, sale.customer_id, final_amount):
+            await db.rollback()
             raise ValueError("Customer not found")
         
-        # Check stock availability
-        if product.stock_quantity < sale.quantity:
-            raise ValueError("Insufficient stock")
+        # Take the quantity out of stock only if it is all there
+        products_table = models.Product.__table__
+        updated = await db.execute(
+            products_table.update().where(
+                and_(
+                    products_table.c.id == sale.product_id,
+                    products_table.c.stock_quantity >= sale.quantity
+                )
+            ).values(stock_quantity=products_table.c.stock_quantity - sale.quantity)
+        )
+        if updated.rowcount != 1:
+            product_exists = await db.scalar(
+                select(models.Product.id).where(models.Product.id == sale.product_id)
+            )
+            await db.rollback()
+            raise ValueError("Insufficient stock" if product_exists else "Product not found")
         
         # Create sale
         db_sale = models.Sale(
-            **sale.dict(),
+            **sale.model_dump(),
             total_amount=total_amount,
             final_amount=final_amount
         )
         db.add(db_sale)
         
-        # Update product stock
-        product.stock_quantity -= sale.quantity
-        
-        # Update customer totals
-        customer.total_spent += final_amount
-        customer.total_orders += 1
+        # Fold the sale into the daily rollup and customer stats in the same transaction
+        await db.flush()
+        await rollup_service.apply_sales(db, [db_sale.id])
+        await customer_totals.apply_sales(db, [db_sale.id])
         
-        db.commit()
-        db.refresh(db_sale)
+        await db.commit()
+        response_cache.bump_data_version()
+        db_sale = await self.get_sale(db, db_sale.id)
+        columnar_store.append_sale(db_sale)
         return db_sale
     
-    def get_daily_sales_summary(self, db: Session, date: datetime):
-        sales_data = db.query(
-            func.sum(models.Sale.final_amount).label('total_revenue'),
-            func.count(models.Sale.id).label('total_orders'),
-            func.avg(models.Sale.final_amount).label('avg_order_value')
-        ).filter(
-            func.date(models.Sale.sale_date) == date
-        ).first()
+    async def create_sales_bulk(self, db: AsyncSession, sales: List[schemas.SaleCreate]):
+        """Validate and insert many sales in one transaction
+        
+        Products, customers and already-used transaction ids are looked up
+        with one IN query each; stock is checked against each product's
+        running total for the batch. Rejected rows are reported by index and
+        the rest are inserted, with the stock and customer-total deltas
+        applied as executemany UPDATEs (customer totals may be buffered by
+        customer_totals instead), and committed together.
+        """
+        product_stock = dict((await db.execute(
+            select(models.Product.id, models.Product.stock_quantity).where(
+                models.Product.id.in_({sale.product_id for sale in sales})
+            ).with_for_update()
+        )).all())
+        customer_ids = set((await db.execute(
+            select(models.Customer.id).where(
+                models.Customer.id.in_({sale.customer_id for sale in sales})
+            )
+        )).scalars())
+        transaction_ids = await self._used_transaction_ids(db, [sale.transaction_id for sale in sales])
+        
+        rows, errors = [], []
+        stock_deltas = defaultdict(int)
+        customer_deltas = defaultdict(lambda: {"spent": 0.0, "orders": 0})
+        for index, sale in enumerate(sales):
+            if sale.transaction_id in transaction_ids:
+                error = "Duplicate transaction_id"
+            elif sale.product_id not in product_stock:
+                error = "Product not found"
+            elif sale.customer_id not in customer_ids:
+                error = "Customer not found"
+            elif product_stock[sale.product_id] < sale.quantity:
+                error = "Insufficient stock"
+            else:
+                error = None
+            if error:
+                errors.append({"index": index, "transaction_id": sale.transaction_id, "error": error})
+                continue
+            
+            total_amount = sale.quantity * sale.unit_price
+            final_amount = total_amount - sale.discount_amount + sale.tax_amount
+            rows.append({**sale.model_dump(), "total_amount": total_amount, "final_amount": final_amount})
+            transaction_ids.add(sale.transaction_id)
+            product_stock[sale.product_id] -= sale.quantity
+            stock_deltas[sale.product_id] += sale.quantity
+            customer_deltas[sale.customer_id]["spent"] += final_amount
+            customer_deltas[sale.customer_id]["orders"] += 1
+        
+        if not rows:
+            return {"received": len(sales), "created": 0, "sale_ids": [], "errors": errors}
+        
+        sales_table = models.Sale.__table__
+        inserted = (await db.execute(
+            insert(sales_table).returning(
+                sales_table.c.id, sales_table.c.sale_date, sort_by_parameter_order=True
+            ),
+            rows
+        )).all()
+        
+        products_table = models.Product.__table__
+        await db.execute(
+            products_table.update().where(products_table.c.id == bindparam("product_key")).values(
+                stock_quantity=products_table.c.stock_quantity - bindparam("sold")
+            ),
+            [{"product_key": product_id, "sold": sold} for product_id, sold in stock_deltas.items()]
+        )
+        await customer_totals.add_many(db, {
+            customer_id: (delta["spent"], delta["orders"]) for customer_id, delta in customer_deltas.items()
+        })
+        
+        sale_ids = [row.id for row in inserted]
+        await rollup_service.apply_sales(db, sale_ids)
+        await customer_totals.apply_sales(db, sale_ids)
+        await db.commit()
+        response_cache.bump_data_version()
+        if columnar_store.loaded:
+            columnar_store.append_rows([
+                (
+                    row.id, sale["product_id"], sale["customer_id"], sale["quantity"], row.sale_date,
+                    sale["final_amount"], sale["sales_channel"], sale["store_location"]
+                )
+                for row, sale in zip(inserted, rows)
+            ])
+        return {"received": len(sales), "created": len(sale_ids), "sale_ids": sale_ids, "errors": errors}
+    
+    async def _used_transaction_ids(self, db: AsyncSession, transaction_ids: List[str]) -> set:
+        """Transaction ids already recorded in any partition
+        
+        The unique index only spans one table (on partitioned PostgreSQL,
+        one transaction_id per sale_date), so duplicates are looked up.
+        """
+        Sale = await sales_partitions.async_source(db)
+        result = await db.execute(select(Sale.transaction_id).where(Sale.transaction_id.in_(transaction_ids)))
+        return set(result.scalars())
+    
+    async def get_sales_summary(
+        self,
+        db: AsyncSession,
+        granularity: schemas.SummaryGranularity,
+        start: date,
+        end: date
+    ):
+        """Revenue and orders per day, week or month from `start` to `end` (inclusive)
+        
+        Buckets are whole periods: months start on the 1st and weeks are
+        7-day windows counted from `start`. One range query over sale_date
+        (which its index serves) groups the sales by day; days are then
+        added up into buckets, and buckets without sales are zero-filled.
+        """
+        starts = self.summary_periods(granularity, start, end)
+        bounds = starts + [self._next_period(granularity, starts[-1])]
+        low, high = datetime.combine(bounds[0], time.min), datetime.combine(bounds[-1], time.min)
+        
+        Sale = await sales_partitions.async_source(db, low, high)
+        day = func.date(Sale.sale_date, type_=Date)
+        result = await db.execute(
+            select(
+                day.label('day'),
+                func.sum(Sale.final_amount).label('revenue'),
+                func.count(Sale.id).label('orders')
+            ).where(
+                and_(
+                    Sale.sale_date >= low,
+                    Sale.sale_date < high
+                )
+            ).group_by(day)
+        )
+        revenue, orders = [0.0] * len(starts), [0] * len(starts)
+        for row in result:
+            index = bisect_right(starts, row.day) - 1
+            revenue[index] += float(row.revenue or 0)
+            orders[index] += row.orders
+        
+        return {
+            "granularity": granularity,
+            "start": start,
+            "end": end,
+            "buckets": [
+                {
+                    "period_start": bounds[i],
+                    "period_end": bounds[i + 1],
+                    "total_revenue": revenue[i],
+                    "total_orders": orders[i],
+                    "avg_order_value": revenue[i] / orders[i] if orders[i] else 0.0
+                }
+                for i in range(len(starts))
+            ]
+        }
+    
+    def summary_periods(self, granularity: schemas.SummaryGranularity, start: date, end: date) -> List[date]:
+        """Start dates of the summary buckets covering start..end"""
+        period = month_start(start) if granularity == schemas.SummaryGranularity.MONTH else start
+        periods = []
+        while period <= end:
+            periods.append(period)
+            period = self._next_period(granularity, period)
+        return periods
+    
+    def summary_bucket_count(self, granularity: schemas.SummaryGranularity, start: date, end: date) -> int:
+        """Number of summary buckets covering start..end, counted without listing them
         
+        Raises ValueError if the last bucket would end after the latest
+        representable date.
+        """
+        if granularity == schemas.SummaryGranularity.MONTH:
+            count = (end.year - start.year) * 12 + end.month - start.month + 1
+            last = add_months(month_start(start), count - 1)
+        else:
+            step = 7 if granularity == schemas.SummaryGranularity.WEEK else 1
+            count = (end - start).days // step + 1
+            last = start + timedelta(days=step * (count - 1))
+        try:
+            self._next_period(granularity, last)
+        except (OverflowError, ValueError):
+            raise ValueError(f"The {granularity.value} bucket starting {last} ends past {date.max}")
+        return count
+    
+    def _next_period(self, granularity: schemas.SummaryGranularity, period: date) -> date:
+        if granularity == schemas.SummaryGranularity.MONTH:
+            return next_month(period)
+        return period + timedelta(days=7 if granularity == schemas.SummaryGranularity.WEEK else 1)
+    
+    async def _single_period(self, db: AsyncSession, granularity: schemas.SummaryGranularity, start: date):
+        summary = await self.get_sales_summary(db, granularity, start, start)
+        bucket = summary["buckets"][0]
+        return {key: bucket[key] for key in ("total_revenue", "total_orders", "avg_order_value")}
+    
+    async def get_daily_sales_summary(self, db: AsyncSession, date: datetime):
+        day = date.date() if isinstance(date, datetime) else date
         return {
             "date": date.isoformat(),
-            "total_revenue": float(sales_data.total_revenue or 0),
-            "total_orders": int(sales_data.total_orders or 0),
-            "avg_order_value": float(sales_data.avg_order_value or 0)
+            **await self._single_period(db, schemas.SummaryGranularity.DAY, day)
         }
     
-    def get_weekly_sales_summary(self, db: Session, week_start: datetime):
-        from datetime import timedelta
+    async def get_weekly_sales_summary(self, db: AsyncSession, week_start: datetime):
         week_end = week_start + timedelta(days=7)
-        
-        sales_data = db.query(
-            func.sum(models.Sale.final_amount).label('total_revenue'),
-            func.count(models.Sale.id).label('total_orders'),
-            func.avg(models.Sale.final_amount).label('avg_order_value')
-        ).filter(
-            and_(
-                models.Sale.sale_date >= week_start,
-                models.Sale.sale_date < week_end
-            )
-        ).first()
-        
+        day = week_start.date() if isinstance(week_start, datetime) else week_start
         return {
             "week_start": week_start.isoformat(),
             "week_end": week_end.isoformat(),
-            "total_revenue": float(sales_data.total_revenue or 0),
-            "total_orders": int(sales_data.total_orders or 0),
-            "avg_order_value": float(sales_data.avg_order_value or 0)
+            **await self._single_period(db, schemas.SummaryGranularity.WEEK, day)
         }
     
-    def get_monthly_sales_summary(self, db: Session, year: int, month: int):
-        from datetime import date
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1)
-        else:
-            end_date = date(year, month + 1, 1)
-        
-        sales_data = db.query(
-            func.sum(models.Sale.final_amount).label('total_revenue'),
-            func.count(models.Sale.id).label('total_orders'),
-            func.avg(models.Sale.final_amount).label('avg_order_value')
-        ).filter(
-            and_(
-                models.Sale.sale_date >= start_date,
-                models.Sale.sale_date < end_date
-            )
-        ).first()
-        
+    async def get_monthly_sales_summary(self, db: AsyncSession, year: int, month: int):
         return {
             "year": year,
             "month": month,
-            "total_revenue": float(sales_data.total_revenue or 0),
-            "total_orders": int(sales_data.total_orders or 0),
-            "avg_order_value": float(sales_data.avg_order_value or 0)
+            **await self._single_period(db, schemas.SummaryGranularity.MONTH, date(year, month, 1))
         }
 
 # Create service instances
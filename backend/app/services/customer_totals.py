@@ -0,0 +1,320 @@
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, case, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.database import models
+from app.database.dialects import dialect_insert
+from app.database.partitions import sales_partitions
+
+STATS_COLUMNS = ["customer_id", "total_spent", "total_orders", "first_purchase_at", "last_purchase_at"]
+
+class CustomerTotalsBuffer:
+    """Maintains customers.total_spent / total_orders and customer_stats for the sale write path
+
+    Direct mode (the default) increments the customer row and upserts its
+    customer_stats row inside each sale transaction. In write-behind mode a
+    sale only appends a row to customer_total_deltas, so a busy customer's
+    rows are no longer a point of contention; flush() folds the deltas into
+    both tables with batched statements, every `interval_ms` or after
+    `flush_sales` sales. get_customers() and get_stats() add the deltas not
+    flushed yet, so those reads stay exact; other readers of the totals
+    (analytics, reports) lag by at most one flush, after which cached
+    responses are invalidated.
+    """
+
+    def __init__(self, write_behind: bool = False, interval_ms: int = 500, flush_sales: int = 1000):
+        self.write_behind = write_behind
+        self.interval_ms = interval_ms
+        self.flush_sales = flush_sales
+        self.buffered_sales = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # Sale write path (inside the caller's transaction)
+
+    async def add(self, db: AsyncSession, customer_id: int, spent: float, orders: int = 1) -> bool:
+        """Count one customer's sale before it is inserted; False if there is no such customer
+
+        Direct mode updates the customer's totals here. In write-behind mode
+        this only checks the customer exists; apply_sales() buffers the rest.
+        """
+        customers = models.Customer.__table__
+        if self.write_behind:
+            return await db.scalar(select(customers.c.id).where(customers.c.id == customer_id)) is not None
+        result = await db.execute(
+            customers.update().where(customers.c.id == customer_id).values(
+                total_spent=customers.c.total_spent + spent,
+                total_orders=customers.c.total_orders + orders
+            )
+        )
+        return result.rowcount == 1
+
+    async def add_many(self, db: AsyncSession, totals: Dict[int, Tuple[float, int]]):
+        """add() for (spent, orders) per customer id; the customers must exist"""
+        if totals and not self.write_behind:
+            await self._apply(db, totals)
+
+    async def apply_sales(self, db: AsyncSession, sale_ids: List[int]):
+        """Fold freshly inserted sales into customer_stats (or buffer them)"""
+        if not sale_ids:
+            return
+        per_customer = self._stats_select(models.Sale).where(models.Sale.id.in_(sale_ids))
+        if self.write_behind:
+            deltas = models.CustomerTotalDelta.__table__
+            await db.execute(deltas.insert().from_select(
+                ["customer_id", "spent", "orders", "first_sale_date", "last_sale_date"], per_customer
+            ))
+            self._buffered(len(sale_ids))
+        else:
+            insert = dialect_insert(db)
+            await db.execute(self._stats_upsert(
+                insert(models.CustomerStats).from_select(STATS_COLUMNS, per_customer)
+            ))
+
+    # Reads
+
+    async def get_customers(self, db: AsyncSession, customer_ids: Sequence[int]) -> List[models.Customer]:
+        """Customers by id with their unflushed deltas included in the totals
+
+        Row and deltas are read by one statement, so a concurrent flush
+        can't make a delta count twice or not at all.
+        """
+        query = select(models.Customer).where(models.Customer.id.in_(customer_ids)).execution_options(
+            populate_existing=True
+        )
+        if not self.write_behind:
+            return list((await db.execute(query)).scalars())
+        pending = self._pending(customer_ids)
+        result = await db.execute(
+            query.add_columns(pending.c.spent, pending.c.orders).outerjoin(
+                pending, pending.c.customer_id == models.Customer.id
+            )
+        )
+        customers = []
+        for customer, spent, orders in result:
+            if orders:
+                # Committed values, so the merged totals are never written back
+                set_committed_value(customer, "total_spent", (customer.total_spent or 0.0) + spent)
+                set_committed_value(customer, "total_orders", (customer.total_orders or 0) + orders)
+            customers.append(customer)
+        return customers
+
+    async def get_stats(self, db: AsyncSession, customer_ids: Sequence[int]) -> Dict[int, Dict]:
+        """Sales stats of the existing customers among `customer_ids`
+
+        One query reads them from customer_stats plus, in write-behind mode,
+        the deltas not flushed yet. Customers without a customer_stats row
+        (a database whose stats were never backfilled) are aggregated from
+        their sales with a second query.
+        """
+        customers, stats = models.Customer, models.CustomerStats
+        query = select(
+            customers.id, stats.customer_id, stats.total_spent, stats.total_orders,
+            stats.first_purchase_at, stats.last_purchase_at
+        ).outerjoin(stats, stats.customer_id == customers.id).where(customers.id.in_(customer_ids))
+        if self.write_behind:
+            pending = self._pending(customer_ids)
+            query = query.add_columns(
+                pending.c.spent, pending.c.orders, pending.c.first_sale_date, pending.c.last_sale_date
+            ).outerjoin(pending, pending.c.customer_id == customers.id)
+
+        found, unaggregated = {}, []
+        for row in await db.execute(query):
+            customer_id, spent, orders, first, last = row[0], row[2] or 0.0, row[3] or 0, row[4], row[5]
+            if row[1] is None:
+                unaggregated.append(customer_id)
+            elif self.write_behind and row[7]:
+                spent, orders = spent + row[6], orders + row[7]
+                first = min(first, row[8]) if first else row[8]
+                last = max(last, row[9]) if last else row[9]
+            found[customer_id] = self._stats_item(spent, orders, first, last)
+
+        if unaggregated:
+            # Their sales include any buffered ones, so deltas aren't added
+            Sale = await sales_partitions.async_source(db)
+            for customer_id, spent, orders, first, last in await db.execute(
+                self._stats_select(Sale).where(Sale.customer_id.in_(unaggregated))
+            ):
+                found[customer_id] = self._stats_item(spent or 0.0, orders, first, last)
+        return found
+
+    def _stats_item(self, spent, orders, first, last) -> Dict:
+        return {
+            "total_spent": float(spent),
+            "total_orders": int(orders),
+            "avg_order_value": float(spent) / orders if orders else 0.0,
+            "first_purchase_date": first,
+            "last_purchase_date": last
+        }
+
+    # Flushing and maintenance
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Fold every committed delta into customers and customer_stats; returns the deltas applied"""
+        buffered, self.buffered_sales = self.buffered_sales, 0
+        try:
+            # DELETE ... RETURNING claims the rows, so concurrent flushers
+            # (other workers) never apply the same delta twice
+            claimed = (await db.execute(self._claim_deltas())).all()
+            totals = self._sum_deltas(claimed)
+            if totals:
+                await self._apply(db, totals)
+                insert = dialect_insert(db)
+                await db.execute(self._stats_upsert(insert(models.CustomerStats)), [
+                    dict(zip(STATS_COLUMNS, (customer_id, *values)))
+                    for customer_id, values in sorted(totals.items())
+                ])
+            await db.commit()
+        except Exception:
+            # Nothing was applied; the deltas still count towards the next flush
+            self.buffered_sales += buffered
+            raise
+        if totals:
+            response_cache.bump_data_version()
+        return len(claimed)
+
+    def rebuild_stats(self, db: Session) -> int:
+        """Recompute customer_stats from the sales themselves
+
+        Pending deltas are applied to the customer totals first; their
+        sales are already counted by the rebuild.
+        """
+        totals = self._sum_deltas(db.execute(self._claim_deltas()).all())
+        if totals:
+            db.execute(self._customers_update(), self._customers_params(totals))
+        stats = models.CustomerStats
+        db.execute(delete(stats))
+        db.execute(stats.__table__.insert().from_select(
+            STATS_COLUMNS, self._stats_select(sales_partitions.source(db))
+        ))
+        db.commit()
+        return db.query(func.count()).select_from(stats).scalar()
+
+    async def start(self, sessionmaker):
+        """Flush deltas left from an earlier run, then (write-behind mode) flush periodically"""
+        async with sessionmaker() as db:
+            await self.flush(db)
+        if not self.write_behind or self._task:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop(sessionmaker))
+
+    async def stop(self, sessionmaker):
+        """Stop the background task and flush what is left"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = self._wake = None
+        async with sessionmaker() as db:
+            await self.flush(db)
+
+    async def _flush_loop(self, sessionmaker):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                async with sessionmaker() as db:
+                    await self.flush(db)
+            except Exception as e:
+                # Deltas stay in the table and go out with the next flush
+                print(
+                    f"Customer totals flush failed ({type(e).__name__}), "
+                    f"deltas of {self.buffered_sales} sales pending: {e}"
+                )
+
+    def _buffered(self, sales: int):
+        self.buffered_sales += sales
+        if self._wake and self.buffered_sales >= self.flush_sales:
+            self._wake.set()
+
+    # Statements
+
+    def _stats_select(self, Sale):
+        # (customer_id, spent, orders, first sale date, last sale date) per customer
+        return select(
+            Sale.customer_id,
+            func.sum(Sale.final_amount),
+            func.count(Sale.id),
+            func.min(Sale.sale_date),
+            func.max(Sale.sale_date)
+        ).group_by(Sale.customer_id)
+
+    def _stats_upsert(self, stmt):
+        stats = models.CustomerStats
+        return stmt.on_conflict_do_update(
+            index_elements=[stats.customer_id],
+            set_={
+                "total_spent": stats.total_spent + stmt.excluded.total_spent,
+                "total_orders": stats.total_orders + stmt.excluded.total_orders,
+                "first_purchase_at": case(
+                    (stmt.excluded.first_purchase_at < stats.first_purchase_at, stmt.excluded.first_purchase_at),
+                    else_=stats.first_purchase_at
+                ),
+                "last_purchase_at": case(
+                    (stmt.excluded.last_purchase_at > stats.last_purchase_at, stmt.excluded.last_purchase_at),
+                    else_=stats.last_purchase_at
+                )
+            }
+        )
+
+    def _pending(self, customer_ids: Sequence[int]):
+        deltas = models.CustomerTotalDelta
+        return select(
+            deltas.customer_id,
+            func.sum(deltas.spent).label("spent"),
+            func.sum(deltas.orders).label("orders"),
+            func.min(deltas.first_sale_date).label("first_sale_date"),
+            func.max(deltas.last_sale_date).label("last_sale_date")
+        ).where(deltas.customer_id.in_(customer_ids)).group_by(deltas.customer_id).subquery()
+
+    def _claim_deltas(self):
+        deltas = models.CustomerTotalDelta.__table__
+        return delete(deltas).returning(
+            deltas.c.customer_id, deltas.c.spent, deltas.c.orders, deltas.c.first_sale_date, deltas.c.last_sale_date
+        )
+
+    def _sum_deltas(self, claimed) -> Dict[int, list]:
+        # customer_id -> [spent, orders, first sale date, last sale date]
+        totals = defaultdict(lambda: [0.0, 0, None, None])
+        for customer_id, spent, orders, first, last in claimed:
+            total = totals[customer_id]
+            total[0] += spent
+            total[1] += orders
+            total[2] = min(total[2], first) if total[2] else first
+            total[3] = max(total[3], last) if total[3] else last
+        return totals
+
+    def _customers_update(self):
+        customers = models.Customer.__table__
+        return customers.update().where(customers.c.id == bindparam("customer_key")).values(
+            total_spent=customers.c.total_spent + bindparam("spent"),
+            total_orders=customers.c.total_orders + bindparam("orders")
+        )
+
+    def _customers_params(self, totals):
+        # Customer id order, so concurrent batches lock rows in the same order
+        return [
+            {"customer_key": customer_id, "spent": values[0], "orders": values[1]}
+            for customer_id, values in sorted(totals.items())
+        ]
+
+    async def _apply(self, db: AsyncSession, totals):
+        await db.execute(self._customers_update(), self._customers_params(totals))
+
+# Create service instance
+customer_totals = CustomerTotalsBuffer(
+    write_behind=settings.CUSTOMER_TOTALS_WRITE_BEHIND,
+    interval_ms=settings.CUSTOMER_TOTALS_FLUSH_INTERVAL_MS,
+    flush_sales=settings.CUSTOMER_TOTALS_FLUSH_SALES
+)
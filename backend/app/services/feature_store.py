@@ -0,0 +1,194 @@
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Sequence
+import pandas as pd
+from sqlalchemy import Date, delete, func, literal, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import models
+from app.database.partitions import sales_partitions
+
+# Rolling mean lengths, in days with sales
+WINDOWS = {"quantity_7d_avg": 7, "quantity_30d_avg": 30}
+
+class ProductFeatureStore:
+    """Per-product daily ML features in product_daily_features
+
+    Holds one row per product and complete day with sales: quantity,
+    revenue, mean unit price, the 7- and 30-day rolling quantity means and
+    calendar fields. update() only aggregates the days after the watermark
+    (the last day processed, kept in feature_watermarks); the rolling means
+    of those days continue from the product's latest stored rows. Today is
+    never stored, since its sales are still coming in.
+    """
+
+    WATERMARK = "product_daily_features"
+
+    def __init__(self, history_days: int = 730, chunk_size: int = 10000):
+        self.history_days = history_days
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+
+    def watermark(self, db: Session) -> Optional[date]:
+        return db.scalar(
+            select(models.FeatureWatermark.last_day).where(models.FeatureWatermark.name == self.WATERMARK)
+        )
+
+    def update(self, db: Session, today: Optional[date] = None) -> int:
+        """Add the days between the watermark and yesterday; returns the rows added
+
+        Rows older than `history_days` are dropped. Builds the store if it
+        has no watermark yet.
+        """
+        today = today or datetime.now().date()
+        with self._lock:
+            last_day = self.watermark(db)
+            if last_day is None:
+                return self._build(db, today)
+            if last_day >= today - timedelta(days=1):
+                return 0
+            try:
+                added = self._insert(db, self._new_days_select(db, last_day + timedelta(days=1), today))
+                db.execute(delete(models.ProductDailyFeature).where(
+                    models.ProductDailyFeature.day < today - timedelta(days=self.history_days)
+                ))
+                self._set_watermark(db, today - timedelta(days=1))
+                db.commit()
+            except IntegrityError:
+                # Another worker stored these days first
+                db.rollback()
+                return 0
+            return added
+
+    def rebuild(self, db: Session, today: Optional[date] = None) -> int:
+        """Recompute the store from the last `history_days` of sales; returns the rows stored"""
+        with self._lock:
+            return self._build(db, today or datetime.now().date())
+
+    def frame(self, db: Session, since: date, product_id: Optional[int] = None) -> pd.DataFrame:
+        """Stored features from `since` on with product attributes, ordered by product and day
+
+        Columns as MLService.prepare_features has always returned them.
+        """
+        query = self._features_select().where(models.ProductDailyFeature.day >= since)
+        if product_id:
+            query = query.where(models.ProductDailyFeature.product_id == product_id)
+        return self._read(db, query)
+
+    def latest(self, db: Session, product_ids: Sequence[int]) -> pd.DataFrame:
+        """Each product's most recent stored row; products without one are left out"""
+        features = models.ProductDailyFeature
+        latest_days = select(features.product_id, func.max(features.day).label("day")).where(
+            features.product_id.in_(product_ids)
+        ).group_by(features.product_id).subquery()
+        return self._read(db, self._features_select().join(
+            latest_days, (latest_days.c.product_id == features.product_id) & (latest_days.c.day == features.day)
+        ))
+
+    # Helpers
+
+    def _build(self, db: Session, today: date) -> int:
+        db.execute(delete(models.ProductDailyFeature))
+        stored = self._insert(db, self._new_days_select(db, today - timedelta(days=self.history_days), today))
+        self._set_watermark(db, today - timedelta(days=1))
+        db.commit()
+        return stored
+
+    def _new_days_select(self, db: Session, first_day: date, today: date):
+        """Features of the days first_day..yesterday
+
+        Their daily sums are unioned with the latest 29 stored rows of each
+        product that sold in that range, so the rolling means carry on
+        across the watermark; only the new days are selected.
+        """
+        start, end = datetime.combine(first_day, time.min), datetime.combine(today, time.min)
+        Sale = sales_partitions.source(db, start, end)
+        in_range = (Sale.sale_date >= start) & (Sale.sale_date < end)
+        day = func.date(Sale.sale_date, type_=Date)
+        new_days = select(
+            Sale.product_id,
+            day.label("day"),
+            func.sum(Sale.quantity).label("quantity"),
+            func.sum(Sale.final_amount).label("revenue"),
+            func.avg(Sale.unit_price).label("unit_price"),
+            literal(1).label("is_new")
+        ).where(in_range).group_by(Sale.product_id, day)
+
+        features = models.ProductDailyFeature
+        recent = select(
+            features.product_id, features.day, features.quantity, features.revenue, features.unit_price,
+            func.row_number().over(partition_by=features.product_id, order_by=features.day.desc()).label("recency")
+        ).where(
+            features.product_id.in_(select(Sale.product_id).where(in_range).distinct()),
+            features.day < first_day
+        ).subquery()
+        history = select(
+            recent.c.product_id, recent.c.day, recent.c.quantity, recent.c.revenue, recent.c.unit_price,
+            literal(0).label("is_new")
+        ).where(recent.c.recency < max(WINDOWS.values()))
+
+        combined = union_all(new_days, history).subquery()
+        windowed = select(
+            combined,
+            *(
+                func.avg(combined.c.quantity).over(
+                    partition_by=combined.c.product_id, order_by=combined.c.day, rows=(-(days - 1), 0)
+                ).label(name)
+                for name, days in WINDOWS.items()
+            )
+        ).subquery()
+        return select(
+            windowed.c.product_id, windowed.c.day, windowed.c.quantity, windowed.c.revenue, windowed.c.unit_price,
+            *(windowed.c[name] for name in WINDOWS)
+        ).where(windowed.c.is_new == 1)
+
+    def _insert(self, db: Session, query) -> int:
+        # Fetched in full first: the query reads the table being written.
+        # Calendar fields are added here rather than in dialect-specific SQL.
+        rows = db.execute(query).all()
+        for offset in range(0, len(rows), self.chunk_size):
+            db.execute(models.ProductDailyFeature.__table__.insert(), [
+                {**row._asdict(), **self._calendar(row.day)} for row in rows[offset:offset + self.chunk_size]
+            ])
+        return len(rows)
+
+    def _calendar(self, day: date):
+        return {
+            "day_of_week": day.weekday(),
+            "month": day.month,
+            "quarter": (day.month - 1) // 3 + 1,
+            "is_weekend": int(day.weekday() in (5, 6))
+        }
+
+    def _set_watermark(self, db: Session, last_day: date):
+        watermark = db.get(models.FeatureWatermark, self.WATERMARK)
+        if watermark is None:
+            db.add(models.FeatureWatermark(name=self.WATERMARK, last_day=last_day))
+        else:
+            watermark.last_day = last_day
+
+    def _features_select(self):
+        features, products = models.ProductDailyFeature, models.Product
+        return select(
+            features.product_id,
+            features.day.label("sale_date"),
+            features.quantity,
+            features.revenue.label("final_amount"),
+            features.unit_price,
+            products.price,
+            products.category,
+            func.coalesce(products.brand, "Unknown").label("brand"),
+            features.day_of_week,
+            features.month,
+            features.quarter,
+            features.is_weekend,
+            features.quantity_7d_avg,
+            features.quantity_30d_avg
+        ).join(products, products.id == features.product_id).order_by(features.product_id, features.day)
+
+    def _read(self, db: Session, query) -> pd.DataFrame:
+        result = db.execute(query)
+        return pd.DataFrame(result.all(), columns=list(result.keys()))
+
+# Create store instance
+feature_store = ProductFeatureStore()
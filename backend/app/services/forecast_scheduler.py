@@ -0,0 +1,177 @@
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.database import models
+from app.services.feature_store import feature_store
+from app.services.ml_service import MLService, ml_service
+from app.services.prediction_cache import prediction_cache
+
+class ForecastScheduler:
+    """Retrains the sales model on an interval and precomputes forecasts for the catalog
+
+    Every `interval_hours` a run retrains the model, then writes 1 to
+    `horizon_days` day forecasts for every active product to
+    sales_predictions, so prediction endpoints read them from the
+    prediction cache. When a new day of sales has reached the feature
+    store in between, a run only recomputes the forecasts. Runs happen in a
+    worker thread, one at a time; the latest `history` of them are kept
+    with per-stage durations. Run it in one worker only.
+    """
+
+    def __init__(
+        self,
+        interval_hours: float = 24,
+        horizon_days: int = 30,
+        chunk_products: int = 500,
+        history: int = 50,
+        poll_seconds: float = 60,
+        retry_minutes: float = 60
+    ):
+        self.interval_hours = interval_hours
+        self.horizon_days = horizon_days
+        self.chunk_products = chunk_products
+        self.poll_seconds = poll_seconds
+        self.retry_minutes = retry_minutes
+        self.history = deque(maxlen=history)
+        self.precomputed_on = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._sessionmaker = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, sessionmaker):
+        """Start the scheduling loop; `sessionmaker` makes sync sessions"""
+        self._sessionmaker = sessionmaker
+        if not self._task:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop scheduling; a run in progress finishes in its thread"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def trigger(self, retrain: bool = True) -> Dict:
+        """Start a run in the background; raises RuntimeError if one is in progress"""
+        if not self._sessionmaker:
+            raise RuntimeError("The forecast scheduler is not running")
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A forecast run is already in progress")
+        record = self._record("manual", retrain)
+        threading.Thread(target=self._run, args=(record,), daemon=True).start()
+        return self._snapshot(record)
+
+    def runs(self) -> List[Dict]:
+        """Recorded runs, newest first"""
+        return [self._snapshot(record) for record in reversed(self.history)]
+
+    def retrain_due(self) -> bool:
+        last_trained = ml_service.last_trained
+        return not ml_service.model or not last_trained or (
+            datetime.now() - last_trained >= timedelta(hours=self.interval_hours)
+        )
+
+    def _backing_off(self) -> bool:
+        # A failed scheduled run isn't retried for `retry_minutes`
+        failed = [record for record in self.history if record["trigger"] == "schedule"][-1:]
+        return bool(failed) and failed[0]["status"] == "failed" and (
+            datetime.now() - failed[0]["finished_at"] < timedelta(minutes=self.retry_minutes)
+        )
+
+    async def _loop(self):
+        while True:
+            retrain = self.retrain_due()
+            due = retrain or self.precomputed_on != datetime.now().date()
+            if due and not self._backing_off() and self._lock.acquire(blocking=False):
+                record = self._record("schedule", retrain)
+                try:
+                    await asyncio.to_thread(self._run, record)
+                except Exception as e:
+                    print(f"Forecast run failed: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def _retrain(self, db) -> Dict:
+        # Trained on a separate instance, so online predictions never see a
+        # half-fitted scaler; the shared one then loads the saved model.
+        # Cached forecasts are dropped only now: until load_model() online
+        # requests still predict, and cache, with the old version.
+        metrics = MLService().train_model(db)
+        ml_service.load_model()
+        prediction_cache.invalidate(db, ml_service.model_version)
+        return metrics
+
+    def _record(self, trigger: str, retrain: bool) -> Dict:
+        record = {
+            "id": next(self._ids),
+            "trigger": trigger,
+            "retrain": retrain,
+            "status": "running",
+            "started_at": datetime.now(),
+            "finished_at": None,
+            "stages_ms": {},
+            "products": 0,
+            "predictions": 0,
+            "model_version": None,
+            "metrics": None,
+            "error": None
+        }
+        self.history.append(record)
+        return record
+
+    def _snapshot(self, record: Dict) -> Dict:
+        # Runs update their record from another thread
+        return {**record, "stages_ms": dict(record["stages_ms"])}
+
+    def _run(self, record: Dict):
+        # The caller holds self._lock; released here
+        db = self._sessionmaker()
+        stages = record["stages_ms"]
+
+        def stage(name, fn):
+            started = time.perf_counter()
+            result = fn()
+            stages[name] = round((time.perf_counter() - started) * 1000, 1)
+            return result
+
+        try:
+            if record["retrain"]:
+                metrics = stage("retrain", lambda: self._retrain(db))
+                record["metrics"] = {name: float(value) for name, value in metrics.items()}
+            stage("features", lambda: feature_store.update(db))
+            product_ids = stage("products", lambda: [
+                product_id for (product_id,) in db.query(models.Product.id).filter(
+                    models.Product.is_active.is_(True)
+                ).order_by(models.Product.id)
+            ])
+            record["products"] = len(product_ids)
+            record["predictions"] = stage("precompute", lambda: ml_service.precompute_forecasts(
+                db, product_ids, days=self.horizon_days, chunk_size=self.chunk_products
+            ))
+            record["model_version"] = ml_service.model_version
+            record["status"] = "succeeded"
+            self.precomputed_on = datetime.now().date()
+        except Exception as e:
+            db.rollback()
+            record["status"] = "failed"
+            record["error"] = str(e)
+            print(f"Forecast run {record['id']} failed: {e}")
+        finally:
+            db.close()
+            record["finished_at"] = datetime.now()
+            self._lock.release()
+
+# Create scheduler instance
+forecast_scheduler = ForecastScheduler(
+    interval_hours=settings.RETRAIN_INTERVAL_HOURS,
+    horizon_days=settings.FORECAST_HORIZON_DAYS,
+    chunk_products=settings.FORECAST_CHUNK_PRODUCTS
+)
@@ -0,0 +1,76 @@
+import json
+import re
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from app.database import models
+
+# EXPLAIN QUERY PLAN detail of a full table scan ("SCAN sales", or
+# "SCAN TABLE sales" before SQLite 3.36); index scans say "USING ... INDEX"
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?!.*\bINDEX\b)")
+
+class IndexAdvisor:
+    """Captures the queries a workload runs and flags sequential scans in their plans
+
+    Plans come from EXPLAIN QUERY PLAN on SQLite and EXPLAIN (FORMAT JSON) on
+    Postgres. Only scans of the app's own tables are flagged, not of
+    subqueries or CTEs.
+    """
+
+    def __init__(self):
+        # Statement text -> parameters of its first execution
+        self.statements: Dict[str, Any] = {}
+
+    @contextmanager
+    def capture(self, engine) -> Iterator["IndexAdvisor"]:
+        """Record every SELECT run through `engine` (sync or async) while active"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+                self.statements.setdefault(statement, parameters)
+
+        event.listen(sync_engine, "before_cursor_execute", record)
+        try:
+            yield self
+        finally:
+            event.remove(sync_engine, "before_cursor_execute", record)
+
+    def explain(self, connection: Connection, statement: str, parameters: Any = ()) -> List[Tuple[str, Optional[str]]]:
+        """Plan steps of a statement as (description, sequentially scanned table or None)"""
+        dialect = connection.dialect.name
+        if dialect == "sqlite":
+            rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            return [(row[-1], self._table(_SQLITE_SCAN.match(row[-1]))) for row in rows]
+        if dialect == "postgresql":
+            plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return list(self._postgres_steps(plan[0]["Plan"]))
+        raise ValueError(f"EXPLAIN is not supported on {dialect}")
+
+    def report(self, connection: Connection) -> List[Dict[str, Any]]:
+        """Explain every captured statement; flagged ones first"""
+        findings = []
+        for statement, parameters in self.statements.items():
+            steps = self.explain(connection, statement, parameters)
+            findings.append({
+                "statement": statement,
+                "plan": [description for description, _ in steps],
+                "sequential_scans": sorted({table for _, table in steps if table})
+            })
+        return sorted(findings, key=lambda finding: not finding["sequential_scans"])
+
+    def _postgres_steps(self, node: Dict[str, Any], depth: int = 0):
+        relation = node.get("Relation Name")
+        description = node["Node Type"] + (f" on {relation}" if relation else "")
+        yield "  " * depth + description, relation if node["Node Type"] == "Seq Scan" and self._is_table(relation) else None
+        for child in node.get("Plans", []):
+            yield from self._postgres_steps(child, depth + 1)
+
+    def _table(self, match) -> Optional[str]:
+        return match.group(1) if match and self._is_table(match.group(1)) else None
+
+    def _is_table(self, name: Optional[str]) -> bool:
+        return name in models.Base.metadata.tables
@@ -8,10 +8,14 @@ import joblib
 import os
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import Dict, Any, List
 from app.database import models
-from app.schemas.schemas import PredictionResponse
+from app.database.partitions import sales_partitions
+from app.schemas.schemas import (
+    BatchPredictionItem, DemandForecast, DemandForecastPoint, PredictionRequest, PredictionResponse
+)
+from app.services.feature_store import feature_store
+from app.services.prediction_cache import prediction_cache
 from app.core.config import settings
 
 class MLService:
@@ -22,24 +26,40 @@ class MLService:
         self.model_version = "1.0.0"
         self.last_trained = None
         self.model_path = settings.MODEL_PATH
+        self.saved_at = None  # mtime of the metadata of the loaded or saved model
         self.load_model()
     
     def load_model(self):
-        """Load the trained model if it exists"""
+        """Load the trained model if it exists
+        
+        A model that fails to load leaves the current one in place.
+        """
         try:
             if os.path.exists(os.path.join(self.model_path, "sales_model.pkl")):
-                self.model = joblib.load(os.path.join(self.model_path, "sales_model.pkl"))
-                self.scaler = joblib.load(os.path.join(self.model_path, "scaler.pkl"))
-                self.label_encoders = joblib.load(os.path.join(self.model_path, "label_encoders.pkl"))
+                metadata_path = os.path.join(self.model_path, "model_metadata.pkl")
+                saved_at = os.path.getmtime(metadata_path) if os.path.exists(metadata_path) else None
+                model = joblib.load(os.path.join(self.model_path, "sales_model.pkl"))
+                scaler = joblib.load(os.path.join(self.model_path, "scaler.pkl"))
+                label_encoders = joblib.load(os.path.join(self.model_path, "label_encoders.pkl"))
                 
                 # Load metadata
-                if os.path.exists(os.path.join(self.model_path, "model_metadata.pkl")):
-                    metadata = joblib.load(os.path.join(self.model_path, "model_metadata.pkl"))
+                if saved_at is not None:
+                    metadata = joblib.load(metadata_path)
                     self.model_version = metadata.get("version", "1.0.0")
                     self.last_trained = metadata.get("last_trained")
+                self.model, self.scaler, self.label_encoders = model, scaler, label_encoders
+                self.saved_at = saved_at
         except Exception as e:
             print(f"Failed to load model: {str(e)}")
-            self.model = None
+    
+    def reload_if_changed(self):
+        """Load the saved model again if another instance or worker has saved a newer one"""
+        try:
+            saved_at = os.path.getmtime(os.path.join(self.model_path, "model_metadata.pkl"))
+        except OSError:
+            return
+        if saved_at != self.saved_at:
+            self.load_model()
     
     def save_model(self):
         """Save the trained model"""
@@ -49,86 +69,30 @@ class MLService:
         joblib.dump(self.scaler, os.path.join(self.model_path, "scaler.pkl"))
         joblib.dump(self.label_encoders, os.path.join(self.model_path, "label_encoders.pkl"))
         
-        # Save metadata
+        # Save metadata last, replacing the old file in one step: other
+        # workers reload once its mtime changes
         metadata = {
             "version": self.model_version,
             "last_trained": datetime.now(),
             "features": self.get_feature_names()
         }
-        joblib.dump(metadata, os.path.join(self.model_path, "model_metadata.pkl"))
+        metadata_path = os.path.join(self.model_path, "model_metadata.pkl")
+        joblib.dump(metadata, metadata_path + ".tmp")
+        os.replace(metadata_path + ".tmp", metadata_path)
+        self.saved_at = os.path.getmtime(metadata_path)
     
     def prepare_features(self, db: Session, product_id: int = None) -> pd.DataFrame:
-        """Prepare features for training or prediction"""
-        # Base query for sales data with product and customer information
-        query = db.query(
-            models.Sale.product_id,
-            models.Sale.quantity,
-            models.Sale.unit_price,
-            models.Sale.final_amount,
-            models.Sale.sale_date,
-            models.Sale.sales_channel,
-            models.Sale.store_location,
-            models.Product.category,
-            models.Product.brand,
-            models.Product.price,
-            models.Customer.customer_segment,
-            models.Customer.city
-        ).join(models.Product).join(models.Customer)
-        
-        if product_id:
-            query = query.filter(models.Sale.product_id == product_id)
-        
-        # Get sales data from last 2 years
-        two_years_ago = datetime.now() - timedelta(days=730)
-        sales_data = query.filter(models.Sale.sale_date >= two_years_ago).all()
-        
-        if not sales_data:
-            raise ValueError("No sales data available for feature preparation")
+        """Prepare features for training or prediction
         
-        # Convert to DataFrame
-        df = pd.DataFrame([
-            {
-                'product_id': sale.product_id,
-                'quantity': sale.quantity,
-                'unit_price': sale.unit_price,
-                'final_amount': sale.final_amount,
-                'sale_date': sale.sale_date,
-                'sales_channel': sale.sales_channel,
-                'store_location': sale.store_location or 'Unknown',
-                'category': sale.category,
-                'brand': sale.brand or 'Unknown',
-                'price': sale.price,
-                'customer_segment': sale.customer_segment or 'Unknown',
-                'city': sale.city or 'Unknown'
-            }
-            for sale in sales_data
-        ])
+        One row per product and complete day with sales in the last two
+        years, read from the feature store after it has caught up with the
+        days sold since its last update.
+        """
+        feature_store.update(db)
+        daily_sales = feature_store.frame(db, (datetime.now() - timedelta(days=730)).date(), product_id=product_id)
         
-        # Feature engineering
-        df['sale_date'] = pd.to_datetime(df['sale_date'])
-        df['day_of_week'] = df['sale_date'].dt.dayofweek
-        df['month'] = df['sale_date'].dt.month
-        df['quarter'] = df['sale_date'].dt.quarter
-        df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
-        
-        # Aggregate daily sales by product
-        daily_sales = df.groupby(['product_id', df['sale_date'].dt.date]).agg({
-            'quantity': 'sum',
-            'final_amount': 'sum',
-            'unit_price': 'mean',
-            'price': 'first',
-            'category': 'first',
-            'brand': 'first',
-            'day_of_week': 'first',
-            'month': 'first',
-            'quarter': 'first',
-            'is_weekend': 'first'
-        }).reset_index()
-        
-        # Add historical features (rolling averages)
-        daily_sales = daily_sales.sort_values(['product_id', 'sale_date'])
-        daily_sales['quantity_7d_avg'] = daily_sales.groupby('product_id')['quantity'].rolling(7, min_periods=1).mean().reset_index(drop=True)
-        daily_sales['quantity_30d_avg'] = daily_sales.groupby('product_id')['quantity'].rolling(30, min_periods=1).mean().reset_index(drop=True)
+        if daily_sales.empty:
+            raise ValueError("No sales data available for feature preparation")
         
         return daily_sales
     
@@ -144,11 +108,10 @@ class MLService:
                     df[f'{col}_encoded'] = self.label_encoders[col].fit_transform(df[col].astype(str))
                 else:
                     if col in self.label_encoders:
-                        # Handle unseen categories
-                        df[f'{col}_encoded'] = df[col].astype(str).apply(
-                            lambda x: self.label_encoders[col].transform([x])[0] 
-                            if x in self.label_encoders[col].classes_ else -1
-                        )
+                        # Unseen categories encode as -1
+                        classes = self.label_encoders[col].classes_
+                        codes = pd.Series(range(len(classes)), index=classes)
+                        df[f'{col}_encoded'] = df[col].astype(str).map(codes).fillna(-1).astype(int)
                     else:
                         df[f'{col}_encoded'] = 0
         
@@ -213,71 +176,174 @@ class MLService:
     
     def predict_sales(self, db: Session, product_id: int, days_ahead: int = 7) -> PredictionResponse:
         """Predict sales for a specific product"""
+        item = self.predict_sales_batch(db, [PredictionRequest(product_id=product_id, days_ahead=days_ahead)])[0]
+        if item.error:
+            raise ValueError(item.error)
+        return item.prediction
+    
+    def predict_sales_batch(self, db: Session, requests: List[PredictionRequest]) -> List[BatchPredictionItem]:
+        """Predict sales for many (product, days ahead) pairs, in request order
+        
+        Predictions are per calendar day and served from the prediction
+        cache while the features they were made from are current. The rest
+        are computed together: products, recent-sales flags and latest
+        feature rows are each read with one query, and every prediction
+        comes from a single model.predict call over the stacked feature
+        rows. A product that doesn't exist is reported on its item.
+        """
+        today, features_through = self._prepare_prediction(db)
+        keys = [(request.product_id, today + timedelta(days=request.days_ahead)) for request in requests]
+        cached = prediction_cache.get_many(db, keys, self.model_version, features_through)
+        uncached = [request for request, key in zip(requests, keys) if key not in cached]
+        computed = self._predict_uncached(db, uncached, today)
+        prediction_cache.put_many(db, [item.prediction for item in computed if item.prediction], features_through)
+        
+        computed = iter(computed)
+        return [
+            BatchPredictionItem(product_id=request.product_id, days_ahead=request.days_ahead, prediction=cached[key])
+            if key in cached else next(computed)
+            for request, key in zip(requests, keys)
+        ]
+    
+    def precompute_forecasts(self, db: Session, product_ids: List[int], days: int = 30, chunk_size: int = 500) -> int:
+        """Write 1..`days`-ahead forecasts of `product_ids` to the prediction cache; returns the rows written
+        
+        Products are scored `chunk_size` at a time, each chunk with one
+        model.predict call and one bulk upsert. Forecasts made from older
+        features are dropped afterwards.
+        """
+        today, features_through = self._prepare_prediction(db)
+        written = 0
+        for offset in range(0, len(product_ids), chunk_size):
+            items = self._predict_uncached(db, [
+                PredictionRequest(product_id=product_id, days_ahead=days_ahead)
+                for product_id in product_ids[offset:offset + chunk_size]
+                for days_ahead in range(1, days + 1)
+            ], today)
+            predictions = [item.prediction for item in items if item.prediction]
+            # Straight to the table; the whole catalog would only churn the LRU
+            prediction_cache.put_many(db, predictions, features_through, remember=False)
+            written += len(predictions)
+        prediction_cache.prune(db, features_through, self.model_version)
+        return written
+    
+    def _prepare_prediction(self, db: Session):
+        """Train if there is no model and bring the features up to date; returns (today, features through)"""
+        self.reload_if_changed()
         if not self.model:
             # Train model if not available
             print("No model found, training new model...")
             self.train_model(db)
+            prediction_cache.invalidate(db, self.model_version)
         
-        # Get product information
-        product = db.query(models.Product).filter(models.Product.id == product_id).first()
-        if not product:
-            raise ValueError(f"Product with ID {product_id} not found")
-        
-        # Get recent sales data for the product
-        recent_sales = db.query(models.Sale).filter(
-            models.Sale.product_id == product_id,
-            models.Sale.sale_date >= datetime.now() - timedelta(days=90)
-        ).all()
-        
-        if not recent_sales:
-            # Use average sales if no recent data
-            predicted_quantity = 1.0
-            confidence_score = 0.3
-        else:
-            # Prepare features for prediction
-            df = self.prepare_features(db, product_id)
-            
-            if df.empty:
+        # Features always run through yesterday once the store is updated
+        feature_store.update(db)
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        return today, (today - timedelta(days=1)).date()
+    
+    def _predict_uncached(self, db: Session, requests: List[PredictionRequest], today: datetime) -> List[BatchPredictionItem]:
+        """predict_sales_batch without the cache, predicting for `today` (midnight) plus days ahead"""
+        if not requests:
+            return []
+        product_ids = list({request.product_id for request in requests})
+        names = dict(db.query(models.Product.id, models.Product.name).filter(models.Product.id.in_(product_ids)))
+        
+        # Products with sales in the last 90 days
+        since = datetime.now() - timedelta(days=90)
+        Sale = sales_partitions.source(db, since)
+        recent = {
+            product_id for (product_id,) in db.query(Sale.product_id).filter(
+                Sale.product_id.in_(list(names)),
+                Sale.sale_date >= since
+            ).distinct()
+        } if names else set()
+        
+        scored = []
+        if recent:
+            # Latest precomputed feature row of each of them, one model input row per request
+            latest = self.encode_categorical_features(feature_store.latest(db, list(recent)), fit=False)
+            latest = latest.set_index('product_id', drop=False)
+            scored = [
+                (position, request) for position, request in enumerate(requests)
+                if request.product_id in latest.index
+            ]
+        predicted = {}
+        if scored:
+            X = latest.loc[[request.product_id for _, request in scored]].reset_index(drop=True)
+            # Prediction date features
+            prediction_dates = pd.to_datetime([today + timedelta(days=request.days_ahead) for _, request in scored])
+            X['day_of_week'] = prediction_dates.dayofweek
+            X['month'] = prediction_dates.month
+            X['quarter'] = prediction_dates.quarter
+            X['is_weekend'] = X['day_of_week'].isin([5, 6]).astype(int)
+            X_scaled = self.scaler.transform(X[self.get_feature_names()].fillna(0))
+            predicted = dict(zip((position for position, _ in scored), self.model.predict(X_scaled)))
+        
+        items = []
+        for position, request in enumerate(requests):
+            if request.product_id not in names:
+                items.append(BatchPredictionItem(
+                    product_id=request.product_id,
+                    days_ahead=request.days_ahead,
+                    error=f"Product with ID {request.product_id} not found"
+                ))
+                continue
+            if position in predicted:
+                predicted_quantity = float(predicted[position])
+                # Calculate confidence based on model's feature importance and data recency
+                confidence_score = min(0.95, max(0.1, 0.8 - (request.days_ahead * 0.05)))
+            else:
+                # Use average sales if no recent data
                 predicted_quantity = 1.0
                 confidence_score = 0.3
-            else:
-                # Use latest data point for prediction
-                df = self.encode_categorical_features(df, fit=False)
-                latest_data = df.iloc[-1:].copy()
-                
-                # Prepare prediction date features
-                prediction_date = datetime.now() + timedelta(days=days_ahead)
-                latest_data['day_of_week'] = prediction_date.weekday()
-                latest_data['month'] = prediction_date.month
-                latest_data['quarter'] = (prediction_date.month - 1) // 3 + 1
-                latest_data['is_weekend'] = int(prediction_date.weekday() in [5, 6])
-                
-                feature_columns = [
-                    'unit_price', 'price', 'day_of_week', 'month', 'quarter', 'is_weekend',
-                    'quantity_7d_avg', 'quantity_30d_avg', 'category_encoded', 'brand_encoded'
-                ]
-                
-                X = latest_data[feature_columns].fillna(0)
-                X_scaled = self.scaler.transform(X)
-                
-                predicted_quantity = float(self.model.predict(X_scaled)[0])
-                
-                # Calculate confidence based on model's feature importance and data recency
-                confidence_score = min(0.95, max(0.1, 0.8 - (days_ahead * 0.05)))
-        
-        return PredictionResponse(
+            items.append(BatchPredictionItem(
+                product_id=request.product_id,
+                days_ahead=request.days_ahead,
+                prediction=PredictionResponse(
+                    product_id=request.product_id,
+                    product_name=names[request.product_id],
+                    predicted_quantity=max(0, predicted_quantity),
+                    confidence_score=confidence_score,
+                    prediction_date=today + timedelta(days=request.days_ahead),
+                    model_version=self.model_version
+                )
+            ))
+        return items
+    
+    def forecast_demand(self, db: Session, product_id: int, days: int = 30) -> DemandForecast:
+        """Daily demand curve for the next `days` days
+        
+        All horizons share the product's latest feature row and are scored
+        by one model.predict call (see predict_sales_batch).
+        """
+        items = self.predict_sales_batch(db, [
+            PredictionRequest(product_id=product_id, days_ahead=days_ahead) for days_ahead in range(1, days + 1)
+        ])
+        if items[0].error:
+            raise ValueError(items[0].error)
+        predictions = [item.prediction for item in items]
+        return DemandForecast(
             product_id=product_id,
-            product_name=product.name,
-            predicted_quantity=max(0, predicted_quantity),
-            confidence_score=confidence_score,
-            prediction_date=datetime.now() + timedelta(days=days_ahead),
-            model_version=self.model_version
+            product_name=predictions[0].product_name,
+            model_version=predictions[0].model_version,
+            total_predicted_quantity=sum(prediction.predicted_quantity for prediction in predictions),
+            points=[
+                DemandForecastPoint(
+                    days_ahead=item.days_ahead,
+                    prediction_date=item.prediction.prediction_date,
+                    predicted_quantity=item.prediction.predicted_quantity,
+                    confidence_score=item.prediction.confidence_score
+                )
+                for item in items
+            ]
         )
     
     def retrain_model(self, db: Session):
         """Retrain the model with latest data"""
         try:
             metrics = self.train_model(db)
+            # Forecasts of earlier versions are never served again
+            prediction_cache.invalidate(db, self.model_version)
             print(f"Model retrained successfully. Metrics: {metrics}")
             return metrics
         except Exception as e:
@@ -352,13 +418,10 @@ class MLService:
             raise ValueError(f"Product with ID {product_id} not found")
         
         # Get sales predictions for next 30 days
-        predictions = []
-        for days in range(1, 31):
-            pred = self.predict_sales(db, product_id, days)
-            predictions.append(pred.predicted_quantity)
+        forecast = self.forecast_demand(db, product_id, 30)
         
         # Calculate recommendations
-        total_predicted_demand = sum(predictions)
+        total_predicted_demand = forecast.total_predicted_quantity
         current_stock = product.stock_quantity
         reorder_level = product.reorder_level
         
@@ -387,3 +450,6 @@ class MLService:
             "recommendations": recommendations,
             "status": "critical" if current_stock < total_predicted_demand * 0.5 else "warning" if current_stock < total_predicted_demand else "good"
         }
+
+# Create service instance
+ml_service = MLService()
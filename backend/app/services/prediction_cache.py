@@ -0,0 +1,146 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import delete, or_, select
+from sqlalchemy.orm import Session
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.database import models
+from app.database.dialects import dialect_insert
+from app.schemas.schemas import PredictionResponse
+
+_MISSING = object()
+
+# (product_id, predicted day at midnight)
+PredictionKey = Tuple[int, datetime]
+
+class PredictionCache:
+    """MLService forecasts cached in sales_predictions, with an in-process LRU in front
+
+    Rows are keyed by (product_id, prediction_date, model_version) and only
+    served while their features_through matches the feature store's
+    watermark, so they go stale as soon as a new day of sales has been
+    folded into the features. invalidate() drops the rows of every other
+    model version after a retrain.
+    """
+
+    def __init__(self, max_entries: int = 50000, ttl_seconds: float = 3600, enabled: bool = True):
+        self.enabled = enabled
+        self.lru = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def get_many(
+        self, db: Session, keys: Sequence[PredictionKey], model_version: str, features_through: date
+    ) -> Dict[PredictionKey, PredictionResponse]:
+        """Cached predictions for those of `keys` that have one; at most one query"""
+        if not self.enabled:
+            return {}
+        found, missing = {}, set()
+        for key in keys:
+            entry = self.lru.get(
+                (key, model_version), _MISSING, is_valid=lambda entry: entry[0] == features_through
+            )
+            if entry is _MISSING:
+                missing.add(key)
+            else:
+                found[key] = entry[1]
+        if not missing:
+            return found
+
+        predictions, products = models.SalesPrediction, models.Product
+        rows = db.execute(
+            select(
+                predictions.product_id, predictions.prediction_date, predictions.predicted_quantity,
+                predictions.confidence_score, products.name
+            ).join(products, products.id == predictions.product_id).where(
+                predictions.product_id.in_({product_id for product_id, _ in missing}),
+                predictions.prediction_date.in_({day for _, day in missing}),
+                predictions.model_version == model_version,
+                predictions.features_through == features_through
+            )
+        )
+        for product_id, prediction_date, quantity, confidence, name in rows:
+            # PostgreSQL returns the timestamptz timezone-aware, in the session
+            # time zone the naive midnight was stored in; keys are naive
+            key = (product_id, prediction_date.replace(tzinfo=None))
+            if key not in missing:
+                continue
+            found[key] = PredictionResponse(
+                product_id=product_id,
+                product_name=name,
+                predicted_quantity=quantity,
+                confidence_score=confidence,
+                prediction_date=key[1],
+                model_version=model_version
+            )
+            self.lru.set((key, model_version), (features_through, found[key]))
+        return found
+
+    def put_many(
+        self, db: Session, predictions: List[PredictionResponse], features_through: date, remember: bool = True
+    ):
+        """Store fresh predictions (upserting older rows for the same key) and commit
+
+        `remember=False` skips the LRU, for bulk precomputes.
+        """
+        if not self.enabled or not predictions:
+            return
+        # One row per key; ON CONFLICT can't touch a row twice in a statement
+        latest = {(prediction.product_id, prediction.prediction_date): prediction for prediction in predictions}
+        rows = [
+            {
+                "product_id": prediction.product_id,
+                "prediction_date": prediction.prediction_date,
+                "predicted_quantity": prediction.predicted_quantity,
+                "confidence_score": prediction.confidence_score,
+                "model_version": prediction.model_version,
+                "features_through": features_through
+            }
+            for prediction in latest.values()
+        ]
+        table = models.SalesPrediction.__table__
+        stmt = dialect_insert(db)(table)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.product_id, table.c.prediction_date, table.c.model_version],
+            set_={
+                "predicted_quantity": stmt.excluded.predicted_quantity,
+                "confidence_score": stmt.excluded.confidence_score,
+                "features_through": stmt.excluded.features_through
+            }
+        ), rows)
+        db.commit()
+        if remember:
+            for key, prediction in latest.items():
+                self.lru.set((key, prediction.model_version), (features_through, prediction))
+
+    def invalidate(self, db: Session, model_version: str) -> int:
+        """Drop cached predictions of every model version but `model_version`; returns the rows deleted"""
+        self.lru.clear()
+        predictions = models.SalesPrediction
+        deleted = db.execute(delete(predictions).where(
+            or_(predictions.model_version != model_version, predictions.model_version.is_(None))
+        )).rowcount
+        db.commit()
+        return deleted
+
+    def prune(self, db: Session, features_through: date, model_version: Optional[str] = None) -> int:
+        """Drop predictions made from features older than `features_through`; returns the rows deleted
+        
+        With `model_version`, predictions of every other version go too,
+        e.g. ones a worker still on an older model wrote after a retrain.
+        """
+        predictions = models.SalesPrediction
+        stale = [predictions.features_through < features_through, predictions.features_through.is_(None)]
+        if model_version:
+            stale += [predictions.model_version != model_version, predictions.model_version.is_(None)]
+        deleted = db.execute(delete(predictions).where(or_(*stale))).rowcount
+        db.commit()
+        return deleted
+
+    def stats(self) -> Dict:
+        return {**self.lru.stats(), "enabled": self.enabled}
+
+# Create cache instance
+prediction_cache = PredictionCache(
+    max_entries=settings.PREDICTION_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS,
+    enabled=settings.PREDICTION_CACHE_ENABLED
+)
@@ -0,0 +1,65 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func
+from typing import List, Optional
+from app.database import models
+from app.database.dialects import dialect_insert
+from app.database.partitions import sales_partitions
+
+class RollupService:
+    """Maintains the sales_daily_rollup fact table (one row per day and product)"""
+
+    def daily_rollup_select(self, sale_ids: Optional[List[int]] = None, Sale=models.Sale):
+        """Aggregate sales into (day, product_id) rows, optionally restricted to some sales
+        
+        Fresh sales are always in the `sales` table itself; a rebuild passes
+        the partition-aware source to cover sealed months too.
+        """
+        day = func.date(Sale.sale_date)
+        query = select(
+            day.label('day'),
+            Sale.product_id,
+            func.sum(Sale.final_amount).label('revenue'),
+            func.sum(Sale.quantity).label('quantity'),
+            func.count(Sale.id).label('order_count')
+        )
+        if sale_ids is not None:
+            query = query.where(Sale.id.in_(sale_ids))
+        return query.group_by(day, Sale.product_id)
+
+    async def apply_sales(self, db: AsyncSession, sale_ids: List[int]):
+        """Add freshly inserted sales to the rollup inside the caller's transaction"""
+        if not sale_ids:
+            return
+
+        rollup = models.SalesDailyRollup
+        insert = dialect_insert(db)
+        stmt = insert(rollup).from_select(
+            ['day', 'product_id', 'revenue', 'quantity', 'order_count'],
+            self.daily_rollup_select(sale_ids)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[rollup.day, rollup.product_id],
+            set_={
+                'revenue': rollup.revenue + stmt.excluded.revenue,
+                'quantity': rollup.quantity + stmt.excluded.quantity,
+                'order_count': rollup.order_count + stmt.excluded.order_count
+            }
+        )
+        await db.execute(stmt)
+
+    def rebuild(self, db: Session) -> int:
+        """Recompute the whole rollup from the sales table"""
+        rollup = models.SalesDailyRollup
+        db.execute(delete(rollup))
+        db.execute(
+            rollup.__table__.insert().from_select(
+                ['day', 'product_id', 'revenue', 'quantity', 'order_count'],
+                self.daily_rollup_select(Sale=sales_partitions.source(db))
+            )
+        )
+        db.commit()
+        return db.query(func.count()).select_from(rollup).scalar()
+
+# Create service instance
+rollup_service = RollupService()
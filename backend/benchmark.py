@@ -0,0 +1,971 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for Retail Analytics Platform
+
+Each benchmark seeds a scratch database with synthetic data (a temporary
+SQLite file unless --database-url is given) and prints median latencies.
+
+Usage:
+    python benchmark.py sales-overview --rows 1000000 10000000
+    python benchmark.py concurrency --rows 200000
+    python benchmark.py business-context --rows 1000000
+    python benchmark.py sqlite-writes --writers 8
+    python benchmark.py checkout --writers 16 --stock 1000
+    python benchmark.py bulk-ingest --batch 1000 5000
+    python benchmark.py export --rows 1000000
+    python benchmark.py pagination --rows 1000000 --pages 1 100 2000
+    python benchmark.py query-count
+    python benchmark.py serialization --page-size 1000
+    python benchmark.py ml-features --rows 500000
+    python benchmark.py ml-batch --products 5000
+    python benchmark.py ml-inventory --products 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, delete, func, and_, insert
+from sqlalchemy.orm import Session
+from app.database import models
+from app.services.aggregate_planner import sales_overview_planner
+from app.services.rollup_service import rollup_service
+from app.services.columnar_store import ColumnarSalesStore
+import app.services.aggregate_planner as aggregate_planner
+
+def scratch_engine(database_url=None, label="bench"):
+    """Create an engine for a benchmark database with the schema in place"""
+    if not database_url:
+        path = os.path.join(tempfile.mkdtemp(prefix="retail-bench-"), f"{label}.db")
+        database_url = f"sqlite:///{path}"
+    engine = create_engine(database_url)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    return engine
+
+def populate(engine, rows, products=1000, customers=10000, days=365, chunk_size=50000):
+    """Insert synthetic products, customers and `rows` sales spread over `days`"""
+    categories = ["Electronics", "Clothing", "Home & Garden", "Sports", "Books", "Health", "Automotive"]
+    channels = ["online", "in-store", "mobile"]
+    stores = ["New York", "Los Angeles", "Chicago", "Houston", "Phoenix"]
+    rng = random.Random(42)
+    now = datetime.now()
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.Product), [
+            {
+                "id": i, "name": f"Product {i}", "category": categories[i % len(categories)],
+                "brand": f"Brand {i % 25}", "price": 10.0 + i % 90, "cost": 5.0 + i % 45,
+                "sku": f"SKU{i:06d}", "stock_quantity": 1_000_000, "reorder_level": 10, "is_active": True
+            }
+            for i in range(1, products + 1)
+        ])
+        conn.execute(insert(models.Customer), [
+            {
+                "id": i, "first_name": "Customer", "last_name": str(i), "email": f"customer{i}@example.com",
+                "customer_segment": ["VIP", "Regular", "New"][i % 3], "total_spent": 0.0, "total_orders": 0,
+                "is_active": True
+            }
+            for i in range(1, customers + 1)
+        ])
+
+    for offset in range(0, rows, chunk_size):
+        batch = []
+        for i in range(offset, min(rows, offset + chunk_size)):
+            quantity = rng.randint(1, 5)
+            unit_price = 10.0 + i % 90
+            total = quantity * unit_price
+            batch.append({
+                "product_id": rng.randint(1, products),
+                "customer_id": rng.randint(1, customers),
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "total_amount": total,
+                "discount_amount": 0.0,
+                "tax_amount": 0.0,
+                "final_amount": total,
+                "sale_date": now - timedelta(seconds=rng.randint(0, days * 86400)),
+                "payment_method": "card",
+                "store_location": stores[i % len(stores)],
+                "sales_channel": channels[i % len(channels)],
+                "transaction_id": f"BENCH{i:09d}"
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(models.Sale), batch)
+
+def scratch_api(engine, **routers):
+    """A FastAPI app serving `routers` (by URL prefix) from the scratch database"""
+    from fastapi import FastAPI
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.database.connection import get_async_db, get_async_database_url
+
+    async_engine = create_async_engine(
+        get_async_database_url(engine.url.render_as_string(hide_password=False))
+    )
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+    app = FastAPI()
+    for prefix, router in routers.items():
+        app.include_router(router, prefix=f"/{prefix}")
+
+    async def scratch_db():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = scratch_db
+    return app, async_engine
+
+def timed(fn, repeat):
+    """Median wall time of `repeat` calls, in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def legacy_sales_overview(db, start_date, end_date):
+    """The original five-query sales-overview, kept as the baseline"""
+    date_filter = and_(models.Sale.sale_date >= start_date, models.Sale.sale_date <= end_date)
+    db.query(
+        func.sum(models.Sale.final_amount), func.count(models.Sale.id), func.avg(models.Sale.final_amount)
+    ).filter(date_filter).first()
+    db.query(
+        models.Product.name, models.Product.category,
+        func.sum(models.Sale.quantity), func.sum(models.Sale.final_amount)
+    ).join(models.Sale).filter(date_filter).group_by(
+        models.Product.id, models.Product.name, models.Product.category
+    ).order_by(func.sum(models.Sale.final_amount).desc()).limit(10).all()
+    db.query(
+        models.Customer.first_name, models.Customer.last_name, models.Customer.email,
+        func.sum(models.Sale.final_amount), func.count(models.Sale.id)
+    ).join(models.Sale).filter(date_filter).group_by(
+        models.Customer.id, models.Customer.first_name, models.Customer.last_name, models.Customer.email
+    ).order_by(func.sum(models.Sale.final_amount).desc()).limit(10).all()
+    db.query(
+        models.Product.category, func.sum(models.Sale.final_amount), func.sum(models.Sale.quantity)
+    ).join(models.Sale).filter(date_filter).group_by(models.Product.category).all()
+    db.query(
+        func.date(models.Sale.sale_date), func.sum(models.Sale.final_amount), func.count(models.Sale.id)
+    ).filter(date_filter).group_by(func.date(models.Sale.sale_date)).order_by(
+        func.date(models.Sale.sale_date)
+    ).all()
+
+def bench_sales_overview(args):
+    """Legacy five-query overview vs the fused single scan, the rollup and the columnar store"""
+    print(f"{'rows':>12} {'legacy ms':>12} {'fused ms':>12} {'rollup ms':>12} {'columnar ms':>12} {'columnar MB':>12}")
+    for rows in args.rows:
+        engine = scratch_engine(args.database_url, f"overview-{rows}")
+        populate(engine, rows)
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=args.window_days)
+        with Session(engine) as db:
+            rollup_service.rebuild(db)
+            legacy = timed(lambda: legacy_sales_overview(db, start_date, end_date), args.repeat)
+            fused = timed(lambda: sales_overview_planner.run(db, start_date, end_date, strategy="fused"), args.repeat)
+            rollup = timed(lambda: sales_overview_planner.run(db, start_date, end_date, strategy="rollup"), args.repeat)
+            store = aggregate_planner.columnar_store = ColumnarSalesStore()
+            store.load(db)
+            columnar = timed(lambda: sales_overview_planner.run(db, start_date, end_date, strategy="columnar"), args.repeat)
+            megabytes = store.memory_footprint()["used_bytes"] / 1e6
+        print(f"{rows:>12} {legacy:>12.1f} {fused:>12.1f} {rollup:>12.1f} {columnar:>12.1f} {megabytes:>12.1f}")
+        engine.dispose()
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of latencies"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+def bench_concurrency(args):
+    """Latency of fast product lookups while slow sales-overview requests run
+
+    Compares the AsyncSession handlers with the old handler shape (an async
+    endpoint querying a sync Session, which blocks the event loop) by
+    driving both through the same ASGI app with concurrent clients.
+    """
+    import httpx
+    from app.api.routers import analytics, products
+    from app.core.cache import response_cache
+
+    engine = scratch_engine(args.database_url, "concurrency")
+    populate(engine, args.rows)
+    app, async_engine = scratch_api(engine, products=products.router, analytics=analytics.router)
+
+    @app.get("/blocking/sales-overview")
+    async def blocking_sales_overview(start_date: datetime, end_date: datetime):
+        # The pre-async handler shape: a sync Session queried on the event loop
+        with Session(engine) as db:
+            return sales_overview_planner.run(db, start_date, end_date, strategy="fused")
+
+    # Every slow request must really hit the database
+    response_cache.enabled = False
+
+    # Not aligned to whole days, so sales-overview takes the fused scan
+    end_date = datetime.now()
+    params = {
+        "start_date": (end_date - timedelta(days=args.window_days)).isoformat(),
+        "end_date": end_date.isoformat()
+    }
+
+    async def load(client, slow_path):
+        fast, slow_done, stop = [], [], asyncio.Event()
+
+        async def slow_client():
+            while slow_path and not stop.is_set():
+                response = await client.get(slow_path, params=params)
+                response.raise_for_status()
+                slow_done.append(1)
+                # ASGITransport has no socket I/O, so yield like a network round trip would
+                await asyncio.sleep(0)
+
+        async def fast_client(worker):
+            rng = random.Random(worker)
+            deadline = time.perf_counter() + args.duration
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(f"/products/{rng.randint(1, 1000)}")
+                response.raise_for_status()
+                fast.append((time.perf_counter() - started) * 1000)
+
+        slow = [asyncio.create_task(slow_client()) for _ in range(args.slow_clients)]
+        await asyncio.gather(*(fast_client(i) for i in range(args.fast_clients)))
+        stop.set()
+        await asyncio.gather(*slow)
+        return fast, len(slow_done)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for label, slow_path in (
+                ("idle", None),
+                ("async", "/analytics/sales-overview"),
+                ("blocking", "/blocking/sales-overview")
+            ):
+                fast, slow_count = await load(client, slow_path)
+                print(f"{label:>10} {len(fast):>14} {percentile(fast, 50):>12.1f} {percentile(fast, 99):>12.1f} {slow_count:>14}")
+        await async_engine.dispose()
+
+    print(f"{'handlers':>10} {'fast requests':>14} {'fast p50 ms':>12} {'fast p99 ms':>12} {'slow requests':>14}")
+    asyncio.run(run())
+    engine.dispose()
+
+def bench_business_context(args):
+    """get_business_context with its sub-queries run one at a time vs fanned out
+
+    The fan-out overlaps database round trips, so it pays off against a
+    server database (--database-url postgresql://...) or on several cores.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.api.routers import reports
+    from app.core.cache import response_cache
+    from app.database.connection import get_async_database_url
+
+    engine = scratch_engine(args.database_url, "business-context")
+    populate(engine, args.rows)
+    engine.dispose()
+    response_cache.enabled = False
+
+    async def run():
+        async_engine = create_async_engine(
+            get_async_database_url(engine.url.render_as_string(hide_password=False)),
+            pool_size=max(args.concurrency),
+            max_overflow=0
+        )
+        sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+        for limit in args.concurrency:
+            reports._query_slots[asyncio.get_running_loop()] = asyncio.Semaphore(limit)
+            await reports.get_business_context(sessions)  # warm the pool
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                await reports.get_business_context(sessions)
+                samples.append((time.perf_counter() - started) * 1000)
+            print(f"{limit:>12} {statistics.median(samples):>12.1f}")
+        await async_engine.dispose()
+
+    print(f"{'concurrency':>12} {'median ms':>12}")
+    asyncio.run(run())
+
+def bench_sqlite_writes(args):
+    """Concurrent single-sale write transactions: SQLite defaults vs the tuned profile"""
+    import threading
+    from sqlalchemy import event, update
+    from sqlalchemy.exc import OperationalError
+    from app.database.connection import apply_sqlite_pragmas
+
+    print(f"{'profile':>10} {'commits/s':>12} {'p99 ms':>12} {'errors':>8}")
+    for profile in ("default", "tuned"):
+        engine = scratch_engine(None, f"writes-{profile}")
+        populate(engine, 0, products=100, customers=100)
+        engine.dispose()
+        engine = create_engine(engine.url, pool_size=args.writers, connect_args={"timeout": 5})
+        if profile == "tuned":
+            event.listen(engine, "connect", apply_sqlite_pragmas)
+        latencies, errors, lock = [], [], threading.Lock()
+
+        def writer(worker):
+            rng = random.Random(worker)
+            for i in range(args.transactions):
+                product_id = rng.randint(1, 100)
+                started = time.perf_counter()
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(insert(models.Sale), {
+                            "product_id": product_id, "customer_id": rng.randint(1, 100), "quantity": 1,
+                            "unit_price": 10.0, "total_amount": 10.0, "final_amount": 10.0,
+                            "transaction_id": f"W{worker}-{i}", "sale_date": datetime.now()
+                        })
+                        conn.execute(
+                            update(models.Product).where(models.Product.id == product_id)
+                            .values(stock_quantity=models.Product.stock_quantity - 1)
+                        )
+                except OperationalError:
+                    with lock:
+                        errors.append(worker)
+                    continue
+                with lock:
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        print(f"{profile:>10} {len(latencies) / elapsed:>12.0f} {percentile(latencies, 99):>12.1f} {len(errors):>8}")
+        engine.dispose()
+
+async def legacy_create_sale(db, sale):
+    """The original create_sale stock handling: read, compare, write back"""
+    product = await db.get(models.Product, sale.product_id)
+    customer = await db.get(models.Customer, sale.customer_id)
+    if product.stock_quantity < sale.quantity:
+        raise ValueError("Insufficient stock")
+    total_amount = sale.quantity * sale.unit_price
+    db.add(models.Sale(**sale.dict(), total_amount=total_amount, final_amount=total_amount))
+    product.stock_quantity -= sale.quantity
+    customer.total_spent += total_amount
+    customer.total_orders += 1
+    await db.commit()
+
+def bench_checkout(args):
+    """Concurrent checkouts of one hot product: no oversell, no lost updates
+
+    Writer threads (each with its own event loop and connection) create
+    sales for the same product until demand far exceeds its stock. Then the
+    stock left, the quantities sold and the customer totals must agree.
+    Runs the original read-compare-write create_sale next to the atomic
+    one; exits with status 1 if the atomic one oversells or loses an update.
+    With --write-behind the atomic run buffers customer totals, flushed
+    before checking.
+    """
+    import threading
+    from sqlalchemy import event, select
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.core.cache import response_cache
+    from app.database.connection import apply_sqlite_pragmas, get_async_database_url
+    from app.schemas.schemas import SaleCreate
+    from app.services.crud import sale_service
+    from app.services.customer_totals import customer_totals
+
+    response_cache.enabled = False
+    customer_totals.write_behind = args.write_behind
+    failed = 0
+    print(f"{'create_sale':>12} {'checkouts/s':>12} {'sold':>8} {'stock left':>11} {'rejected':>9} {'errors':>7} {'oversold':>9} {'lost updates':>13}")
+    for label, create in (("legacy", legacy_create_sale), ("atomic", sale_service.create_sale)):
+        engine = scratch_engine(args.database_url, f"checkout-{label}")
+        populate(engine, 0, products=1, customers=args.customers)
+        with engine.begin() as conn:
+            conn.execute(models.Product.__table__.update().values(stock_quantity=args.stock))
+        url = get_async_database_url(engine.url.render_as_string(hide_password=False))
+        outcomes, lock = {"sold": 0, "rejected": 0, "errors": 0}, threading.Lock()
+
+        def writer(worker):
+            async def run():
+                async_engine = create_async_engine(url, pool_size=1, max_overflow=0)
+                if url.startswith("sqlite"):
+                    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+                sessions = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+                rng = random.Random(worker)
+                for i in range(args.attempts):
+                    sale = SaleCreate(
+                        product_id=1, customer_id=rng.randint(1, args.customers), quantity=rng.randint(1, 3),
+                        unit_price=10.0, transaction_id=f"{label}-{worker}-{i}"
+                    )
+                    async with sessions() as db:
+                        try:
+                            await create(db, sale)
+                            outcome = "sold"
+                        except ValueError:
+                            outcome = "rejected"
+                        except OperationalError:
+                            outcome = "errors"
+                    with lock:
+                        outcomes[outcome] += 1
+                await async_engine.dispose()
+            asyncio.run(run())
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        async def flush():
+            async_engine = create_async_engine(url)
+            async with async_sessionmaker(async_engine)() as db:
+                await customer_totals.flush(db)
+            await async_engine.dispose()
+        asyncio.run(flush())
+
+        with Session(engine) as db:
+            stock_left = db.scalar(select(models.Product.stock_quantity))
+            sold_quantity = db.scalar(select(func.coalesce(func.sum(models.Sale.quantity), 0)))
+            sale_count = db.scalar(select(func.count(models.Sale.id)))
+            recorded_orders = db.scalar(select(func.sum(models.Customer.total_orders)))
+        oversold = max(0, sold_quantity - args.stock)
+        # Stock or customer order counts that don't account for every recorded sale
+        lost_updates = abs(args.stock - stock_left - sold_quantity) + abs(sale_count - recorded_orders)
+        if label == "atomic" and (oversold or lost_updates or stock_left < 0):
+            failed = 1
+        print(
+            f"{label:>12} {outcomes['sold'] / elapsed:>12.0f} {sold_quantity:>8} {stock_left:>11} "
+            f"{outcomes['rejected']:>9} {outcomes['errors']:>7} {oversold:>9} {lost_updates:>13}"
+        )
+        engine.dispose()
+    return failed
+
+def bench_bulk_ingest(args):
+    """Per-sale create_sale calls vs one create_sales_bulk call for the same batch"""
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.database.connection import get_async_database_url
+    from app.schemas.schemas import SaleCreate
+    from app.services.crud import sale_service
+
+    def batch(size, prefix):
+        rng = random.Random(size)
+        return [
+            SaleCreate(
+                product_id=rng.randint(1, 1000), customer_id=rng.randint(1, 10000), quantity=rng.randint(1, 5),
+                unit_price=10.0, transaction_id=f"{prefix}{size}-{i}"
+            )
+            for i in range(size)
+        ]
+
+    async def run(engine):
+        async_engine = create_async_engine(get_async_database_url(engine.url.render_as_string(hide_password=False)))
+        sessions = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+        for size in args.batch:
+            sales = batch(size, "ONE")
+            started = time.perf_counter()
+            async with sessions() as db:
+                for sale in sales:
+                    await sale_service.create_sale(db, sale)
+            single = (time.perf_counter() - started) * 1000
+
+            sales = batch(size, "BULK")
+            started = time.perf_counter()
+            async with sessions() as db:
+                result = await sale_service.create_sales_bulk(db, sales)
+            bulk = (time.perf_counter() - started) * 1000
+            assert result["created"] == size, result["errors"][:5]
+            print(f"{size:>10} {single:>14.1f} {bulk:>12.1f} {size / bulk * 1000:>14.0f}")
+        await async_engine.dispose()
+
+    engine = scratch_engine(args.database_url, "bulk-ingest")
+    populate(engine, 0)
+    print(f"{'batch':>10} {'per-sale ms':>14} {'bulk ms':>12} {'bulk rows/s':>14}")
+    asyncio.run(run(engine))
+    engine.dispose()
+
+def bench_export(args):
+    """Time to first byte, throughput and peak Python memory of the streaming export"""
+    import tracemalloc
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.database.connection import get_async_database_url
+    from app.schemas.schemas import ExportFormat
+    from app.services import export_service
+
+    engine = scratch_engine(args.database_url, "export")
+    populate(engine, args.rows)
+    engine.dispose()
+
+    async def run():
+        async_engine = create_async_engine(get_async_database_url(engine.url.render_as_string(hide_password=False)))
+        sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+        for format in ExportFormat:
+            tracemalloc.start()
+            started = time.perf_counter()
+            first_byte, size = None, 0
+            async for chunk in export_service.sales_exporter.stream(sessions, format):
+                if first_byte is None and size:
+                    first_byte = (time.perf_counter() - started) * 1000
+                size += len(chunk)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{format.value:>8} {first_byte:>14.1f} {args.rows / elapsed:>12.0f} {size / 1e6:>10.1f} {peak / 1e6:>10.1f}")
+        await async_engine.dispose()
+
+    print(f"{'format':>8} {'first byte ms':>14} {'rows/s':>12} {'MB out':>10} {'peak MB':>10}")
+    asyncio.run(run())
+
+def bench_pagination(args):
+    """Offset vs keyset latency of the sales listing at increasing page depths"""
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.database.connection import get_async_database_url
+    from app.services.crud import sale_service
+
+    engine = scratch_engine(args.database_url, "pagination")
+    populate(engine, args.rows)
+    engine.dispose()
+
+    async def run():
+        async_engine = create_async_engine(get_async_database_url(engine.url.render_as_string(hide_password=False)))
+        sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+        async with sessions() as db:
+            # Walk the keyset pages once to find the cursor of each requested page
+            cursors, cursor = {}, None
+            for page in range(1, max(args.pages) + 1):
+                if page in args.pages:
+                    cursors[page] = cursor
+                _, cursor = await sale_service.get_sales_page(db, cursor=cursor, limit=args.page_size)
+                db.expunge_all()
+
+            async def median_ms(fetch):
+                samples = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    await fetch()
+                    samples.append((time.perf_counter() - started) * 1000)
+                    db.expunge_all()
+                return statistics.median(samples)
+
+            for page in args.pages:
+                offset = await median_ms(lambda: sale_service.get_sales(
+                    db, skip=(page - 1) * args.page_size, limit=args.page_size
+                ))
+                keyset = await median_ms(lambda: sale_service.get_sales_page(
+                    db, cursor=cursors[page], limit=args.page_size
+                ))
+                print(f"{page:>8} {offset:>12.1f} {keyset:>12.1f}")
+        await async_engine.dispose()
+
+    print(f"{'page':>8} {'offset ms':>12} {'keyset ms':>12}")
+    asyncio.run(run())
+
+def bench_query_count(args):
+    """SQL statements per request for the listing endpoints, checked against a budget
+
+    Guards against N+1 regressions: a page of sales loads each expanded
+    relation with one batched query however many rows it has. Exits with
+    status 1 when an endpoint goes over budget.
+    """
+    import httpx
+    from sqlalchemy import event
+    from app.api.routers import customers, products, sales
+
+    engine = scratch_engine(args.database_url, "query-count")
+    populate(engine, args.rows, products=50, customers=50)
+    app, async_engine = scratch_api(engine, sales=sales.router, products=products.router, customers=customers.router)
+    statements = []
+
+    def count(conn, cursor, statement, *_):
+        # Catalog lookups (the partition manager's schema version check) aren't row loads
+        if not statement.lstrip().upper().startswith("PRAGMA") and "sqlite_master" not in statement:
+            statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+
+    budgets = (
+        ("/sales/?limit=1000", 3),
+        ("/sales/?limit=1000&expand=product", 2),
+        ("/sales/?limit=1000&expand=", 1),
+        ("/sales/?limit=1000&cursor=", 3),
+        ("/sales/customer/1?limit=1000", 3),
+        ("/sales/product/1?limit=1000", 3),
+        ("/sales/1", 3),
+        ("/products/?limit=1000", 1),
+        ("/customers/?limit=1000", 1)
+    )
+
+    async def run():
+        over_budget = 0
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for path, budget in budgets:
+                statements.clear()
+                response = await client.get(path)
+                response.raise_for_status()
+                ok = len(statements) <= budget
+                over_budget += not ok
+                print(f"{path:<40} {len(statements):>8} {budget:>8} {'ok' if ok else 'OVER':>6}")
+        await async_engine.dispose()
+        return over_budget
+
+    print(f"{'request':<40} {'queries':>8} {'budget':>8} {'':>6}")
+    over_budget = asyncio.run(run())
+    engine.dispose()
+    return 1 if over_budget else 0
+
+def bench_serialization(args):
+    """Throughput of rendering a page of Sale and Product rows to JSON
+
+    Compares the original path (schema validation, jsonable_encoder, stdlib
+    json), schema validation rendered by orjson, and the row encoders used
+    by the hot list endpoints. All three must produce the same JSON.
+    """
+    import json
+    from typing import List
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    from app.core.responses import FastJSONResponse
+    from app.schemas import schemas
+    from app.schemas.encoders import product_encoder, sale_encoder
+
+    engine = scratch_engine(args.database_url, "serialization")
+    populate(engine, args.page_size, products=args.page_size, customers=100)
+
+    with Session(engine) as db:
+        pages = {
+            "Sale": (schemas.Sale, sale_encoder, db.scalars(
+                select(models.Sale).options(selectinload(models.Sale.product), selectinload(models.Sale.customer))
+            ).all()),
+            "Product": (schemas.Product, product_encoder, db.scalars(select(models.Product)).all())
+        }
+
+    print(f"{'schema':>8} {'path':>18} {'ms/page':>10} {'rows/s':>12} {'MB/s':>10}")
+    for name, (schema, encoder, rows) in pages.items():
+        adapter = TypeAdapter(List[schema])
+        paths = {
+            "pydantic + json": lambda: JSONResponse(jsonable_encoder(adapter.validate_python(rows))).body,
+            "pydantic + orjson": lambda: FastJSONResponse(
+                adapter.dump_python(adapter.validate_python(rows), mode="json")
+            ).body,
+            "row encoder": lambda: encoder.response(rows).body
+        }
+        bodies = {path: render() for path, render in paths.items()}
+        expected = json.loads(bodies["pydantic + json"])
+        for path, body in bodies.items():
+            if json.loads(body) != expected:
+                raise SystemExit(f"{name}: {path} output differs from the pydantic + json baseline")
+            elapsed = timed(paths[path], args.repeat) / 1000
+            print(f"{name:>8} {path:>18} {elapsed * 1000:>10.2f} {len(rows) / elapsed:>12.0f} {len(body) / elapsed / 1e6:>10.1f}")
+    engine.dispose()
+
+def legacy_prepare_features(db, since, until=None):
+    """The original MLService.prepare_features: every sale as an ORM row, grouped in pandas
+
+    `until` (exclusive) drops the sales the feature store doesn't hold yet.
+    """
+    import pandas as pd
+
+    sales_data = db.query(
+        models.Sale.product_id, models.Sale.quantity, models.Sale.unit_price, models.Sale.final_amount,
+        models.Sale.sale_date, models.Sale.sales_channel, models.Sale.store_location,
+        models.Product.category, models.Product.brand, models.Product.price,
+        models.Customer.customer_segment, models.Customer.city
+    ).join(models.Product, models.Product.id == models.Sale.product_id).join(
+        models.Customer, models.Customer.id == models.Sale.customer_id
+    ).filter(models.Sale.sale_date >= since, models.Sale.sale_date < (until or datetime.max)).all()
+    df = pd.DataFrame([
+        {
+            'product_id': sale.product_id, 'quantity': sale.quantity, 'unit_price': sale.unit_price,
+            'final_amount': sale.final_amount, 'sale_date': sale.sale_date, 'sales_channel': sale.sales_channel,
+            'store_location': sale.store_location or 'Unknown', 'category': sale.category,
+            'brand': sale.brand or 'Unknown', 'price': sale.price,
+            'customer_segment': sale.customer_segment or 'Unknown', 'city': sale.city or 'Unknown'
+        }
+        for sale in sales_data
+    ])
+    df['sale_date'] = pd.to_datetime(df['sale_date'])
+    df['day_of_week'] = df['sale_date'].dt.dayofweek
+    df['month'] = df['sale_date'].dt.month
+    df['quarter'] = df['sale_date'].dt.quarter
+    df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
+    daily_sales = df.groupby(['product_id', df['sale_date'].dt.date]).agg({
+        'quantity': 'sum', 'final_amount': 'sum', 'unit_price': 'mean', 'price': 'first', 'category': 'first',
+        'brand': 'first', 'day_of_week': 'first', 'month': 'first', 'quarter': 'first', 'is_weekend': 'first'
+    }).reset_index()
+    daily_sales = daily_sales.sort_values(['product_id', 'sale_date'])
+    daily_sales['quantity_7d_avg'] = daily_sales.groupby('product_id')['quantity'].rolling(7, min_periods=1).mean().reset_index(drop=True)
+    daily_sales['quantity_30d_avg'] = daily_sales.groupby('product_id')['quantity'].rolling(30, min_periods=1).mean().reset_index(drop=True)
+    return daily_sales
+
+def bench_ml_features(args):
+    """MLService.prepare_features: pandas over every raw sale vs the feature store
+
+    The store's frame must equal the pandas features of the complete days.
+    Also times a full rebuild and the incremental update of one new day.
+    """
+    import pandas as pd
+    from app.services.feature_store import feature_store
+    from app.services.ml_service import MLService
+
+    ml_service = MLService()
+    engine = scratch_engine(args.database_url, "ml-features")
+    populate(engine, args.rows, products=args.products, customers=1000, days=730)
+    today = datetime.now().date()
+    since, until = datetime.combine(today - timedelta(days=730), datetime.min.time()), datetime.combine(today, datetime.min.time())
+    yesterday = today - timedelta(days=1)
+
+    def one_new_day(db):
+        # Forget yesterday, so update() has exactly one day to add
+        db.execute(delete(models.ProductDailyFeature).where(models.ProductDailyFeature.day == yesterday))
+        db.get(models.FeatureWatermark, feature_store.WATERMARK).last_day = yesterday - timedelta(days=1)
+        db.commit()
+        start = time.perf_counter()
+        feature_store.update(db)
+        return (time.perf_counter() - start) * 1000
+
+    with Session(engine) as db:
+        rebuild_ms = timed(lambda: feature_store.rebuild(db), 1)
+        legacy = legacy_prepare_features(db, since, until)
+        current = ml_service.prepare_features(db)
+        pd.testing.assert_frame_equal(
+            legacy.reset_index(drop=True), current.reset_index(drop=True), check_dtype=False
+        )
+        update_ms = statistics.median(one_new_day(db) for _ in range(args.repeat))
+        pd.testing.assert_frame_equal(
+            current.reset_index(drop=True), ml_service.prepare_features(db).reset_index(drop=True)
+        )
+        print(f"{'path':>16} {'median ms':>12}")
+        print(f"{'pandas':>16} {timed(lambda: legacy_prepare_features(db, since, until), args.repeat):>12.1f}")
+        print(f"{'store read':>16} {timed(lambda: ml_service.prepare_features(db), args.repeat):>12.1f}")
+        print(f"{'store rebuild':>16} {rebuild_ms:>12.1f}")
+        print(f"{'store +1 day':>16} {update_ms:>12.1f}")
+        print(f"{len(current)} feature rows from {args.rows} sales")
+    engine.dispose()
+
+def legacy_predict_sales(ml_service, db, product_id, days_ahead):
+    """The original per-request MLService.predict_sales: three queries and a one-row model.predict"""
+    import pandas as pd
+
+    product = db.query(models.Product).filter(models.Product.id == product_id).first()
+    if not product:
+        raise ValueError(f"Product with ID {product_id} not found")
+    since = datetime.now() - timedelta(days=90)
+    has_recent_sales = db.query(models.Sale.id).filter(
+        models.Sale.product_id == product_id, models.Sale.sale_date >= since
+    ).first() is not None
+    if not has_recent_sales:
+        return 1.0
+    df = ml_service.prepare_features(db, product_id)
+    for col in ("category", "brand"):
+        encoder = ml_service.label_encoders[col]
+        df[f"{col}_encoded"] = df[col].astype(str).apply(
+            lambda x: encoder.transform([x])[0] if x in encoder.classes_ else -1
+        )
+    latest_data = df.iloc[-1:].copy()
+    prediction_date = datetime.now() + timedelta(days=days_ahead)
+    latest_data["day_of_week"] = prediction_date.weekday()
+    latest_data["month"] = prediction_date.month
+    latest_data["quarter"] = (prediction_date.month - 1) // 3 + 1
+    latest_data["is_weekend"] = int(prediction_date.weekday() in [5, 6])
+    X = ml_service.scaler.transform(latest_data[ml_service.get_feature_names()].fillna(0))
+    return max(0, float(ml_service.model.predict(X)[0]))
+
+def bench_ml_batch(args):
+    """/ml/predict-sales/batch: a predict_sales call per request vs one feature matrix and model.predict
+
+    The per-request loop is timed on a sample and extrapolated; both paths
+    must predict the same quantities. Repeats of the batch are then served
+    by the prediction cache, from sales_predictions and from its LRU.
+    """
+    from sqlalchemy import event
+    from app.schemas.schemas import PredictionRequest
+    from app.services.ml_service import MLService
+    from app.services.prediction_cache import prediction_cache
+
+    ml_service = MLService()
+    # Keep the trained scratch model away from the app's model directory
+    ml_service.model_path = tempfile.mkdtemp(prefix="retail-bench-model-")
+    engine = scratch_engine(args.database_url, "ml-batch")
+    populate(engine, args.rows, products=args.products, customers=1000, days=730)
+    rng = random.Random(7)
+    requests = [
+        PredictionRequest(product_id=product_id, days_ahead=rng.randint(1, 30))
+        for product_id in range(1, args.products + 1)
+    ]
+    # Plus unknown products, which must fail on their own items only
+    requests += [PredictionRequest(product_id=args.products + i, days_ahead=7) for i in range(1, 4)]
+
+    with Session(engine) as db:
+        ml_service.train_model(db)
+        items = ml_service.predict_sales_batch(db, requests)
+        if [item.product_id for item in items] != [request.product_id for request in requests]:
+            raise SystemExit("batch items are out of request order")
+        failed = [item.product_id for item in items if item.error]
+        if failed != [args.products + i for i in range(1, 4)]:
+            raise SystemExit(f"unexpected failed items: {failed[:10]}")
+
+        sample = requests[:args.sample]
+        started = time.perf_counter()
+        legacy = [legacy_predict_sales(ml_service, db, request.product_id, request.days_ahead) for request in sample]
+        legacy_ms = (time.perf_counter() - started) * 1000 / len(sample) * len(requests)
+        for request, expected, item in zip(sample, legacy, items):
+            if abs(item.prediction.predicted_quantity - expected) > 1e-9:
+                raise SystemExit(f"product {request.product_id}: batch {item.prediction.predicted_quantity} != {expected}")
+
+        # Cold: the prediction cache off; then served from sales_predictions, then from the LRU
+        prediction_cache.enabled = False
+        cold_ms = timed(lambda: ml_service.predict_sales_batch(db, requests), args.repeat)
+        prediction_cache.enabled = True
+
+        def from_table():
+            prediction_cache.lru.clear()
+            return ml_service.predict_sales_batch(db, known)
+
+        # A dashboard repeats forecasts of known products; unknown ones are never cached
+        known = requests[:args.products]
+        known_items = items[:args.products]
+        statements = []
+
+        def count(conn, cursor, statement, *_):
+            # Catalog lookups (the partition manager's schema version check) aren't row loads
+            if not statement.lstrip().upper().startswith("PRAGMA") and "sqlite_master" not in statement:
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        queries = {}
+        for name, call in (("table", from_table), ("lru", lambda: ml_service.predict_sales_batch(db, known))):
+            statements.clear()
+            if call() != known_items:
+                raise SystemExit(f"cached ({name}) predictions differ from the computed ones")
+            queries[name] = len(statements)
+        event.remove(engine, "before_cursor_execute", count)
+
+        print(f"{'path':>12} {'ms':>12} {'requests':>10} {'queries':>8}")
+        print(f"{'loop':>12} {legacy_ms:>12.0f} {len(requests):>10} {'':>8}  (extrapolated from {len(sample)})")
+        print(f"{'batch':>12} {cold_ms:>12.0f} {len(requests):>10}")
+        print(f"{'table cache':>12} {timed(from_table, args.repeat):>12.0f} {len(known):>10} {queries['table']:>8}")
+        lru_ms = timed(lambda: ml_service.predict_sales_batch(db, known), args.repeat)
+        print(f"{'lru cache':>12} {lru_ms:>12.0f} {len(known):>10} {queries['lru']:>8}")
+    engine.dispose()
+
+def bench_ml_inventory(args):
+    """MLService.optimize_inventory: 30 predict_sales calls vs one 30-day forecast_demand
+
+    Both must predict the same 30-day demand for every sampled product.
+    """
+    from app.services.ml_service import MLService
+
+    ml_service = MLService()
+    # Keep the trained scratch model away from the app's model directory
+    ml_service.model_path = tempfile.mkdtemp(prefix="retail-bench-model-")
+    engine = scratch_engine(args.database_url, "ml-inventory")
+    populate(engine, args.rows, products=args.products, customers=1000, days=730)
+    product_ids = random.Random(7).sample(range(1, args.products + 1), min(args.sample, args.products))
+
+    with Session(engine) as db:
+        ml_service.train_model(db)
+        loop, curve = [], []
+        for product_id in product_ids:
+            started = time.perf_counter()
+            expected = sum(legacy_predict_sales(ml_service, db, product_id, days) for days in range(1, 31))
+            loop.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            result = ml_service.optimize_inventory(db, product_id)
+            curve.append((time.perf_counter() - started) * 1000)
+            if abs(result["predicted_30_day_demand"] - expected) > 1e-6:
+                raise SystemExit(f"product {product_id}: {result['predicted_30_day_demand']} != {expected}")
+
+        print(f"{'path':>10} {'median ms/product':>18} {'p99 ms':>10}")
+        for name, samples in (("loop", loop), ("curve", curve)):
+            samples.sort()
+            p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+            print(f"{name:>10} {statistics.median(samples):>18.1f} {p99:>10.1f}")
+    engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Retail Analytics performance benchmarks")
+    parser.add_argument("--database-url", default=None, help="Scratch database whose tables are dropped and reseeded (default: temporary SQLite file)")
+    parser.add_argument("--repeat", type=int, default=5)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    overview = subparsers.add_parser("sales-overview", help="Sales-overview aggregate plans")
+    overview.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    overview.add_argument("--window-days", type=int, default=30)
+    overview.set_defaults(func=bench_sales_overview)
+
+    concurrency = subparsers.add_parser("concurrency", help="p50/p99 of fast requests under a mixed slow/fast load")
+    concurrency.add_argument("--rows", type=int, default=200_000)
+    concurrency.add_argument("--window-days", type=int, default=90)
+    concurrency.add_argument("--fast-clients", type=int, default=8)
+    concurrency.add_argument("--slow-clients", type=int, default=2)
+    concurrency.add_argument("--duration", type=float, default=10, help="Seconds of load per handler variant")
+    concurrency.set_defaults(func=bench_concurrency)
+
+    context = subparsers.add_parser("business-context", help="Report sub-queries sequential vs concurrent")
+    context.add_argument("--rows", type=int, default=1_000_000)
+    context.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 10])
+    context.set_defaults(func=bench_business_context)
+
+    writes = subparsers.add_parser("sqlite-writes", help="Concurrent SQLite writers, default vs tuned pragmas")
+    writes.add_argument("--writers", type=int, default=8)
+    writes.add_argument("--transactions", type=int, default=200, help="Transactions per writer")
+    writes.set_defaults(func=bench_sqlite_writes)
+
+    checkout = subparsers.add_parser("checkout", help="Concurrent create_sale on one product: oversell/lost-update check")
+    checkout.add_argument("--writers", type=int, default=16)
+    checkout.add_argument("--attempts", type=int, default=100, help="Checkouts per writer")
+    checkout.add_argument("--stock", type=int, default=1000)
+    checkout.add_argument("--customers", type=int, default=20)
+    checkout.add_argument("--write-behind", action="store_true", help="Buffer customer totals (CustomerTotalsBuffer)")
+    checkout.set_defaults(func=bench_checkout)
+
+    bulk = subparsers.add_parser("bulk-ingest", help="Per-sale inserts vs POST /sales/bulk's service call")
+    bulk.add_argument("--batch", type=int, nargs="+", default=[1000, 5000])
+    bulk.set_defaults(func=bench_bulk_ingest)
+
+    export = subparsers.add_parser("export", help="Streaming CSV/NDJSON sales export")
+    export.add_argument("--rows", type=int, default=1_000_000)
+    export.set_defaults(func=bench_export)
+
+    pagination = subparsers.add_parser("pagination", help="Offset vs keyset paging of sales")
+    pagination.add_argument("--rows", type=int, default=1_000_000)
+    pagination.add_argument("--pages", type=int, nargs="+", default=[1, 100, 2000])
+    pagination.add_argument("--page-size", type=int, default=100)
+    pagination.set_defaults(func=bench_pagination)
+
+    query_count = subparsers.add_parser("query-count", help="Check SQL statements per listing request (N+1 guard)")
+    query_count.add_argument("--rows", type=int, default=2000)
+    query_count.set_defaults(func=bench_query_count)
+
+    serialization = subparsers.add_parser("serialization", help="JSON rendering throughput of Sale and Product pages")
+    serialization.add_argument("--page-size", type=int, default=1000)
+    serialization.set_defaults(func=bench_serialization)
+
+    ml_features = subparsers.add_parser("ml-features", help="ML feature preparation, pandas vs the feature store")
+    ml_features.add_argument("--rows", type=int, default=500_000)
+    ml_features.add_argument("--products", type=int, default=200)
+    ml_features.set_defaults(func=bench_ml_features)
+
+    ml_batch = subparsers.add_parser("ml-batch", help="Batch sales predictions, per-request loop vs vectorized")
+    ml_batch.add_argument("--rows", type=int, default=200_000)
+    ml_batch.add_argument("--products", type=int, default=5000)
+    ml_batch.add_argument("--sample", type=int, default=50, help="Requests the per-request loop is timed on")
+    ml_batch.set_defaults(func=bench_ml_batch)
+
+    ml_inventory = subparsers.add_parser("ml-inventory", help="optimize_inventory, 30 predictions vs one demand curve")
+    ml_inventory.add_argument("--rows", type=int, default=200_000)
+    ml_inventory.add_argument("--products", type=int, default=200)
+    ml_inventory.add_argument("--sample", type=int, default=10, help="Products optimized")
+    ml_inventory.set_defaults(func=bench_ml_inventory)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,22 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from contextlib import asynccontextmanager
 from sqlalchemy import text
 import uvicorn
 from datetime import datetime
 
 # Import routers
-from app.api.routers import products, sales, customers, analytics, reports
+from app.api.routers import products, sales, customers, analytics, reports, metrics
 # from app.api.routers import ml_models  # Disabled for initial deployment
-from app.database.connection import get_db, engine
+from app.database.connection import get_async_db, engine, SessionLocal, AsyncSessionLocal
+from app.database.partitions import sales_partitions
 from app.database import models
 from app.core.config import settings
+from app.core.responses import FastJSONResponse
+from app.services.columnar_store import columnar_store
+from app.services.customer_totals import customer_totals
 import os
 
 # Create database tables with error handling
@@ -40,16 +44,46 @@ async def lifespan(app: FastAPI):
     print(f"Environment: {settings.ENVIRONMENT}")
     print(f"Database URL: {settings.DATABASE_URL}")
     print(f"Tavily API Key configured: {'Yes' if settings.TAVILY_API_KEY else 'No'}")
+    partition_maintenance = engine.dialect.name == "postgresql" or settings.SQLITE_SALES_PARTITIONING
+    if partition_maintenance:
+        await sales_partitions.start(SessionLocal)
+    if settings.COLUMNAR_STORE_ENABLED:
+        db = SessionLocal()
+        try:
+            columnar_store.load(db)
+            footprint = columnar_store.memory_footprint()
+            print(f"Columnar sales store loaded: {footprint['rows']} rows, {footprint['used_bytes']} bytes")
+        except Exception as e:
+            print(f"Columnar sales store load failed: {e}")
+        finally:
+            db.close()
+    try:
+        await customer_totals.start(AsyncSessionLocal)
+    except Exception as e:
+        print(f"Customer totals flush failed: {e}")
+    if settings.FORECAST_SCHEDULER_ENABLED:
+        from app.services.forecast_scheduler import forecast_scheduler
+        await forecast_scheduler.start(SessionLocal)
+        print(f"Forecast scheduler started: retraining every {settings.RETRAIN_INTERVAL_HOURS}h")
     yield
     # Shutdown
     print("Shutting down Retail Analytics API...")
+    if settings.FORECAST_SCHEDULER_ENABLED:
+        await forecast_scheduler.stop()
+    if partition_maintenance:
+        await sales_partitions.stop()
+    try:
+        await customer_totals.stop(AsyncSessionLocal)
+    except Exception as e:
+        print(f"Customer totals flush failed: {e}")
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Retail Analytics Platform API",
     description="AI-Powered Retail Analytics Platform for sales prediction and business intelligence",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -68,6 +102,11 @@ app.include_router(customers.router, prefix="/api/v1/customers", tags=["customer
 app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["analytics"])
 # app.include_router(ml_models.router, prefix="/api/v1/ml", tags=["machine-learning"])  # Disabled
 app.include_router(reports.router, prefix="/api/v1/reports", tags=["reports"])
+app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["metrics"])
+if settings.FORECAST_SCHEDULER_ENABLED:
+    # The forecast scheduler brings the ML stack along, and with it the /ml routes
+    from app.api.routers import ml_models
+    app.include_router(ml_models.router, prefix="/api/v1/ml", tags=["machine-learning"])
 
 @app.get("/")
 async def root():
@@ -79,10 +118,10 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     try:
         # Test database connection (SQLAlchemy 2.x requires text())
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         return {
             "status": "healthy",
             "database": "connected",
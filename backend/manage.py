@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for Retail Analytics Platform
+
+Usage:
+    python manage.py rebuild-rollup
+    python manage.py rebuild-customer-stats
+    python manage.py rebuild-features
+    python manage.py index-advisor --ignore products customers
+    python manage.py partitions
+    python manage.py partitions-ensure
+    python manage.py partitions-archive 2024-01
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from app.database.connection import SessionLocal, engine
+from app.database import models
+from app.database.partitions import sales_partitions
+from app.services.rollup_service import rollup_service
+from app.services.customer_totals import customer_totals
+
+def rebuild_rollup(args):
+    """Backfill sales_daily_rollup from the sales table"""
+    db = SessionLocal()
+    try:
+        rows = rollup_service.rebuild(db)
+        print(f"Rebuilt sales_daily_rollup: {rows} rows")
+    finally:
+        db.close()
+
+def rebuild_customer_stats(args):
+    """Backfill customer_stats from the sales table"""
+    db = SessionLocal()
+    try:
+        rows = customer_totals.rebuild_stats(db)
+        print(f"Rebuilt customer_stats: {rows} rows")
+    finally:
+        db.close()
+
+def rebuild_features(args):
+    """Recompute the ML feature store from the sales table"""
+    # Pulls in pandas, so only imported by this command
+    from app.services.feature_store import feature_store
+    db = SessionLocal()
+    try:
+        rows = feature_store.rebuild(db)
+        print(f"Rebuilt product_daily_features through {feature_store.watermark(db)}: {rows} rows")
+    finally:
+        db.close()
+
+def list_partitions(args):
+    """Print the attached and archived monthly sales partitions"""
+    db = SessionLocal()
+    try:
+        partitions = sales_partitions.partitions(db)
+        print(f"Attached: {', '.join(partitions['attached']) or '(none)'}")
+        print(f"Archived: {', '.join(partitions['archived']) or '(none)'}")
+    finally:
+        db.close()
+
+def ensure_partitions(args):
+    """Create upcoming partitions (PostgreSQL) or seal closed months (SQLite)"""
+    db = SessionLocal()
+    try:
+        changed = sales_partitions.ensure(db)
+        print(f"Created or sealed: {', '.join(changed) or '(nothing to do)'}")
+    finally:
+        db.close()
+
+def archive_partition(args):
+    """Detach one month of sales into sales_archive_YYYY_MM"""
+    db = SessionLocal()
+    try:
+        archive = sales_partitions.archive(db, datetime.strptime(args.month, "%Y-%m").date())
+        print(f"Archived {args.month} as {archive}")
+    except ValueError as e:
+        print(f"Cannot archive {args.month}: {e}")
+        return 1
+    finally:
+        db.close()
+
+def analytics_workload():
+    """Analytics GET requests whose queries the index advisor explains"""
+    end_date = datetime.now()
+    # An explicit range takes the one-pass sales-overview plan instead of the rollup
+    explicit_range = {"start_date": (end_date - timedelta(days=90)).isoformat(), "end_date": end_date.isoformat()}
+    return (
+        ("/analytics/sales-overview", {}),
+        ("/analytics/sales-overview", explicit_range),
+        ("/analytics/inventory-status", {}),
+        ("/analytics/customer-insights", {}),
+        ("/analytics/product-performance", {}),
+        ("/analytics/product-performance", {"category": "Electronics", "sort_by": "units"}),
+        ("/sales/daily/summary", {}),
+        ("/sales/weekly/summary", {}),
+        ("/sales/monthly/summary", {}),
+        ("/sales/summary", {"granularity": "week"})
+    )
+
+async def run_advisor_workload(advisor):
+    """Run every analytics endpoint and report query once under the advisor"""
+    import httpx
+    from fastapi import FastAPI
+    from app.api.routers import analytics, reports, sales
+    from app.core.cache import response_cache
+    from app.database.connection import AsyncSessionLocal, async_engine
+    from app.schemas.schemas import ReportRequest, ReportType
+
+    # Cached results would hide the queries behind them
+    response_cache.enabled = False
+    api = FastAPI()
+    api.include_router(analytics.router, prefix="/analytics")
+    api.include_router(sales.router, prefix="/sales")
+
+    with advisor.capture(async_engine):
+        transport = httpx.ASGITransport(app=api)
+        async with httpx.AsyncClient(transport=transport, base_url="http://advisor") as client:
+            for path, params in analytics_workload():
+                response = await client.get(path, params=params)
+                response.raise_for_status()
+        for report_type in ReportType:
+            await reports.get_report_data(AsyncSessionLocal, ReportRequest(report_type=report_type))
+        await reports.get_business_context(AsyncSessionLocal)
+
+    async with async_engine.connect() as connection:
+        findings = await connection.run_sync(advisor.report)
+    await async_engine.dispose()
+    return findings
+
+def index_advisor(args):
+    """EXPLAIN every analytics and report query and flag sequential scans"""
+    from app.services.index_advisor import IndexAdvisor
+
+    findings = asyncio.run(run_advisor_workload(IndexAdvisor()))
+    flagged = 0
+    for finding in findings:
+        scans = [table for table in finding["sequential_scans"] if table not in args.ignore]
+        if not scans and not args.verbose:
+            continue
+        flagged += bool(scans)
+        print(f"{'SEQ SCAN ' + ', '.join(scans) if scans else 'ok'}: {' '.join(finding['statement'].split())[:200]}")
+        for step in finding["plan"]:
+            print(f"    {step}")
+    print(f"{flagged} of {len(findings)} queries scan a table sequentially")
+    return 1 if flagged else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Retail Analytics maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("rebuild-rollup", help="Backfill the daily sales rollup").set_defaults(func=rebuild_rollup)
+    subparsers.add_parser("rebuild-customer-stats", help="Backfill per-customer sales stats").set_defaults(func=rebuild_customer_stats)
+    subparsers.add_parser("rebuild-features", help="Recompute the ML feature store").set_defaults(func=rebuild_features)
+
+    advisor = subparsers.add_parser("index-advisor", help="Flag sequential scans in analytics and report queries")
+    advisor.add_argument("--ignore", nargs="*", default=[], metavar="TABLE", help="Tables whose scans are acceptable (e.g. small dimension tables)")
+    advisor.add_argument("--verbose", action="store_true", help="Also print the plans of queries that use indexes")
+    advisor.set_defaults(func=index_advisor)
+
+    subparsers.add_parser("partitions", help="List monthly sales partitions").set_defaults(func=list_partitions)
+    subparsers.add_parser("partitions-ensure", help="Create upcoming / seal closed sales partitions").set_defaults(func=ensure_partitions)
+    archive = subparsers.add_parser("partitions-archive", help="Detach a month of sales as an archive table")
+    archive.add_argument("month", help="YYYY-MM")
+    archive.set_defaults(func=archive_partition)
+
+    args = parser.parse_args()
+    models.Base.metadata.create_all(bind=engine)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
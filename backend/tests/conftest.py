@@ -0,0 +1,156 @@
+import os
+import random
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from app.database import models
+from app.database.connection import get_async_db, get_async_database_url, get_async_sessionmaker, get_db
+
+BACKEND = Path(__file__).resolve().parents[1]
+CATEGORIES = ["Electronics", "Clothing", "Home & Garden", "Sports", "Books", "Health", "Automotive"]
+CHANNELS = ["online", "in-store", "mobile"]
+STORES = ["New York", "Los Angeles", "Chicago", "Houston", "Phoenix"]
+
+def scratch_engine(database_url):
+    """An engine for `database_url` with the schema dropped and recreated"""
+    engine = create_engine(database_url)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    return engine
+
+def populate(engine, rows, products=10, customers=10, days=365, now=None):
+    """Insert synthetic products, customers and `rows` sales spread over the `days` before `now`"""
+    rng = random.Random(42)
+    now = now or datetime.now()
+    with engine.begin() as conn:
+        conn.execute(insert(models.Product), [
+            {
+                "id": i, "name": f"Product {i}", "category": CATEGORIES[i % len(CATEGORIES)],
+                "brand": f"Brand {i % 25}", "price": 10.0 + i % 90, "cost": 5.0 + i % 45,
+                "sku": f"SKU{i:06d}", "stock_quantity": 1_000_000, "reorder_level": 10, "is_active": True
+            }
+            for i in range(1, products + 1)
+        ])
+        conn.execute(insert(models.Customer), [
+            {
+                "id": i, "first_name": "Customer", "last_name": str(i), "email": f"customer{i}@example.com",
+                "customer_segment": ["VIP", "Regular", "New"][i % 3], "total_spent": 0.0, "total_orders": 0,
+                "is_active": True
+            }
+            for i in range(1, customers + 1)
+        ])
+        sales = []
+        for i in range(rows):
+            quantity, unit_price = rng.randint(1, 5), 10.0 + i % 90
+            sales.append({
+                "product_id": rng.randint(1, products),
+                "customer_id": rng.randint(1, customers),
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "total_amount": quantity * unit_price,
+                "discount_amount": 0.0,
+                "tax_amount": 0.0,
+                "final_amount": quantity * unit_price,
+                "sale_date": now - timedelta(seconds=rng.randint(0, days * 86400)),
+                "payment_method": "card",
+                "store_location": STORES[i % len(STORES)],
+                "sales_channel": CHANNELS[i % len(CHANNELS)],
+                "transaction_id": f"TEST{i:09d}"
+            })
+        if sales:
+            conn.execute(insert(models.Sale), sales)
+
+def run_alembic(database_url, *args):
+    """Run an alembic command against `database_url` in a separate process"""
+    subprocess.run(
+        [sys.executable, "-m", "alembic", *args], cwd=BACKEND, check=True, capture_output=True,
+        env={**os.environ, "DATABASE_URL": database_url}
+    )
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def database_url(request, tmp_path):
+    """Scratch database URL; PostgreSQL runs only when TEST_POSTGRES_URL is set
+
+    The database behind TEST_POSTGRES_URL is dropped and recreated by the
+    tests, so point it at a throwaway one.
+    """
+    if request.param == "sqlite":
+        return f"sqlite:///{tmp_path / 'test.db'}"
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    return url
+
+@pytest.fixture
+def sqlite_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+@pytest.fixture
+def engine(database_url):
+    """Empty scratch database, on SQLite and (when configured) PostgreSQL"""
+    engine = scratch_engine(database_url)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def sqlite_engine(sqlite_url):
+    """Empty scratch SQLite database"""
+    engine = scratch_engine(sqlite_url)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def api():
+    """Factory for a TestClient serving routers (by URL prefix) from a scratch engine
+
+    Returns (client, async engine); async endpoints use the async engine
+    through the get_async_db and get_async_sessionmaker overrides, sync
+    ones `engine` through get_db.
+    """
+    clients = []
+
+    def make(engine, **routers):
+        async_engine = create_async_engine(
+            get_async_database_url(engine.url.render_as_string(hide_password=False)), poolclass=NullPool
+        )
+        sessions = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+        app = FastAPI()
+        for prefix, router in routers.items():
+            app.include_router(router, prefix=f"/{prefix}")
+
+        async def scratch_db():
+            async with sessions() as db:
+                yield db
+
+        def scratch_sync_db():
+            with Session(engine) as db:
+                yield db
+
+        app.dependency_overrides[get_async_db] = scratch_db
+        app.dependency_overrides[get_async_sessionmaker] = lambda: sessions
+        app.dependency_overrides[get_db] = scratch_sync_db
+        client = TestClient(app).__enter__()
+        clients.append(client)
+        return client, async_engine
+
+    yield make
+    for client in clients:
+        client.__exit__(None, None, None)
+
+@pytest.fixture
+def seed():
+    """populate(), for seeding a scratch engine"""
+    return populate
+
+@pytest.fixture
+def alembic():
+    """run_alembic(), for migration tests"""
+    return run_alembic
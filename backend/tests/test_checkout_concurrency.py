@@ -0,0 +1,87 @@
+import asyncio
+import random
+import threading
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from app.core.cache import response_cache
+from app.database import models
+from app.database.connection import apply_sqlite_pragmas, get_async_database_url
+from app.schemas.schemas import SaleCreate
+from app.services.crud import sale_service
+from app.services.customer_totals import customer_totals
+
+STOCK = 200
+WRITERS = 8
+ATTEMPTS = 50
+CUSTOMERS = 20
+
+def checkout(url, worker, outcomes, lock):
+    async def run():
+        async_engine = create_async_engine(url, pool_size=1, max_overflow=0)
+        if url.startswith("sqlite"):
+            event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+        sessions = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+        rng = random.Random(worker)
+        for i in range(ATTEMPTS):
+            sale = SaleCreate(
+                product_id=1, customer_id=rng.randint(1, CUSTOMERS), quantity=1,
+                unit_price=10.0, transaction_id=f"checkout-{worker}-{i}"
+            )
+            async with sessions() as db:
+                try:
+                    await sale_service.create_sale(db, sale)
+                    outcome = "sold"
+                except ValueError:
+                    outcome = "rejected"
+                except OperationalError:
+                    outcome = "errors"
+            with lock:
+                outcomes[outcome] += 1
+        await async_engine.dispose()
+    asyncio.run(run())
+
+@pytest.mark.parametrize("write_behind", [False, True], ids=["direct", "write-behind"])
+def test_concurrent_checkouts_never_oversell(engine, seed, write_behind, monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", False)
+    monkeypatch.setattr(customer_totals, "write_behind", write_behind)
+    seed(engine, 0, products=1, customers=CUSTOMERS)
+    with engine.begin() as conn:
+        conn.execute(models.Product.__table__.update().values(stock_quantity=STOCK))
+    url = get_async_database_url(engine.url.render_as_string(hide_password=False))
+
+    # Demand is twice the stock, all for the same product
+    outcomes, lock = {"sold": 0, "rejected": 0, "errors": 0}, threading.Lock()
+    threads = [threading.Thread(target=checkout, args=(url, worker, outcomes, lock)) for worker in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    async def flush():
+        async_engine = create_async_engine(url)
+        async with async_sessionmaker(async_engine)() as db:
+            await customer_totals.flush(db)
+        await async_engine.dispose()
+    asyncio.run(flush())
+
+    with Session(engine) as db:
+        stock_left = db.scalar(select(models.Product.stock_quantity))
+        sold = db.scalar(select(func.coalesce(func.sum(models.Sale.quantity), 0)))
+        sales = db.scalar(select(func.count(models.Sale.id)))
+        revenue = db.scalar(select(func.sum(models.Sale.final_amount)))
+        customer_orders, customer_spent = db.execute(
+            select(func.sum(models.Customer.total_orders), func.sum(models.Customer.total_spent))
+        ).one()
+        stats_orders, stats_spent = db.execute(
+            select(func.sum(models.CustomerStats.total_orders), func.sum(models.CustomerStats.total_spent))
+        ).one()
+
+    assert outcomes["sold"] + outcomes["rejected"] + outcomes["errors"] == WRITERS * ATTEMPTS
+    assert stock_left == 0
+    assert sold == sales == outcomes["sold"] == STOCK
+    assert customer_orders == stats_orders == sales
+    assert customer_spent == pytest.approx(revenue)
+    assert stats_spent == pytest.approx(revenue)
@@ -0,0 +1,69 @@
+import pytest
+from app.api.routers import analytics, customers, products, sales
+from app.core.cache import response_cache
+from app.core.pagination import cursor_position, encode_cursor
+
+# Tokens that don't decode, lack fields or carry values of the wrong JSON type
+TAMPERED = [
+    "not a cursor",
+    encode_cursor(["id", 1]),
+    encode_cursor({}),
+    encode_cursor({"id": None}),
+    encode_cursor({"id": "7"}),
+    encode_cursor({"id": True}),
+    encode_cursor({"id": {"$gt": 1}})
+]
+TAMPERED_BY_PATH = {
+    "/analytics/product-performance?cursor=": [
+        encode_cursor({"sort_by": "revenue", "id": 3}),
+        encode_cursor({"sort_by": "revenue", "value": "12.5", "id": 3}),
+        encode_cursor({"sort_by": "revenue", "value": 12.5, "id": None}),
+        encode_cursor({"sort_by": "revenue", "value": [1], "id": 3}),
+        encode_cursor({"sort_by": "revenue", "value": True, "id": 3})
+    ],
+    "/sales/?cursor=": [
+        encode_cursor({"id": 7}),
+        encode_cursor({"sale_date": "2026-01-01T00:00:00", "id": "7"}),
+        encode_cursor({"sale_date": 20260101, "id": 7}),
+        encode_cursor({"sale_date": "yesterday", "id": 7})
+    ],
+    "/products/?cursor=": [],
+    "/customers/?cursor=": []
+}
+
+@pytest.fixture
+def client(sqlite_engine, seed, api, monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", False)
+    seed(sqlite_engine, 300, products=30, customers=30)
+    return api(
+        sqlite_engine, sales=sales.router, products=products.router, customers=customers.router, analytics=analytics.router
+    )[0]
+
+def test_cursor_position_checks_field_types():
+    token = encode_cursor({"sort_by": "units", "value": 4, "id": 9})
+    assert cursor_position(token, sort_by=str, value=(int, float), id=int) == {"sort_by": "units", "value": 4, "id": 9}
+    for fields in ({"id": str}, {"missing": int}, {"value": float}):
+        with pytest.raises(ValueError):
+            cursor_position(token, **fields)
+
+@pytest.mark.parametrize("path", list(TAMPERED_BY_PATH))
+def test_tampered_cursors_are_rejected(client, path):
+    for token in TAMPERED + TAMPERED_BY_PATH[path]:
+        response = client.get(path + token)
+        assert response.status_code == 400, token
+
+def test_cursors_page_through_product_performance(client):
+    seen, cursor = [], ""
+    while cursor is not None:
+        page = client.get(f"/analytics/product-performance?limit=7&cursor={cursor}").json()
+        seen += [product["product_id"] for product in page["products"]]
+        cursor = page["next_cursor"]
+    assert sorted(seen) == list(range(1, 31))
+
+def test_cursors_page_through_sales(client):
+    seen, cursor = [], ""
+    while cursor is not None:
+        page = client.get(f"/sales/?limit=70&expand=&cursor={cursor}").json()
+        seen += [sale["id"] for sale in page["items"]]
+        cursor = page["next_cursor"]
+    assert sorted(seen) == list(range(1, 301))
@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.api.routers import customers, sales
+from app.core.cache import response_cache
+from app.database import models
+from app.services.customer_totals import customer_totals
+
+def sales_totals(engine):
+    sales = models.Sale
+    with engine.connect() as conn:
+        return {
+            customer_id: (round(spent, 6), orders)
+            for customer_id, spent, orders in conn.execute(
+                select(sales.customer_id, func.sum(sales.final_amount), func.count(sales.id)).group_by(sales.customer_id)
+            )
+        }
+
+def test_stats_without_a_customer_stats_row_come_from_sales(sqlite_engine, seed, api):
+    # seed() writes sales only, like a database that was never backfilled
+    seed(sqlite_engine, 300, products=5, customers=20)
+    expected = sales_totals(sqlite_engine)
+    with sqlite_engine.begin() as conn:
+        conn.execute(insert(models.Customer), [{
+            "id": 21, "email": "new@example.com", "first_name": "No", "last_name": "Sales",
+            "total_spent": 0.0, "total_orders": 0
+        }])
+    client, _ = api(sqlite_engine, customers=customers.router)
+
+    for customer_id in (1, 7, 20):
+        stats = client.get(f"/customers/{customer_id}/stats").json()
+        assert (round(stats["total_spent"], 6), stats["total_orders"]) == expected[customer_id]
+    assert client.get("/customers/21/stats").json()["total_orders"] == 0
+    assert client.get("/customers/999/stats").status_code == 404
+    items = client.post("/customers/stats:batch", json={"customer_ids": [3, 999, 21, 3]}).json()
+    assert [(item["customer_id"], item["total_orders"]) for item in items] == [(3, expected[3][1]), (21, 0)]
+
+def test_migration_creates_and_backfills_customer_stats(engine, database_url, seed, alembic):
+    seed(engine, 300, products=5, customers=20)
+    models.CustomerStats.__table__.drop(engine)
+    with engine.begin() as conn:
+        # A write-behind delta not flushed yet; its sale is already in sales
+        conn.execute(insert(models.CustomerTotalDelta), [{"customer_id": 4, "spent": 12.5, "orders": 1}])
+    expected = sales_totals(engine)
+
+    alembic(database_url, "stamp", "0002")
+    alembic(database_url, "upgrade", "0003")
+
+    stats = models.CustomerStats
+    with engine.connect() as conn:
+        backfilled = {
+            customer_id: (round(spent, 6), orders)
+            for customer_id, spent, orders in conn.execute(select(stats.customer_id, stats.total_spent, stats.total_orders))
+        }
+        assert conn.scalar(select(func.count()).select_from(models.CustomerTotalDelta)) == 0
+        assert conn.scalar(select(models.Customer.total_spent).where(models.Customer.id == 4)) == 12.5
+    assert backfilled == expected
+
+    alembic(database_url, "downgrade", "0002")
+    with engine.connect() as conn:
+        assert not engine.dialect.has_table(conn, "customer_stats")
+
+def test_write_behind_reads_merge_unflushed_deltas_and_flush_once(engine, seed, api, monkeypatch):
+    seed(engine, 0, products=2, customers=3)
+    client, async_engine = api(engine, sales=sales.router, customers=customers.router)
+
+    def sell(customer_id, transaction_id, unit_price):
+        response = client.post("/sales/", json={
+            "product_id": 1, "customer_id": customer_id, "quantity": 2,
+            "unit_price": unit_price, "transaction_id": transaction_id
+        })
+        assert response.status_code == 201, response.text
+
+    # Customer 1 has a customer_stats row from a direct-mode sale; customer 2 none
+    sell(1, "direct-1", 10.0)
+    monkeypatch.setattr(customer_totals, "write_behind", True)
+    sell(1, "behind-1", 15.0)
+    sell(1, "behind-2", 20.0)
+    sell(2, "behind-3", 5.0)
+    expected = sales_totals(engine)
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(models.CustomerTotalDelta)) == 3
+        assert conn.scalar(select(models.Customer.total_orders).where(models.Customer.id == 1)) == 1
+        first, last = conn.execute(
+            select(func.min(models.Sale.sale_date), func.max(models.Sale.sale_date)).where(models.Sale.customer_id == 1)
+        ).one()
+
+    def reads():
+        customer = {key: client.get("/customers/1").json()[key] for key in ("total_spent", "total_orders")}
+        stats = {
+            item["customer_id"]: item
+            for item in client.post("/customers/stats:batch", json={"customer_ids": [1, 2, 3]}).json()
+        }
+        return customer, stats
+
+    customer, stats = reads()
+    assert (round(customer["total_spent"], 6), customer["total_orders"]) == expected[1]
+    assert (round(stats[1]["total_spent"], 6), stats[1]["total_orders"]) == expected[1]
+    assert (round(stats[2]["total_spent"], 6), stats[2]["total_orders"]) == expected[2]
+    assert stats[3]["total_orders"] == 0
+    assert datetime.fromisoformat(stats[1]["first_purchase_date"]).replace(tzinfo=None) == first.replace(tzinfo=None)
+    assert datetime.fromisoformat(stats[1]["last_purchase_date"]).replace(tzinfo=None) == last.replace(tzinfo=None)
+
+    async def flush():
+        async with async_sessionmaker(async_engine)() as db:
+            return await customer_totals.flush(db)
+
+    version = response_cache.data_version
+    assert asyncio.run(flush()) == 3
+    assert response_cache.data_version == version + 1
+    # Nothing left to claim: a second flush changes nothing
+    assert asyncio.run(flush()) == 0
+    assert response_cache.data_version == version + 1
+    assert reads() == (customer, stats)
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(models.CustomerTotalDelta)) == 0
+        assert conn.scalar(select(models.CustomerStats.total_orders).where(models.CustomerStats.customer_id == 2)) == 1
+    assert (round(customer["total_spent"], 6), customer["total_orders"]) == expected[1]
@@ -0,0 +1,56 @@
+from datetime import date, datetime
+import orjson
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+from app.api.routers import sales
+from app.database import models
+from app.database.partitions import sales_partitions
+from app.services.export_service import sales_exporter
+
+NOW = datetime(2024, 6, 15, 12, 0)
+
+def sealed_database(engine, seed):
+    """Sales over four months with March and April sealed into their own tables"""
+    seed(engine, 400, products=5, customers=5, days=120, now=NOW)
+    with engine.begin() as conn:
+        # The newest id stays in `sales`, which was created without AUTOINCREMENT
+        conn.execute(insert(models.Sale), [{
+            "product_id": 1, "customer_id": 1, "quantity": 1, "unit_price": 10.0, "total_amount": 10.0,
+            "discount_amount": 0.0, "tax_amount": 0.0, "final_amount": 10.0, "sale_date": NOW,
+            "payment_method": "card", "transaction_id": "NEWEST"
+        }])
+    with Session(engine) as db:
+        for month in (date(2024, 3, 1), date(2024, 4, 1)):
+            assert sales_partitions.seal(db, month)
+
+def table_ids(engine, name, start_date=None):
+    query = f'SELECT id FROM "{name}"' + (" WHERE sale_date >= :start" if start_date else "") + " ORDER BY id"
+    with engine.connect() as conn:
+        return list(conn.execute(text(query), {"start": start_date}).scalars())
+
+def test_export_streams_each_month_table_in_id_order(sqlite_engine, seed, api):
+    sealed_database(sqlite_engine, seed)
+    client, _ = api(sqlite_engine, sales=sales.router)
+
+    response = client.get("/sales/export", params={"format": "ndjson"})
+    assert response.status_code == 200
+    exported = [orjson.loads(line)["id"] for line in response.content.splitlines()]
+    assert exported == table_ids(sqlite_engine, "sales_2024_03") + table_ids(sqlite_engine, "sales_2024_04") + table_ids(sqlite_engine, "sales")
+
+    start_date = datetime(2024, 4, 10)
+    response = client.get("/sales/export", params={"format": "csv", "start_date": start_date.isoformat()})
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,transaction_id")
+    assert [int(line.split(",")[0]) for line in lines[1:]] == (
+        table_ids(sqlite_engine, "sales_2024_04", start_date) + table_ids(sqlite_engine, "sales", start_date)
+    )
+
+def test_export_queries_need_no_sort(sqlite_engine, seed):
+    sealed_database(sqlite_engine, seed)
+    with Session(sqlite_engine) as db:
+        tables = sales_partitions.tables(db)
+        assert [table.name for table in tables] == ["sales_2024_03", "sales_2024_04", "sales"]
+        for table in tables:
+            query = sales_exporter._select(table, None, None).compile(sqlite_engine)
+            plan = " ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {query}")))
+            assert "TEMP B-TREE" not in plan
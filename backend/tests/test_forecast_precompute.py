@@ -0,0 +1,105 @@
+from datetime import datetime
+import pytest
+
+pytest.importorskip("sklearn")
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import app.services.forecast_scheduler as forecast_scheduler_module
+from app.api.routers import ml_models
+from app.core.config import settings
+from app.database import models
+from app.schemas.schemas import PredictionRequest
+from app.services.forecast_scheduler import ForecastScheduler
+from app.services.ml_service import MLService
+from app.services.prediction_cache import prediction_cache
+
+PRODUCTS = 20
+
+def test_precomputed_forecasts_serve_batch_predictions(engine, seed, api, tmp_path, monkeypatch):
+    seed(engine, 5000, products=PRODUCTS, customers=100, days=120)
+    service = MLService()
+    service.model_path = str(tmp_path / "model")
+    monkeypatch.setattr(ml_models, "ml_service", service)
+    prediction_cache.lru.clear()
+
+    client, _ = api(engine, ml=ml_models.router)
+    requests = [
+        PredictionRequest(product_id=product_id, days_ahead=days_ahead)
+        for product_id in range(1, PRODUCTS + 1) for days_ahead in (1, 7, 30)
+    ]
+
+    with Session(engine) as db:
+        service.train_model(db)
+        assert service.precompute_forecasts(db, list(range(1, PRODUCTS + 1)), days=30) == PRODUCTS * 30
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        expected = [item.prediction for item in service._predict_uncached(db, requests, today)]
+
+    # Precomputed rows go only to sales_predictions; nothing may be scored again
+    calls = []
+    predict = service.model.predict
+    monkeypatch.setattr(service.model, "predict", lambda features: calls.append(len(features)) or predict(features))
+    prediction_cache.lru.clear()
+
+    response = client.post("/ml/predict-sales/batch", json=[request.model_dump() for request in requests])
+    assert response.status_code == 200
+    assert calls == []
+    items = response.json()
+    assert [item["error"] for item in items] == [None] * len(requests)
+    assert [item["prediction"]["predicted_quantity"] for item in items] == pytest.approx(
+        [prediction.predicted_quantity for prediction in expected]
+    )
+
+def stored_versions(engine):
+    with Session(engine) as db:
+        return set(db.scalars(select(models.SalesPrediction.model_version).distinct()))
+
+def test_retrain_drops_forecasts_cached_before_the_new_model_is_loaded(engine, seed, tmp_path, monkeypatch):
+    seed(engine, 3000, products=PRODUCTS, customers=50, days=120)
+    monkeypatch.setattr(settings, "MODEL_PATH", str(tmp_path / "model"))
+    service = MLService()
+    monkeypatch.setattr(forecast_scheduler_module, "ml_service", service)
+    requests = [PredictionRequest(product_id=product_id, days_ahead=3) for product_id in range(1, PRODUCTS + 1)]
+
+    with Session(engine) as db:
+        service.train_model(db)
+        service.model_version = "old"
+        service.predict_sales_batch(db, requests)
+        load_model = service.load_model
+
+        def load_after_a_request():
+            # An online request between training and loading the new model,
+            # still predicting with the old one
+            monkeypatch.setattr(service, "reload_if_changed", lambda: None)
+            prediction_cache.lru.clear()
+            service.predict_sales_batch(db, requests[:5])
+            load_model()
+
+        monkeypatch.setattr(service, "load_model", load_after_a_request)
+        ForecastScheduler()._retrain(db)
+
+    assert service.model_version != "old"
+    assert stored_versions(engine) <= {service.model_version}
+
+def test_workers_pick_up_a_model_saved_elsewhere(engine, seed, tmp_path, monkeypatch):
+    seed(engine, 3000, products=PRODUCTS, customers=50, days=120)
+    monkeypatch.setattr(settings, "MODEL_PATH", str(tmp_path / "model"))
+    trainer = MLService()
+    with Session(engine) as db:
+        trainer.train_model(db)
+        worker = MLService()
+        assert worker.model_version == trainer.model_version
+
+        trainer.model_version = "retrained"
+        trainer.save_model()
+        worker._prepare_prediction(db)
+        assert worker.model_version == "retrained"
+
+        # Another version's rows go with the next precompute
+        worker.model_version = "lagging"
+        worker.predict_sales_batch(db, [PredictionRequest(product_id=1, days_ahead=1)])
+        worker.reload_if_changed()
+        assert worker.model_version == "lagging"
+        worker.model_version = "retrained"
+        worker.precompute_forecasts(db, [1, 2], days=3)
+    assert stored_versions(engine) == {"retrained"}
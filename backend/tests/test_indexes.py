@@ -0,0 +1,50 @@
+from datetime import datetime
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.orm import Session
+from app.database import models
+from app.services.index_advisor import IndexAdvisor
+
+COMPOSITE = {"ix_sales_sale_date_product_id", "ix_sales_customer_id_sale_date", "ix_sales_product_id_sale_date"}
+REPLACED = {"ix_sales_customer_id", "ix_sales_product_id"}
+
+def sales_indexes(engine):
+    return {index["name"] for index in inspect(engine).get_indexes("sales")}
+
+def test_migration_swaps_single_column_indexes_for_composite_ones(engine, database_url, seed, alembic):
+    seed(engine, 200, products=5, customers=5)
+    # The indexes of a database created before the composite ones existed
+    with engine.begin() as conn:
+        for name in COMPOSITE:
+            conn.execute(text(f"DROP INDEX {name}"))
+        conn.execute(text("CREATE INDEX ix_sales_customer_id ON sales (customer_id)"))
+        conn.execute(text("CREATE INDEX ix_sales_product_id ON sales (product_id)"))
+
+    # drop_all leaves alembic_version behind on a reused PostgreSQL database
+    alembic(database_url, "stamp", "base")
+    alembic(database_url, "upgrade", "0001")
+    indexes = sales_indexes(engine)
+    assert COMPOSITE <= indexes and not REPLACED & indexes
+
+    alembic(database_url, "downgrade", "base")
+    indexes = sales_indexes(engine)
+    assert REPLACED <= indexes and not COMPOSITE & indexes
+
+def test_advisor_flags_only_sequential_scans_of_app_tables(sqlite_engine, seed):
+    seed(sqlite_engine, 500, products=5, customers=5)
+    advisor = IndexAdvisor()
+    since = datetime(2000, 1, 1)
+    Sale = models.Sale
+    with advisor.capture(sqlite_engine), Session(sqlite_engine) as db:
+        # Served by ix_sales_customer_id_sale_date
+        db.execute(select(func.sum(Sale.final_amount)).where(Sale.customer_id == 3, Sale.sale_date >= since)).all()
+        # No index on final_amount
+        db.execute(select(Sale.id).where(Sale.final_amount > 100)).all()
+        db.execute(select(Sale.id).where(Sale.final_amount > 100)).all()
+
+    with sqlite_engine.connect() as conn:
+        findings = advisor.report(conn)
+    assert len(findings) == 2
+    flagged, indexed = findings
+    assert "final_amount" in flagged["statement"] and flagged["sequential_scans"] == ["sales"]
+    assert "customer_id" in indexed["statement"] and indexed["sequential_scans"] == []
+    assert any("ix_sales_customer_id_sale_date" in step for step in indexed["plan"])
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+import pytest
+
+pytest.importorskip("sklearn")
+
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database import models
+from app.services.feature_store import feature_store
+from app.services.ml_service import MLService
+
+def legacy_prepare_features(db, since, until):
+    """The original MLService.prepare_features: every sale grouped in pandas, `until` (exclusive) left out"""
+    sales_data = db.query(
+        models.Sale.product_id, models.Sale.quantity, models.Sale.unit_price, models.Sale.final_amount,
+        models.Sale.sale_date, models.Product.category, models.Product.brand, models.Product.price
+    ).join(models.Product, models.Product.id == models.Sale.product_id).filter(
+        models.Sale.sale_date >= since, models.Sale.sale_date < until
+    ).all()
+    df = pd.DataFrame([
+        {
+            'product_id': sale.product_id, 'quantity': sale.quantity, 'unit_price': sale.unit_price,
+            'final_amount': sale.final_amount, 'sale_date': sale.sale_date, 'category': sale.category,
+            'brand': sale.brand or 'Unknown', 'price': sale.price
+        }
+        for sale in sales_data
+    ])
+    df['sale_date'] = pd.to_datetime(df['sale_date'])
+    df['day_of_week'] = df['sale_date'].dt.dayofweek
+    df['month'] = df['sale_date'].dt.month
+    df['quarter'] = df['sale_date'].dt.quarter
+    df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
+    daily_sales = df.groupby(['product_id', df['sale_date'].dt.date]).agg({
+        'quantity': 'sum', 'final_amount': 'sum', 'unit_price': 'mean', 'price': 'first', 'category': 'first',
+        'brand': 'first', 'day_of_week': 'first', 'month': 'first', 'quarter': 'first', 'is_weekend': 'first'
+    }).reset_index()
+    daily_sales = daily_sales.sort_values(['product_id', 'sale_date']).reset_index(drop=True)
+    daily_sales['quantity_7d_avg'] = daily_sales.groupby('product_id')['quantity'].rolling(7, min_periods=1).mean().reset_index(drop=True)
+    daily_sales['quantity_30d_avg'] = daily_sales.groupby('product_id')['quantity'].rolling(30, min_periods=1).mean().reset_index(drop=True)
+    return daily_sales
+
+def stored_features(db):
+    features = models.ProductDailyFeature
+    return pd.DataFrame(db.execute(
+        select(features.__table__).order_by(features.product_id, features.day)
+    ).mappings().all())
+
+def test_prepare_features_matches_the_pandas_features_of_complete_days(engine, seed, tmp_path):
+    seed(engine, 3000, products=10, customers=20, days=120)
+    service = MLService()
+    service.model_path = str(tmp_path / "model")
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+
+    with Session(engine) as db:
+        feature_store.rebuild(db)
+        expected = legacy_prepare_features(db, today - timedelta(days=730), today)
+        features = service.prepare_features(db)
+    assert len(features) == len(expected) > 0
+    pd.testing.assert_frame_equal(features.reset_index(drop=True), expected, check_dtype=False)
+
+def test_incremental_update_matches_a_rebuild(engine, seed):
+    seed(engine, 3000, products=10, customers=20, days=120)
+    today = datetime.now().date()
+
+    with Session(engine) as db:
+        feature_store.rebuild(db)
+        rebuilt = stored_features(db)
+
+        # Built as of a week ago, then caught up in two steps
+        feature_store.rebuild(db, today=today - timedelta(days=7))
+        assert feature_store.watermark(db) == today - timedelta(days=8)
+        assert feature_store.update(db, today=today - timedelta(days=3)) > 0
+        assert feature_store.update(db) > 0
+        assert feature_store.watermark(db) == today - timedelta(days=1)
+        # Nothing left to add until tomorrow
+        assert feature_store.update(db) == 0
+        updated = stored_features(db)
+    pd.testing.assert_frame_equal(updated, rebuilt)
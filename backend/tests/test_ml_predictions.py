@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import pytest
+
+pytest.importorskip("sklearn")
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.database import models
+from app.schemas.schemas import PredictionRequest
+from app.services.ml_service import MLService
+from app.services.prediction_cache import prediction_cache
+
+PRODUCTS = 10
+
+def legacy_predict_sales(service, db, product_id, days_ahead):
+    """The original per-request MLService.predict_sales: three queries and a one-row model.predict"""
+    if not db.query(models.Product).filter(models.Product.id == product_id).first():
+        raise ValueError(f"Product with ID {product_id} not found")
+    since = datetime.now() - timedelta(days=90)
+    if db.query(models.Sale.id).filter(models.Sale.product_id == product_id, models.Sale.sale_date >= since).first() is None:
+        return 1.0
+    df = service.prepare_features(db, product_id)
+    for col in ("category", "brand"):
+        encoder = service.label_encoders[col]
+        df[f"{col}_encoded"] = df[col].astype(str).apply(
+            lambda x: encoder.transform([x])[0] if x in encoder.classes_ else -1
+        )
+    latest_data = df.iloc[-1:].copy()
+    prediction_date = datetime.now() + timedelta(days=days_ahead)
+    latest_data["day_of_week"] = prediction_date.weekday()
+    latest_data["month"] = prediction_date.month
+    latest_data["quarter"] = (prediction_date.month - 1) // 3 + 1
+    latest_data["is_weekend"] = int(prediction_date.weekday() in [5, 6])
+    X = service.scaler.transform(latest_data[service.get_feature_names()].fillna(0))
+    return max(0, float(service.model.predict(X)[0]))
+
+@pytest.fixture
+def service(engine, seed, tmp_path, monkeypatch):
+    """A service trained on 120 days of sales of products 1-10, plus product 11 that never sold"""
+    seed(engine, 3000, products=PRODUCTS, customers=20, days=120)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Product), [{
+            "id": PRODUCTS + 1, "name": "Unsold", "category": "Books", "price": 12.0, "cost": 6.0,
+            "sku": "SKU-UNSOLD", "stock_quantity": 10, "reorder_level": 10, "is_active": True
+        }])
+    monkeypatch.setattr(prediction_cache, "enabled", False)
+    prediction_cache.lru.clear()
+    service = MLService()
+    service.model_path = str(tmp_path / "model")
+    with Session(engine) as db:
+        service.train_model(db)
+    return service
+
+def test_batch_predictions_match_single_and_legacy_predictions(engine, service):
+    requests = [
+        PredictionRequest(product_id=product_id, days_ahead=days_ahead)
+        for product_id, days_ahead in ((3, 1), (99, 7), (1, 30), (PRODUCTS + 1, 5), (3, 14), (98, 2), (7, 7))
+    ]
+    with Session(engine) as db:
+        items = service.predict_sales_batch(db, requests)
+        assert [(item.product_id, item.days_ahead) for item in items] == \
+            [(request.product_id, request.days_ahead) for request in requests]
+        # Unknown products fail on their own items only
+        assert [item.error for item in items] == [
+            None, "Product with ID 99 not found", None, None, None, "Product with ID 98 not found", None
+        ]
+        for request, item in zip(requests, items):
+            if item.error:
+                with pytest.raises(ValueError, match=item.error):
+                    service.predict_sales(db, request.product_id, request.days_ahead)
+                continue
+            single = service.predict_sales(db, request.product_id, request.days_ahead)
+            assert single.predicted_quantity == pytest.approx(item.prediction.predicted_quantity)
+            assert item.prediction.predicted_quantity == pytest.approx(
+                legacy_predict_sales(service, db, request.product_id, request.days_ahead)
+            )
+    assert items[3].prediction.predicted_quantity == 1.0 and items[3].prediction.confidence_score == 0.3
+
+def test_demand_forecast_sums_the_per_day_predictions(engine, service):
+    with Session(engine) as db:
+        for product_id in (2, 5, PRODUCTS + 1):
+            expected = [legacy_predict_sales(service, db, product_id, days) for days in range(1, 31)]
+            forecast = service.forecast_demand(db, product_id, 30)
+            assert [point.days_ahead for point in forecast.points] == list(range(1, 31))
+            assert [point.predicted_quantity for point in forecast.points] == pytest.approx(expected)
+            inventory = service.optimize_inventory(db, product_id)
+            assert inventory["predicted_30_day_demand"] == pytest.approx(sum(expected))
+            assert forecast.total_predicted_quantity == pytest.approx(sum(expected))
+        with pytest.raises(ValueError, match="Product with ID 99 not found"):
+            service.forecast_demand(db, 99)
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import date, datetime
+import pytest
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import Session, sessionmaker
+from app.database import models
+from app.database.partitions import SalesPartitionManager, sales_partitions
+
+NOW = datetime(2024, 6, 15, 12, 0)
+
+def sale(transaction_id, sale_date):
+    return {
+        "product_id": 1, "customer_id": 1, "quantity": 1, "unit_price": 10.0, "total_amount": 10.0,
+        "discount_amount": 0.0, "tax_amount": 0.0, "final_amount": 10.0, "sale_date": sale_date,
+        "payment_method": "card", "transaction_id": transaction_id
+    }
+
+def test_ensure_moves_sales_stranded_in_the_default_partition(engine, database_url, seed, alembic):
+    if engine.dialect.name != "postgresql":
+        pytest.skip("Declarative partitions are PostgreSQL-only")
+    seed(engine, 200, products=3, customers=3, days=60, now=NOW)
+    alembic(database_url, "stamp", "0001")
+    alembic(database_url, "upgrade", "0002")
+    # Migration 0002 created partitions up to three months from today; a sale
+    # further out goes to sales_default until maintenance catches up
+    far = date.today().replace(day=1).replace(year=date.today().year + 1)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Sale), [sale("FAR1", datetime.combine(far, datetime.min.time()).replace(hour=9))])
+
+    with Session(engine) as db:
+        created = sales_partitions.ensure(db, today=far)
+        name = sales_partitions.partition_name(far)
+        assert name in created
+        assert name in sales_partitions.partitions(db)["attached"]
+        assert db.scalar(text(f'SELECT count(*) FROM "{name}"')) == 1
+        assert db.scalar(text("SELECT count(*) FROM sales_default")) == 0
+        assert db.scalar(select(func.count()).select_from(models.Sale)) == 201
+        # New sales of the month are routed to the partition
+        db.execute(insert(models.Sale), [sale("FAR2", datetime.combine(far, datetime.min.time()).replace(hour=10))])
+        db.commit()
+        assert db.scalar(text(f'SELECT count(*) FROM "{name}"')) == 2
+        assert sales_partitions.ensure(db, today=far) == []
+
+def test_maintenance_runs_at_start_and_then_periodically(sqlite_engine, monkeypatch):
+    manager = SalesPartitionManager(interval_hours=0.01 / 3600)
+    runs = []
+    monkeypatch.setattr(manager, "ensure", lambda db: runs.append(db) or [])
+
+    async def run():
+        await manager.start(sessionmaker(bind=sqlite_engine))
+        assert len(runs) == 1
+        await asyncio.sleep(0.1)
+        await manager.stop()
+
+    asyncio.run(run())
+    assert len(runs) >= 3
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from app.schemas.schemas import PredictionResponse
+from app.services.prediction_cache import PredictionCache
+
+def test_stored_predictions_are_served_from_the_table(engine, seed):
+    seed(engine, 10, products=3, customers=3)
+    cache = PredictionCache()
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    through = (today - timedelta(days=1)).date()
+    predictions = [
+        PredictionResponse(
+            product_id=product_id, product_name=f"Product {product_id}", predicted_quantity=product_id + days / 10,
+            confidence_score=0.5, prediction_date=today + timedelta(days=days), model_version="1.0.1"
+        )
+        for product_id in (1, 2, 3) for days in (1, 2, 30)
+    ]
+    keys = [(prediction.product_id, prediction.prediction_date) for prediction in predictions]
+
+    with Session(engine) as db:
+        cache.put_many(db, predictions, through)
+        # Only the table can answer now
+        cache.lru.clear()
+        found = cache.get_many(db, keys, "1.0.1", through)
+        assert found == dict(zip(keys, predictions))
+        assert all(prediction.prediction_date.tzinfo is None for prediction in found.values())
+        assert cache.lru.stats()["entries"] == len(keys)
+
+        # Other model versions and older features are misses
+        cache.lru.clear()
+        assert cache.get_many(db, keys, "1.0.2", through) == {}
+        assert cache.get_many(db, keys, "1.0.1", through + timedelta(days=1)) == {}
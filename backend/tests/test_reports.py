@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.api.routers import reports
+from app.core.cache import response_cache
+from app.database import models
+
+NOW = datetime(2024, 6, 15, 12, 0)
+
+@pytest.fixture(autouse=True)
+def uncached(monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", False)
+
+def period_totals(engine, start_date=None, end_date=None):
+    sales = models.Sale
+    query = select(func.sum(sales.final_amount), func.count(sales.id))
+    if start_date is not None:
+        query = query.where(sales.sale_date >= start_date, sales.sale_date <= end_date)
+    with engine.connect() as conn:
+        revenue, orders = conn.execute(query).one()
+    return round(revenue, 6), orders
+
+def test_reports_read_the_overridden_database(engine, seed, api, monkeypatch):
+    seed(engine, 500, products=8, customers=12, days=90, now=NOW)
+    client, _ = api(engine, reports=reports.router)
+    captured = {}
+
+    async def generate_report(report_type, data):
+        captured[report_type] = data
+        return {"summary": "", "detailed_analysis": "", "recommendations": []}
+
+    monkeypatch.setattr(reports.genai_service, "generate_report", generate_report)
+    start_date, end_date = NOW - timedelta(days=30), NOW
+    for report_type in ("sales_summary", "inventory_status", "product_performance"):
+        response = client.post("/reports/generate", json={
+            "report_type": report_type, "start_date": start_date.isoformat(), "end_date": end_date.isoformat()
+        })
+        assert response.status_code == 200, response.text
+
+    summary = captured["sales_summary"]
+    assert (round(summary["total_revenue"], 6), summary["total_orders"]) == period_totals(engine, start_date, end_date)
+    assert captured["inventory_status"]["total_products"] == 8
+    # Product performance covers all sales, not just the period
+    performers = captured["product_performance"]["top_performers"]
+    assert round(sum(product["revenue"] for product in performers), 6) == period_totals(engine)[0]
+
+def test_run_query_works_across_event_loops(sqlite_engine, seed, api):
+    seed(sqlite_engine, 50, now=NOW)
+    _, async_engine = api(sqlite_engine)
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    def count_sales(db):
+        return db.query(models.Sale).count()
+
+    async def fan_out():
+        return await asyncio.gather(*(reports.run_query(sessions, count_sales) for _ in range(8)))
+
+    # A module-level semaphore would be bound to the first loop and fail in the second
+    assert asyncio.run(fan_out()) == [50] * 8
+    assert asyncio.run(fan_out()) == [50] * 8
@@ -0,0 +1,74 @@
+import asyncio
+from app.api.routers import analytics, products, sales
+from app.core.cache import ResponseCache, response_cache
+from app.core.responses import FastJSONResponse
+from app.database import models
+
+def test_cached_responses_are_rebuilt_for_every_hit():
+    cache = ResponseCache()
+    calls = []
+
+    @cache.cached("test/endpoint")
+    async def endpoint(limit: int):
+        calls.append(limit)
+        return FastJSONResponse({"limit": limit}, headers={"x-rows": str(limit)})
+
+    first = asyncio.run(endpoint(5))
+    # Middleware decorating one request's response
+    first.set_cookie("session", "abc")
+    first.headers["x-request-id"] = "1"
+
+    second, third = asyncio.run(endpoint(5)), asyncio.run(endpoint(5))
+    assert calls == [5]
+    assert second is not third
+    assert second.body == third.body == first.body
+    assert second.headers["x-rows"] == "5" and second.headers["content-type"] == "application/json"
+    assert "set-cookie" not in second.headers and "x-request-id" not in second.headers
+    second.headers["x-request-id"] = "2"
+    assert "x-request-id" not in third.headers
+
+def test_plain_results_are_cached_as_is():
+    cache = ResponseCache()
+
+    @cache.cached("test/plain")
+    async def endpoint(days: int):
+        return {"days": days}
+
+    assert asyncio.run(endpoint(3)) is asyncio.run(endpoint(3))
+
+def test_product_performance_hits_match_the_first_response(sqlite_engine, seed, api, monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", True)
+    response_cache.clear()
+    seed(sqlite_engine, 300, products=20, customers=10)
+    client, _ = api(sqlite_engine, analytics=analytics.router)
+    first = client.get("/analytics/product-performance?limit=5")
+    second = client.get("/analytics/product-performance?limit=5")
+    assert response_cache.stats()["hits"] >= 1
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert second.headers["content-type"] == "application/json"
+
+def test_writes_through_the_api_invalidate_cached_analytics(sqlite_engine, seed, api, monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", True)
+    response_cache.clear()
+    seed(sqlite_engine, 200, products=5, customers=5)
+    client, _ = api(sqlite_engine, analytics=analytics.router, products=products.router, sales=sales.router)
+
+    def inventory_value():
+        return client.get("/analytics/inventory-status").json()["total_inventory_value"]
+
+    before = inventory_value()
+    # A change that bypasses the app's write paths is not seen until they bump the version
+    with sqlite_engine.begin() as conn:
+        conn.execute(models.Product.__table__.update().where(models.Product.id == 1).values(stock_quantity=0))
+    assert inventory_value() == before
+
+    assert client.put("/products/2", json={"stock_quantity": 10}).status_code == 200
+    after_update = inventory_value()
+    assert after_update != before
+
+    response = client.post("/sales/", json={
+        "product_id": 3, "customer_id": 1, "quantity": 4, "unit_price": 10.0, "transaction_id": "cache-1"
+    })
+    assert response.status_code == 201
+    assert inventory_value() == after_update - 4 * 8.0
@@ -0,0 +1,92 @@
+import random
+import pytest
+from sqlalchemy import select
+from app.api.routers import sales
+from app.core.cache import response_cache
+from app.database import models
+
+def batch():
+    """Sales for products 1-4 and customers 1-5, with some rows that must be rejected"""
+    rng = random.Random(3)
+    rows = [
+        {
+            "product_id": rng.randint(1, 4), "customer_id": rng.randint(1, 5), "quantity": rng.randint(1, 3),
+            "unit_price": 10.0 + i, "discount_amount": 1.0, "tax_amount": 0.5, "transaction_id": f"BULK{i}"
+        }
+        for i in range(30)
+    ]
+    rows[4]["transaction_id"] = rows[2]["transaction_id"]  # Duplicate within the batch
+    rows[9]["product_id"] = 99
+    rows[13]["customer_id"] = 99
+    # Product 5 has 5 units: the second of these no longer fits
+    rows[20].update(product_id=5, quantity=3)
+    rows[21].update(product_id=5, quantity=3)
+    return rows
+
+def snapshot(engine):
+    """Everything a sale writes, without generated ids and timestamps"""
+    with engine.connect() as conn:
+        return {
+            "sales": sorted(conn.execute(select(
+                models.Sale.transaction_id, models.Sale.product_id, models.Sale.customer_id, models.Sale.quantity,
+                models.Sale.total_amount, models.Sale.final_amount
+            )).all()),
+            "stock": sorted(conn.execute(select(models.Product.id, models.Product.stock_quantity)).all()),
+            "customers": sorted(
+                (customer_id, round(spent, 6), orders) for customer_id, spent, orders in conn.execute(
+                    select(models.Customer.id, models.Customer.total_spent, models.Customer.total_orders)
+                )
+            ),
+            "stats": sorted(
+                (customer_id, round(spent, 6), orders) for customer_id, spent, orders in conn.execute(select(
+                    models.CustomerStats.customer_id, models.CustomerStats.total_spent, models.CustomerStats.total_orders
+                ))
+            ),
+            "rollup": sorted(
+                (product_id, round(revenue, 6), quantity, orders)
+                for product_id, revenue, quantity, orders in conn.execute(select(
+                    models.SalesDailyRollup.product_id, models.SalesDailyRollup.revenue,
+                    models.SalesDailyRollup.quantity, models.SalesDailyRollup.order_count
+                ))
+            )
+        }
+
+@pytest.fixture
+def store(engine, seed):
+    """A fresh catalog of 5 products (product 5 nearly sold out) and 5 customers"""
+    def reset():
+        models.Base.metadata.drop_all(bind=engine)
+        models.Base.metadata.create_all(bind=engine)
+        seed(engine, 0, products=5, customers=5)
+        with engine.begin() as conn:
+            conn.execute(models.Product.__table__.update().where(models.Product.id == 5).values(stock_quantity=5))
+    return reset
+
+def test_bulk_ingest_matches_creating_the_sales_one_by_one(engine, store, api, monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", False)
+    rows = batch()
+
+    store()
+    client, _ = api(engine, sales=sales.router)
+    single_errors = [
+        index for index, row in enumerate(rows) if client.post("/sales/", json=row).status_code != 201
+    ]
+    one_by_one = snapshot(engine)
+
+    store()
+    client, _ = api(engine, sales=sales.router)
+    result = client.post("/sales/bulk", json=rows).json()
+    assert result["received"] == len(rows)
+    assert result["created"] == len(result["sale_ids"]) == len(rows) - len(result["errors"])
+    assert [error["index"] for error in result["errors"]] == single_errors == [4, 9, 13, 21]
+    assert [error["error"] for error in result["errors"]] == [
+        "Duplicate transaction_id", "Product not found", "Customer not found", "Insufficient stock"
+    ]
+    assert snapshot(engine) == one_by_one
+
+def test_bulk_ingest_rejects_oversized_batches(engine, store, api, monkeypatch):
+    store()
+    monkeypatch.setattr(sales.settings, "SALES_BULK_MAX_ROWS", 10)
+    client, _ = api(engine, sales=sales.router)
+    assert client.post("/sales/bulk", json=batch()[:11]).status_code == 413
+    assert snapshot(engine)["sales"] == []
@@ -0,0 +1,97 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+from app.database import models
+from app.services.aggregate_planner import sales_overview_planner
+
+NOW = datetime(2024, 6, 15, 12, 0)
+START = datetime.combine((NOW - timedelta(days=30)).date(), time.min)
+END = datetime.combine((NOW - timedelta(days=1)).date(), time.max)
+
+def comparable(overview):
+    """An overview with floats rounded and tied rankings made order-independent"""
+    def rounded(item):
+        return tuple(sorted((key, round(value, 6) if isinstance(value, float) else value) for key, value in item.items()))
+
+    return {
+        "total_sales": round(overview["total_sales"], 6),
+        "total_orders": overview["total_orders"],
+        **{
+            section: sorted(map(rounded, overview[section]))
+            for section in ("top_products", "top_customers", "sales_by_category", "sales_trend")
+        }
+    }
+
+def baseline_overview(db, start_date, end_date):
+    """The sales-overview as the original five per-section queries computed it"""
+    Sale, Product, Customer = models.Sale, models.Product, models.Customer
+    date_filter = and_(Sale.sale_date >= start_date, Sale.sale_date <= end_date)
+    total_sales, total_orders = db.query(func.sum(Sale.final_amount), func.count(Sale.id)).filter(date_filter).one()
+    products = db.query(
+        Product.name, Product.category, func.sum(Sale.quantity), func.sum(Sale.final_amount)
+    ).join(Sale).filter(date_filter).group_by(Product.id, Product.name, Product.category).order_by(
+        func.sum(Sale.final_amount).desc()
+    ).limit(10).all()
+    customers = db.query(
+        Customer.first_name, Customer.last_name, Customer.email, func.sum(Sale.final_amount), func.count(Sale.id)
+    ).join(Sale).filter(date_filter).group_by(
+        Customer.id, Customer.first_name, Customer.last_name, Customer.email
+    ).order_by(func.sum(Sale.final_amount).desc()).limit(10).all()
+    categories = db.query(
+        Product.category, func.sum(Sale.final_amount), func.sum(Sale.quantity)
+    ).join(Sale).filter(date_filter).group_by(Product.category).all()
+    trend = db.query(
+        func.date(Sale.sale_date), func.sum(Sale.final_amount), func.count(Sale.id)
+    ).filter(date_filter).group_by(func.date(Sale.sale_date)).all()
+    return {
+        "total_sales": float(total_sales or 0),
+        "total_orders": total_orders,
+        "average_order_value": float(total_sales or 0) / total_orders if total_orders else 0.0,
+        "top_products": [
+            {"name": name, "category": category, "total_quantity": int(quantity), "total_revenue": float(revenue)}
+            for name, category, quantity, revenue in products
+        ],
+        "top_customers": [
+            {"name": f"{first} {last}", "email": email, "total_spent": float(spent), "total_orders": orders}
+            for first, last, email, spent, orders in customers
+        ],
+        "sales_by_category": [
+            {"category": category, "total_revenue": float(revenue), "total_quantity": int(quantity)}
+            for category, revenue, quantity in categories
+        ],
+        "sales_trend": [
+            {"date": str(day), "revenue": float(revenue), "orders": orders} for day, revenue, orders in trend
+        ]
+    }
+
+def test_fused_scan_matches_the_per_section_queries(engine, seed):
+    # 40 customers, so the top-10 cut actually drops some
+    seed(engine, 2000, products=25, customers=40, days=90, now=NOW)
+    start_date, end_date = NOW - timedelta(days=45, hours=5), NOW - timedelta(days=3, minutes=7)
+    with Session(engine) as db:
+        expected = baseline_overview(db, start_date, end_date)
+        fused = sales_overview_planner.run(db, start_date, end_date, strategy="fused")
+        streamed = sales_overview_planner.fused_stream(db, start_date, end_date)
+    assert expected["total_orders"] > 0
+    assert comparable(fused) == comparable(streamed) == comparable(expected)
+    assert round(fused["average_order_value"], 6) == round(expected["average_order_value"], 6)
+    assert [day["date"] for day in fused["sales_trend"]] == sorted(day["date"] for day in expected["sales_trend"])
+
+def test_unfilled_rollup_falls_back_to_the_fused_scan(engine, seed):
+    seed(engine, 600, products=12, customers=15, days=60, now=NOW)
+    with Session(engine) as db:
+        fused = sales_overview_planner.run(db, START, END, strategy="fused")
+        assert fused["total_orders"] > 0
+        assert comparable(sales_overview_planner.run(db, START, END, strategy="rollup")) == comparable(fused)
+
+def test_migration_backfills_the_rollup_to_match_the_fused_scan(engine, database_url, seed, alembic):
+    seed(engine, 600, products=12, customers=15, days=60, now=NOW)
+    alembic(database_url, "stamp", "0004")
+    alembic(database_url, "upgrade", "0005")
+
+    with Session(engine) as db:
+        assert db.scalar(select(func.sum(models.SalesDailyRollup.order_count))) == 600
+        rollup = sales_overview_planner.from_rollup(db, START, END)
+        fused = sales_overview_planner.run(db, START, END, strategy="fused")
+    assert rollup["total_orders"] > 0
+    assert comparable(rollup) == comparable(fused)
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import event
+from app.api.routers import customers, products, sales
+
+# SQL statements allowed per request: a page loads each expanded relation
+# with one batched query however many rows it has
+BUDGETS = (
+    ("/sales/?limit=1000", 3),
+    ("/sales/?limit=1000&expand=product", 2),
+    ("/sales/?limit=1000&expand=", 1),
+    ("/sales/customer/1?limit=1000", 3),
+    ("/sales/product/1?limit=1000", 3),
+    ("/sales/1", 3),
+    ("/products/?limit=1000", 1),
+    ("/customers/?limit=1000", 1)
+)
+
+@pytest.fixture
+def listing(engine, seed, api):
+    seed(engine, 2000, products=50, customers=50)
+    client, async_engine = api(engine, sales=sales.router, products=products.router, customers=customers.router)
+    statements = []
+
+    def count(conn, cursor, statement, *_):
+        # Catalog lookups (the partition manager's schema version check) aren't row loads
+        if not statement.lstrip().upper().startswith("PRAGMA") and "sqlite_master" not in statement:
+            statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    return client, statements
+
+def test_listing_endpoints_stay_within_their_query_budgets(listing):
+    client, statements = listing
+    used = {}
+    for path, budget in BUDGETS:
+        statements.clear()
+        response = client.get(path)
+        assert response.status_code == 200, path
+        used[path] = len(statements)
+    assert used == {path: min(used[path], budget) for path, budget in BUDGETS}
+
+def test_expanded_sales_page_embeds_every_relation(listing):
+    client, _ = listing
+    page = client.get("/sales/?limit=1000").json()
+    assert len(page) == 1000
+    assert all(sale["product"] and sale["customer"] for sale in page)
+    bare = client.get("/sales/?limit=1000&expand=").json()
+    assert all(sale["product"] is None and sale["customer"] is None for sale in bare)
+    one = client.get("/sales/1?expand=product").json()
+    assert one["product"]["id"] == one["product_id"] and one["customer"] is None
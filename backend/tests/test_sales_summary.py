@@ -0,0 +1,58 @@
+import random
+from datetime import date, timedelta
+import pytest
+from app.api.routers import sales
+from app.schemas.schemas import SummaryGranularity
+from app.services.crud import sale_service
+
+@pytest.fixture
+def client(sqlite_engine, seed, api):
+    seed(sqlite_engine, 500, products=10, customers=10, days=60)
+    return api(sqlite_engine, sales=sales.router)[0]
+
+@pytest.mark.parametrize("granularity", list(SummaryGranularity))
+def test_bucket_count_matches_the_listed_periods(granularity):
+    rng = random.Random(3)
+    for _ in range(500):
+        start = date(2020, 1, 1) + timedelta(days=rng.randint(0, 2000))
+        end = start + timedelta(days=rng.randint(0, 800))
+        assert sale_service.summary_bucket_count(granularity, start, end) == len(
+            sale_service.summary_periods(granularity, start, end)
+        )
+
+@pytest.mark.parametrize("query", [
+    "granularity=day&start=0001-01-01&end=9999-12-30",
+    "granularity=month&start=0001-01-01&end=9999-11-30",
+    "granularity=week&start=2000-01-01&end=2030-01-01"
+])
+def test_oversized_summaries_are_rejected_without_listing_buckets(client, query, monkeypatch):
+    def summary_periods(*args):
+        raise AssertionError("buckets listed before the cap was checked")
+
+    monkeypatch.setattr(sale_service, "summary_periods", summary_periods)
+    response = client.get(f"/sales/summary?{query}")
+    assert response.status_code == 400
+    assert "buckets requested" in response.json()["detail"]
+
+@pytest.mark.parametrize("query", [
+    "granularity=day&start=9999-12-31&end=9999-12-31",
+    "granularity=day&start=0001-01-01&end=9999-12-31",
+    "granularity=week&start=9999-12-20&end=9999-12-31",
+    "granularity=month&start=9999-12-01&end=9999-12-31",
+    "granularity=day&start=2024-01-01&end=2021-01-01"
+])
+def test_out_of_range_summaries_are_rejected(client, query):
+    assert client.get(f"/sales/summary?{query}").status_code == 400
+
+def test_bucket_count_is_arithmetic_for_huge_ranges():
+    assert sale_service.summary_bucket_count(SummaryGranularity.DAY, date(1, 1, 1), date(9999, 12, 30)) == 3652058
+    assert sale_service.summary_bucket_count(SummaryGranularity.MONTH, date(1, 1, 1), date(9999, 11, 30)) == 119987
+    assert sale_service.summary_bucket_count(SummaryGranularity.WEEK, date(2024, 1, 1), date(2024, 1, 14)) == 2
+
+def test_summary_buckets(client):
+    end = date.today()
+    response = client.get(f"/sales/summary?granularity=week&start={end - timedelta(days=69)}&end={end}")
+    assert response.status_code == 200
+    buckets = response.json()["buckets"]
+    assert len(buckets) == 10
+    assert sum(bucket["total_orders"] for bucket in buckets) == 500
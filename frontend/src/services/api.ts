@@ -143,6 +143,13 @@ export interface PredictionResponse {
   model_version: string
 }
 
+export interface BatchPredictionItem {
+  product_id: number
+  days_ahead: number
+  prediction: PredictionResponse | null
+  error: string | null
+}
+
 export interface ReportResponse {
   report_type: string
   summary: string
@@ -256,7 +263,7 @@ export const mlService = {
     }),
   
   predictSalesBatch: (requests: Array<{ product_id: number; days_ahead?: number }>) =>
-    api.post<PredictionResponse[]>('/ml/predict-sales/batch', requests),
+    api.post<BatchPredictionItem[]>('/ml/predict-sales/batch', requests),
   
   retrainModel: () =>
     api.post('/ml/retrain-model'),